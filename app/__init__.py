@@ -1,5 +1,4 @@
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import config
 import os
@@ -7,8 +6,9 @@ import flask.cli
 from flask_migrate import Migrate
 import click
 from flask.cli import with_appcontext
+from .database import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'main.login'
 migrate = Migrate()
@@ -24,9 +24,26 @@ def create_app(config_name=None):
     login_manager.init_app(app)
     migrate.init_app(app, db)
 
+    # Caché de páginas y fragmentos (invalidada por etiquetas desde los servicios)
+    from .cache import cache
+    cache.init_app(app)
+
+    # Consultas, tiempos y avisos de N+1 por petición (Server-Timing, log y /metrics), si está activada
+    from . import instrumentation
+    instrumentation.init_app(app)
+
+    # Sinónimos de ingredientes propios de la instalación (se suman a la tabla incorporada)
+    if app.config.get('INGREDIENT_SYNONYMS_FILE'):
+        from .normalization import load_synonyms
+        with open(app.config['INGREDIENT_SYNONYMS_FILE'], encoding='utf-8') as synonyms:
+            load_synonyms(synonyms)
+
     from .main import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
+    from .api import api as api_blueprint
+    app.register_blueprint(api_blueprint, url_prefix='/api/v1')
+
     # Registrar el comando init-db
     @app.cli.command("init-db")
     @with_appcontext
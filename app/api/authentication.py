@@ -0,0 +1,25 @@
+from functools import wraps
+from flask import g, request
+from flask_login import current_user
+from werkzeug.security import check_password_hash
+from ..services import UserService
+from .errors import unauthorized
+
+
+def auth_required(view):
+    """Exige sesión iniciada o credenciales HTTP Basic (usuario y contraseña) y deja el usuario en g"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user.is_authenticated:
+            g.current_user = current_user._get_current_object()
+            return view(*args, **kwargs)
+        credentials = request.authorization
+        if credentials is None or not credentials.username:
+            return unauthorized('Credenciales necesarias')
+        user = UserService.get_user_by_username(credentials.username)
+        if user is None or not user.password_hash or \
+                not check_password_hash(user.password_hash, credentials.password or ''):
+            return unauthorized('Credenciales no válidas')
+        g.current_user = user
+        return view(*args, **kwargs)
+    return wrapper
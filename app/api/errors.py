@@ -0,0 +1,36 @@
+from .serialization import json_response
+from . import api
+
+
+class ValidationError(ValueError):
+    """Datos de entrada no válidos en una petición a la API"""
+    pass
+
+
+def bad_request(message):
+    return json_response({'error': 'bad request', 'message': message}, status=400)
+
+
+def unauthorized(message):
+    response = json_response({'error': 'unauthorized', 'message': message}, status=401)
+    response.headers['WWW-Authenticate'] = 'Basic realm="api"'
+    return response
+
+
+def forbidden(message):
+    return json_response({'error': 'forbidden', 'message': message}, status=403)
+
+
+@api.errorhandler(ValidationError)
+def validation_error(e):
+    return bad_request(str(e))
+
+
+@api.errorhandler(400)
+def bad_request_error(e):
+    return bad_request(e.description)
+
+
+@api.errorhandler(404)
+def not_found_error(e):
+    return json_response({'error': 'not found'}, status=404)
@@ -0,0 +1,119 @@
+from flask import abort, current_app, g, request, url_for
+from ..jobs import schedule_similarity_update
+from ..models import Recipe
+from ..services import RecipeService
+from .authentication import auth_required
+from .errors import ValidationError
+from .serialization import json_response, parse_fields
+from . import api
+
+# Columnas que se pueden pedir con ?fields= (se leen con load_only) y campos calculados
+RECIPE_COLUMNS = ('title', 'description', 'ingredients', 'steps', 'category', 'author_id', 'timestamp',
+                  'updated_at')
+RECIPE_FIELDS = ('id',) + RECIPE_COLUMNS + ('author', 'url')
+MAX_BATCH = 100
+
+
+def recipe_to_json(recipe: Recipe, fields) -> dict:
+    data = {}
+    for field in fields:
+        if field == 'author':
+            author = recipe.author
+            data['author'] = {'id': author.id, 'username': author.username,
+                              'url': url_for('api.get_user', user_id=author.id)} if author else None
+        elif field == 'url':
+            data['url'] = url_for('api.get_recipe', recipe_id=recipe.id)
+        else:
+            data[field] = getattr(recipe, field)
+    return data
+
+
+def _query_args(fields):
+    """Columnas para load_only y si hay que cargar el autor según los campos pedidos"""
+    with_author = 'author' in fields
+    columns = [field for field in fields if field in RECIPE_COLUMNS]
+    if with_author:
+        columns.append('author_id')
+    return columns, with_author
+
+
+def _ids_arg(raw: str):
+    try:
+        ids = [int(value) for value in raw.split(',') if value.strip()]
+    except ValueError:
+        raise ValidationError('ids debe ser una lista de enteros separados por comas')
+    if len(ids) > MAX_BATCH:
+        raise ValidationError(f'Como máximo {MAX_BATCH} ids por petición')
+    return ids
+
+
+def per_page_arg() -> int:
+    per_page = request.args.get('per_page', current_app.config['RECIPES_PER_PAGE'], type=int)
+    return min(max(per_page, 1), MAX_BATCH)
+
+
+@api.route('/recipes')
+def get_recipes():
+    """Página de recetas por cursor (?cursor=, ?category=, ?per_page=) o lote con ?ids=1,2,3"""
+    fields = parse_fields(RECIPE_FIELDS)
+    columns, with_author = _query_args(fields)
+    if request.args.get('ids') is not None:
+        ids = _ids_arg(request.args['ids'])
+        recipes = RecipeService.get_recipes_by_ids(ids, columns=columns, with_author=with_author)
+        found = {recipe.id for recipe in recipes}
+        return json_response({'recipes': [recipe_to_json(recipe, fields) for recipe in recipes],
+                              'missing': [recipe_id for recipe_id in ids if recipe_id not in found]})
+
+    category = request.args.get('category')
+    try:
+        recipes, cursor = RecipeService.get_recipes_page(category=category, cursor=request.args.get('cursor'),
+                                                         per_page=per_page_arg(), columns=columns,
+                                                         with_author=with_author)
+    except ValueError:
+        raise ValidationError('Cursor no válido')
+    next_url = url_for('api.get_recipes', cursor=cursor, category=category, per_page=request.args.get('per_page'),
+                       fields=request.args.get('fields')) if cursor else None
+    return json_response({'recipes': [recipe_to_json(recipe, fields) for recipe in recipes],
+                          'cursor': cursor, 'next': next_url})
+
+
+@api.route('/recipes/<int:recipe_id>')
+def get_recipe(recipe_id):
+    fields = parse_fields(RECIPE_FIELDS)
+    columns, with_author = _query_args(fields)
+    recipes = RecipeService.get_recipes_by_ids([recipe_id], columns=columns, with_author=with_author)
+    if not recipes:
+        abort(404)
+    return json_response(recipe_to_json(recipes[0], fields))
+
+
+@api.route('/recipes', methods=['POST'])
+@auth_required
+def create_recipes():
+    """Crea una receta (objeto JSON) o varias en una sola transacción (lista o {"recipes": [...]})"""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get('recipes'), list):
+        payload = payload['recipes']
+    items = payload if isinstance(payload, list) else [payload]
+    if not items or len(items) > MAX_BATCH or not all(isinstance(item, dict) for item in items):
+        raise ValidationError(f'Se esperaba una receta o una lista de 1 a {MAX_BATCH} recetas en JSON')
+    allowed = ('title', 'description', 'ingredients', 'steps', 'category')
+    try:
+        recipes = RecipeService.create_recipes([{field: item.get(field) for field in allowed if field in item}
+                                                for item in items], g.current_user)
+    except ValueError as error:
+        raise ValidationError(str(error))
+    schedule_similarity_update(g.current_user.id)
+    body = [recipe_to_json(recipe, RECIPE_FIELDS) for recipe in recipes]
+    if isinstance(payload, list):
+        return json_response({'recipes': body}, status=201)
+    response = json_response(body[0], status=201)
+    response.headers['Location'] = body[0]['url']
+    return response
+
+
+@api.route('/categories')
+def get_categories():
+    return json_response({'categories': [
+        {'name': name, 'recipes': count, 'url': url_for('api.get_recipes', category=name)}
+        for name, count in RecipeService.get_categories()]})
@@ -0,0 +1,48 @@
+# Serialización de la API: JSON rápido (orjson si está instalado), campos dispersos (?fields=) y ETag
+import hashlib
+import json
+from datetime import datetime
+from typing import Iterable, List
+from flask import current_app, request
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional: sin ella se usa el módulo json de la biblioteca estándar
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} no es serializable a JSON')
+
+
+def dumps(payload) -> bytes:
+    """Codifica la respuesta en JSON compacto (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def json_response(payload, status: int = 200):
+    """Respuesta JSON; las lecturas llevan un ETag del cuerpo y responden 304 a un GET condicional"""
+    body = dumps(payload)
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    if status == 200 and request.method in ('GET', 'HEAD'):
+        response.set_etag(hashlib.sha1(body).hexdigest())
+        response.make_conditional(request)
+    return response
+
+
+def parse_fields(available: Iterable[str]) -> List[str]:
+    """Campos pedidos con ?fields=a,b (todos por defecto); el id siempre se incluye"""
+    available = list(available)
+    raw = request.args.get('fields')
+    if not raw:
+        return available
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(available))
+    if unknown:
+        from .errors import ValidationError
+        raise ValidationError('Campos desconocidos: ' + ', '.join(unknown))
+    return ['id'] + [field for field in dict.fromkeys(fields) if field != 'id']
@@ -0,0 +1,53 @@
+from flask import abort, current_app, request, url_for
+from ..models import User
+from ..services import SimilarityService, UserService
+from .serialization import json_response, parse_fields
+from . import api
+
+USER_FIELDS = ('id', 'username', 'url', 'similar_url')
+
+
+def user_to_json(user: User, fields) -> dict:
+    values = {
+        'id': lambda: user.id,
+        'username': lambda: user.username,
+        'url': lambda: url_for('api.get_user', user_id=user.id),
+        'similar_url': lambda: url_for('api.get_similar_users', user_id=user.id),
+    }
+    return {field: values[field]() for field in fields}
+
+
+@api.route('/users')
+def get_users():
+    """Usuarios por orden alfabético, paginados con ?after=<usuario>"""
+    fields = parse_fields(USER_FIELDS)
+    per_page = min(max(request.args.get('per_page', current_app.config['USERS_PER_PAGE'], type=int), 1), 100)
+    users, after = UserService.get_users_page(after=request.args.get('after'), per_page=per_page)
+    next_url = url_for('api.get_users', after=after, per_page=request.args.get('per_page'),
+                       fields=request.args.get('fields')) if after else None
+    return json_response({'users': [user_to_json(user, fields) for user in users], 'after': after,
+                          'next': next_url})
+
+
+@api.route('/users/<int:user_id>')
+def get_user(user_id):
+    user = UserService.get_user_by_id(user_id)
+    if user is None:
+        abort(404)
+    return json_response(user_to_json(user, parse_fields(USER_FIELDS)))
+
+
+def similar_k_arg() -> int:
+    """?k= de /users/<id>/similar, entre 1 y SIMILARITY_TOP_K"""
+    top_k = current_app.config['SIMILARITY_TOP_K']
+    return min(max(request.args.get('k', top_k, type=int), 1), top_k)
+
+
+@api.route('/users/<int:user_id>/similar')
+def get_similar_users(user_id):
+    """Los ?k= usuarios más similares, de mayor a menor puntuación"""
+    if UserService.get_user_by_id(user_id) is None:
+        abort(404)
+    fields = parse_fields(USER_FIELDS)
+    return json_response({'users': [user_to_json(user, fields)
+                                    for user in SimilarityService.get_similar_users(user_id, similar_k_arg())]})
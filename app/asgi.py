@@ -0,0 +1,203 @@
+# Modo de despliegue ASGI opcional (uvicorn asgi:app)
+# Las lecturas de la API más frecuentes (detalle de receta, listado por categoría y usuarios similares) se sirven
+# con los servicios asíncronos, así que una consulta lenta no retiene un worker. El resto de la aplicación Flask
+# (páginas HTML, formularios, escrituras) es la misma aplicación WSGI de siempre, ejecutada en un pool de hilos.
+
+import asyncio
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from flask import request, url_for
+from . import create_app
+from .api.errors import ValidationError, bad_request
+from .api.recipes import RECIPE_FIELDS, per_page_arg, recipe_to_json
+from .api.serialization import json_response, parse_fields
+from .api.users import USER_FIELDS, similar_k_arg, user_to_json
+from .async_services import AsyncRecipeService, AsyncSimilarityService, async_db
+
+
+def _environ(scope: Dict, body: bytes) -> Dict:
+    """Entorno WSGI equivalente a un scope HTTP de ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name, value = raw_name.decode('latin-1').lower(), raw_value.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _start_message(status: int, headers) -> Dict:
+    return {'type': 'http.response.start', 'status': status,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]}
+
+
+class WSGIBridge:
+    """Ejecuta la aplicación WSGI en un pool de hilos, enviando el cuerpo a medida que se genera"""
+
+    def __init__(self, wsgi_app, threads: int = 8):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send) -> None:
+        environ = _environ(scope, await _read_body(receive))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run, environ, send, loop)
+
+    def _run(self, environ: Dict, send, loop) -> None:
+        started: List[Tuple[int, list]] = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [(int(status.split(' ', 1)[0]), headers)]
+
+        def emit(message: Dict) -> None:
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            sent_start = False
+            for chunk in result:
+                if not sent_start:
+                    emit(_start_message(*started[0]))
+                    sent_start = True
+                if chunk:
+                    emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not sent_start:
+                emit(_start_message(*started[0]))
+            emit({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+class AsyncApp:
+    """Aplicación ASGI: rutas de solo lectura asíncronas y la aplicación Flask para todo lo demás"""
+
+    def __init__(self, flask_app, threads: int = 8):
+        self.flask_app = flask_app
+        self.wsgi = WSGIBridge(flask_app.wsgi_app, threads)
+        self.routes: List[Tuple[re.Pattern, Callable]] = [
+            (re.compile(r'^/api/v1/recipes/(\d+)$'), recipe_detail),
+            (re.compile(r'^/api/v1/recipes$'), recipes_page),
+            (re.compile(r'^/api/v1/users/(\d+)/similar$'), similar_users),
+        ]
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'websocket':
+            await self._reject_websocket(receive, send)
+            return
+        if scope['method'] in ('GET', 'HEAD'):
+            for pattern, handler in self.routes:
+                match = pattern.match(scope['path'])
+                if match is None:
+                    continue
+                with self.flask_app.request_context(_environ(scope, b'')):
+                    try:
+                        response = await handler(*match.groups())
+                    except ValidationError as error:
+                        response = bad_request(str(error))
+                    if response is not None:
+                        await self._send(response, send)
+                        return
+        await self.wsgi(scope, receive, send)
+
+    @staticmethod
+    async def _send(response, send) -> None:
+        # get_app_iter descarta el cuerpo en HEAD y en 304, igual que al servir la respuesta por WSGI
+        body = b''.join(response.get_app_iter(request.environ))
+        await send(_start_message(response.status_code, response.headers.items()))
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _reject_websocket(receive, send) -> None:
+        # No hay rutas websocket: se rechaza el handshake (el servidor responde 403) en lugar de fallar
+        message = await receive()
+        if message['type'] == 'websocket.connect':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_db.dispose()
+                self.wsgi.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def recipe_detail(recipe_id: str):
+    fields = parse_fields(RECIPE_FIELDS)
+    recipe = await AsyncRecipeService.get_recipe_by_id(int(recipe_id))
+    if recipe is None:
+        return json_response({'error': 'not found'}, status=404)
+    return json_response(recipe_to_json(recipe, fields))
+
+
+async def recipes_page():
+    """Página de /api/v1/recipes; los lotes con ?ids= los atiende la aplicación síncrona"""
+    if request.args.get('ids') is not None:
+        return None
+    fields = parse_fields(RECIPE_FIELDS)
+    category = request.args.get('category')
+    try:
+        recipes, cursor = await AsyncRecipeService.get_recipes_by_category(
+            category, cursor=request.args.get('cursor'), per_page=per_page_arg())
+    except ValueError:
+        raise ValidationError('Cursor no válido')
+    next_url = url_for('api.get_recipes', cursor=cursor, category=category, per_page=request.args.get('per_page'),
+                       fields=request.args.get('fields')) if cursor else None
+    return json_response({'recipes': [recipe_to_json(recipe, fields) for recipe in recipes],
+                          'cursor': cursor, 'next': next_url})
+
+
+async def similar_users(user_id: str):
+    fields = parse_fields(USER_FIELDS)
+    users = await AsyncSimilarityService.get_similar_users(int(user_id), similar_k_arg())
+    if not users:
+        return None  # Sin resultados la aplicación síncrona distingue entre usuario inexistente (404) y lista vacía
+    return json_response({'users': [user_to_json(user, fields) for user in users]})
+
+
+def create_asgi_app(config_name: Optional[str] = None, app=None) -> AsyncApp:
+    """Fábrica de la aplicación ASGI (envuelve la aplicación Flask de create_app o la que se pase)"""
+    app = app or create_app(config_name)
+    async_db.init_app(app)
+    return AsyncApp(app, threads=app.config['ASGI_WSGI_THREADS'])
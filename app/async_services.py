@@ -0,0 +1,108 @@
+# Versiones asíncronas de los servicios de solo lectura (modo ASGI)
+# Usan el motor asíncrono de SQLAlchemy (aiosqlite en local, asyncpg/aiomysql en producción) con las mismas
+# consultas que sus equivalentes de services.py, para que una lectura lenta no bloquee un worker entero.
+
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from .models import Recipe, SimilarUser, User
+from .services import RecipeService
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+except ImportError:  # Dependencia opcional (greenlet)
+    create_async_engine = None
+
+# Controlador asíncrono equivalente a cada controlador síncrono
+_ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+}
+
+
+def async_database_uri(uri: str) -> str:
+    """URI del motor asíncrono a partir de la URI síncrona de la configuración"""
+    scheme, separator, rest = uri.partition('://')
+    if scheme not in _ASYNC_DRIVERS:
+        raise ValueError(f'No hay controlador asíncrono conocido para {scheme}')
+    return _ASYNC_DRIVERS[scheme] + separator + rest
+
+
+class AsyncDatabase:
+    """Motor y fábrica de sesiones asíncronas de la aplicación ASGI"""
+
+    def __init__(self):
+        self.engine = None
+        self._sessionmaker = None
+
+    def init_app(self, app) -> None:
+        if create_async_engine is None:
+            raise ImportError('El modo ASGI requiere sqlalchemy[asyncio] (greenlet)')
+        uri = app.config.get('ASYNC_DATABASE_URI') or async_database_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+        options = {}
+        if uri.startswith('sqlite') and uri.rstrip('/') != 'sqlite+aiosqlite:' and ':memory:' not in uri:
+            # Por defecto aiosqlite abre (y cierra) una conexión con su propio hilo en cada sesión
+            options['poolclass'] = AsyncAdaptedQueuePool
+        self.engine = create_async_engine(uri, **options)
+        self._sessionmaker = sessionmaker(self.engine, class_=AsyncSession, expire_on_commit=False)
+
+    def session(self) -> 'AsyncSession':
+        return self._sessionmaker()
+
+    async def dispose(self) -> None:
+        if self.engine is not None:
+            await self.engine.dispose()
+
+
+async_db = AsyncDatabase()
+
+
+class AsyncRecipeService:
+    """Lecturas de recetas sin bloquear el bucle de eventos"""
+
+    @staticmethod
+    async def get_recipe_by_id(recipe_id: int) -> Optional[Recipe]:
+        """Obtiene una receta por su ID (con su autor)"""
+        async with async_db.session() as session:
+            result = await session.execute(select(Recipe).options(joinedload(Recipe.author))
+                                           .where(Recipe.id == recipe_id))
+            return result.scalars().first()
+
+    @staticmethod
+    async def get_recipes_by_category(category: Optional[str], cursor: Optional[str] = None,
+                                      per_page: int = 12) -> Tuple[List[Recipe], Optional[str]]:
+        """Página de recetas de una categoría (todas con None) y cursor de la siguiente, como get_recipes_page"""
+        query = select(Recipe).options(joinedload(Recipe.author))
+        if category is not None:
+            query = query.where(Recipe.category == category)
+        if cursor:
+            timestamp, recipe_id = RecipeService.decode_cursor(cursor)
+            query = query.where((Recipe.timestamp < timestamp) |
+                                ((Recipe.timestamp == timestamp) & (Recipe.id < recipe_id)))
+        query = query.order_by(Recipe.timestamp.desc(), Recipe.id.desc()).limit(per_page + 1)
+        async with async_db.session() as session:
+            recipes = (await session.execute(query)).scalars().all()
+        if len(recipes) > per_page:
+            recipes = recipes[:per_page]
+            return recipes, RecipeService.encode_cursor(recipes[-1])
+        return recipes, None
+
+
+class AsyncSimilarityService:
+    """Lecturas de usuarios similares sin bloquear el bucle de eventos"""
+
+    @staticmethod
+    async def get_similar_users(user_id: int, k: int = 20) -> List[User]:
+        """Los k usuarios más similares, de mayor a menor puntuación, como SimilarityService.get_similar_users"""
+        query = select(User).join(SimilarUser, SimilarUser.similar_user_id == User.id) \
+            .where(SimilarUser.user_id == user_id, User.id != user_id) \
+            .order_by(SimilarUser.score.desc().nullslast(), SimilarUser.similar_user_id).limit(k)
+        async with async_db.session() as session:
+            return (await session.execute(query)).scalars().all()
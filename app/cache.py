@@ -0,0 +1,269 @@
+# Caché de respuestas y fragmentos con invalidación por etiquetas
+# Cada entrada depende de unas etiquetas ("recipes", "recipe:7", "similar:3"...). Los servicios marcan
+# etiquetas al escribir y, tras el commit, cada etiqueta recibe una versión nueva: las entradas que
+# dependían de la versión anterior dejan de encontrarse y caducan solas (LRU o TTL).
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from flask import current_app, has_app_context, make_response, request, session
+from markupsafe import Markup
+from sqlalchemy import event
+from . import db
+
+_TAG_PREFIX = 'tag:'
+
+
+class CacheBackend(ABC):
+    """Interfaz de almacenamiento clave -> valor con caducidad"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor o None si no existe o caducó"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda un valor; ttl None usa el TTL por defecto y 0 no caduca"""
+        pass
+
+
+class NullCache(CacheBackend):
+    """Backend que no guarda nada (desactiva la caché)"""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+
+class LRUCache(CacheBackend):
+    """Caché en memoria del proceso con expulsión LRU y TTL"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (time.time() + ttl if ttl else 0, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class FileSystemCache(CacheBackend):
+    """Caché en disco compartida entre procesos (varios workers de gunicorn)"""
+
+    def __init__(self, directory: str, default_ttl: float = 300, max_entries: int = 10000):
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.PickleError):
+            return None
+        if expires_at and expires_at < time.time():
+            self._remove(path)
+            return None
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((time.time() + ttl if ttl else 0, value), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))  # Escritura atómica
+        self._prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _prune(self) -> None:
+        """Si hay demasiados ficheros elimina los más antiguos (las versiones de etiquetas se recrean)"""
+        names = [n for n in os.listdir(self.directory) if not n.endswith('.tmp')]
+        if len(names) <= self.max_entries:
+            return
+        paths = sorted((os.path.join(self.directory, n) for n in names), key=self._mtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _mtime(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class ResponseCache:
+    """Caché de vistas y fragmentos con versiones por etiqueta y contadores de aciertos"""
+
+    def __init__(self, app=None):
+        self.backend: CacheBackend = NullCache()
+        self.tag_ttl: float = 0  # Caducidad de las versiones de etiqueta (0: no caducan)
+        self.stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        cache_type = app.config.get('CACHE_TYPE', 'lru')
+        ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+        self.tag_ttl = 0
+        if cache_type == 'lru':
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+            # Los commits de otros procesos (CLI, worker de similitudes, otros workers de gunicorn) no llegan a
+            # esta memoria: las versiones caducan como las páginas para que nada se sirva obsoleto más de `ttl`
+            self.tag_ttl = ttl
+        elif cache_type == 'filesystem':
+            self.backend = FileSystemCache(app.config['CACHE_DIR'], ttl, app.config.get('CACHE_MAX_ENTRIES', 10000))
+        else:
+            self.backend = NullCache()
+        with self._stats_lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+        app.extensions['response_cache'] = self
+        app.jinja_env.globals['cache_fragment'] = self.fragment
+
+    def count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def metrics(self) -> Dict[str, int]:
+        """Contadores de aciertos, fallos, respuestas 304 e invalidaciones de este proceso"""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def tag_versions(self, tags: Iterable[str]) -> List[Tuple[str, float]]:
+        """Versión y fecha de última modificación de cada etiqueta (se crean si no existen)"""
+        versions = []
+        for tag in tags:
+            version = self.backend.get(_TAG_PREFIX + tag)
+            if version is None:
+                version = (f'{time.time_ns():x}', time.time())
+                self.backend.set(_TAG_PREFIX + tag, version, ttl=self.tag_ttl)
+            versions.append(version)
+        return versions
+
+    def invalidate(self, *tags: str) -> None:
+        """Da una versión nueva a las etiquetas; las entradas que dependían de ellas quedan huérfanas"""
+        now = time.time()
+        for tag in set(tags):
+            self.backend.set(_TAG_PREFIX + tag, (f'{time.time_ns():x}', now), ttl=self.tag_ttl)
+            self.count('invalidations')
+
+    def fragment(self, name: str, *tags: str, ttl: Optional[float] = None, caller=None) -> Markup:
+        """Bloque de plantilla cacheado: {% call cache_fragment('nombre', 'etiqueta') %}...{% endcall %}"""
+        key = 'fragment:' + name + ':' + ':'.join(v for v, _ in self.tag_versions(tags))
+        html = self.backend.get(key)
+        if html is None:
+            self.count('misses')
+            html = str(caller())
+            self.backend.set(key, html, ttl)
+        else:
+            self.count('hits')
+        return Markup(html)
+
+
+cache = ResponseCache()
+
+
+def _http_date(timestamp: float) -> str:
+    from werkzeug.http import http_date
+    return http_date(timestamp)
+
+
+def cached_view(*tag_templates: str, ttl: Optional[float] = None):
+    """Cachea una vista GET según sus etiquetas ('recipe:{recipe_id}' usa los argumentos de la vista)
+
+    Añade ETag y Last-Modified calculados solo con las versiones de las etiquetas, así que un GET
+    condicional que no ha cambiado se responde con 304 sin consultar la base de datos.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+            tags = [template.format(**kwargs) for template in tag_templates]
+            versions = cache.tag_versions(tags)
+            # Clave por usuario (id de sesión de Flask-Login, sin consultar la base de datos)
+            identity = f"{request.full_path}|{session.get('_user_id') or 'anon'}"
+            etag = hashlib.sha1('|'.join([identity] + [v for v, _ in versions]).encode('utf-8')).hexdigest()
+            last_modified = max(modified for _, modified in versions) if versions else time.time()
+
+            if etag in request.if_none_match:
+                cache.count('not_modified')
+                response = current_app.response_class(status=304)
+            else:
+                stored = cache.backend.get('view:' + etag)
+                if stored is None:
+                    cache.count('misses')
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    cache.backend.set('view:' + etag, (response.get_data(), response.mimetype), ttl)
+                else:
+                    cache.count('hits')
+                    body, mimetype = stored
+                    response = current_app.response_class(body, mimetype=mimetype)
+            response.set_etag(etag)
+            response.headers['Last-Modified'] = _http_date(last_modified)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_on_commit(*tags: str) -> None:
+    """Marca etiquetas para invalidarlas cuando la transacción actual haga commit"""
+    db.session.info.setdefault('cache_tags', set()).update(tags)
+
+
+@event.listens_for(db.session.session_factory.class_, 'after_commit')
+def _invalidate_committed_tags(session) -> None:
+    tags = session.info.pop('cache_tags', None)
+    if tags and has_app_context():
+        extension = current_app.extensions.get('response_cache')
+        if extension is not None:
+            extension.invalidate(*tags)
+
+
+@event.listens_for(db.session.session_factory.class_, 'after_rollback')
+def _discard_tags(session) -> None:
+    session.info.pop('cache_tags', None)
@@ -0,0 +1,313 @@
+# Catálogo compacto de recetas e ingredientes para el motor de matching
+# Las estrategias solo leen el autor, la categoría y los ingredientes de cada receta. En lugar de entidades ORM
+# (con descripción, pasos, identity map e instrumentación) el catálogo guarda los ingredientes internados como
+# enteros en arrays contiguos (desplazamientos + ids, como una matriz CSR) y el conjunto de ingredientes de
+# cada usuario como un array('I') ordenado: un millón de recetas ocupa decenas de MB.
+# Se construye con consultas de columnas sobre el índice de ingredientes y se actualiza receta a receta tras
+# cada escritura (RecipeService); las filas añadidas se compactan de vez en cuando. Las escrituras de otros
+# procesos no pasan por aquí: cada CATALOGUE_CHECK_SECONDS se compara el número de recetas y la última
+# fecha de edición con las del catálogo y, si no coinciden, se reconstruye.
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import func
+from .models import Ingredient, Recipe, recipe_ingredients
+from .normalization import normalize_ingredients
+from . import db
+
+_COMPACT_RATIO = 0.1  # Compacta cuando las filas añadidas o borradas desde la última vez superan esta fracción
+_COMPACT_MIN_ROWS = 1024
+
+
+def recipes_signature() -> Tuple[int, Optional[datetime]]:
+    """Número de recetas y última edición: cambia con cualquier alta, edición o baja"""
+    count, updated_at = db.session.query(func.count(Recipe.id), func.max(Recipe.updated_at)).one()
+    return count, updated_at
+
+
+class CatalogueRecipe:
+    """Receta del catálogo: solo lo que necesitan las estrategias"""
+
+    __slots__ = ('id', 'author_id', 'category', 'ingredient_ids')
+
+    def __init__(self, id: int, author_id: Optional[int], category: Optional[str], ingredient_ids: array):
+        self.id = id
+        self.author_id = author_id
+        self.category = category
+        self.ingredient_ids = ingredient_ids
+
+
+class IngredientCatalogue:
+    """Recetas e ingredientes por usuario en arrays de enteros, con actualización incremental"""
+
+    _build_lock = threading.Lock()
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.names: List[Optional[str]] = []
+        self._category_ids: Dict[Optional[str], int] = {None: 0}
+        self._categories: List[Optional[str]] = [None]
+        # ids de receta, autores (0 sin autor), categorías internadas, desplazamientos, ids de ingrediente y
+        # filas borradas o sustituidas por una versión más nueva (una tupla: la compactación la cambia de una vez)
+        self._columns = (array('I'), array('I'), array('H'), array('I', [0]), array('I'), set())
+        self._sorted = 0  # Las primeras filas están ordenadas por id y se localizan por bisección
+        self._tail: Dict[int, int] = {}  # id -> fila de las recetas añadidas desde la última compactación
+        self._user_sets: Dict[int, array] = {}
+        self._stale_users: Set[int] = set()  # Usuarios con recetas borradas: su conjunto se recalcula al pedirlo
+        self._lock = threading.RLock()
+        # (nº de recetas, última updated_at) que refleja el catálogo; None si no viene de la base de datos
+        self._signature: Optional[Tuple[int, Optional[datetime]]] = None
+        self._checked_at = 0.0
+
+    @classmethod
+    def from_database(cls, chunk_size: int = 10000) -> 'IngredientCatalogue':
+        """Construye el catálogo desde el índice de ingredientes (recipe_ingredients), sin cargar entidades"""
+        catalogue = cls()
+        # Antes de leer: una escritura concurrente con la construcción provoca otra en la siguiente comprobación
+        catalogue._signature, catalogue._checked_at = recipes_signature(), time.monotonic()
+        for name, ingredient_id in db.session.query(Ingredient.name, Ingredient.id):
+            catalogue._name(name, ingredient_id)
+        links = iter(db.session.query(recipe_ingredients.c.recipe_id, recipe_ingredients.c.ingredient_id)
+                     .order_by(recipe_ingredients.c.recipe_id, recipe_ingredients.c.ingredient_id)
+                     .yield_per(chunk_size))
+        link = next(links, None)
+        recipes = db.session.query(Recipe.id, Recipe.author_id, Recipe.category).order_by(Recipe.id) \
+            .yield_per(chunk_size)
+        for recipe_id, author_id, category in recipes:
+            while link is not None and link[0] < recipe_id:
+                link = next(links, None)
+            ingredient_ids = []
+            while link is not None and link[0] == recipe_id:
+                ingredient_ids.append(link[1])
+                link = next(links, None)
+            catalogue._append(recipe_id, author_id, category, ingredient_ids)
+        catalogue._finish_build()
+        return catalogue
+
+    @classmethod
+    def from_recipes(cls, recipes: Iterable) -> 'IngredientCatalogue':
+        """Construye el catálogo a partir de recetas ORM u objetos con author_id, category e ingredients"""
+        catalogue = cls()
+        rows = []
+        for position, recipe in enumerate(recipes, 1):
+            ingredient_ids = catalogue.intern(normalize_ingredients(recipe.ingredients))
+            recipe_id = getattr(recipe, 'id', None) or position
+            rows.append((recipe_id, recipe.author_id, getattr(recipe, 'category', None), ingredient_ids))
+        for row in sorted(rows, key=lambda row: row[0]):
+            catalogue._append(*row)
+        catalogue._finish_build()
+        return catalogue
+
+    @classmethod
+    def of(cls, recipes) -> 'IngredientCatalogue':
+        """Devuelve el propio catálogo o lo construye a partir de una lista de recetas (las estrategias
+        aceptan ambas cosas)"""
+        return recipes if isinstance(recipes, cls) else cls.from_recipes(recipes or [])
+
+    # Catálogo compartido por la aplicación
+
+    @staticmethod
+    def current() -> 'IngredientCatalogue':
+        """Catálogo de la aplicación, construido la primera vez que se pide y reconstruido si está desfasado"""
+        catalogue = current_app.extensions.get('ingredient_catalogue')
+        if catalogue is None or catalogue._due_for_check():
+            with IngredientCatalogue._build_lock:
+                catalogue = current_app.extensions.get('ingredient_catalogue')
+                if catalogue is None or (catalogue._due_for_check() and catalogue._is_stale()):
+                    catalogue = IngredientCatalogue.from_database()
+                    current_app.extensions['ingredient_catalogue'] = catalogue
+        return catalogue
+
+    @staticmethod
+    def refresh(recipe: Recipe) -> None:
+        """Actualiza una receta creada o editada en el catálogo de la aplicación, si ya está construido"""
+        catalogue = current_app.extensions.get('ingredient_catalogue')
+        if catalogue is not None:
+            created = catalogue.get(recipe.id) is None
+            catalogue.add(recipe.id, recipe.author_id, recipe.category, normalize_ingredients(recipe.ingredients))
+            if catalogue._signature is not None:
+                count, updated_at = catalogue._signature
+                if recipe.updated_at is not None and (updated_at is None or recipe.updated_at > updated_at):
+                    updated_at = recipe.updated_at
+                catalogue._signature = (count + created, updated_at)
+
+    @staticmethod
+    def discard(recipe_id: int) -> None:
+        """Quita una receta del catálogo de la aplicación"""
+        catalogue = current_app.extensions.get('ingredient_catalogue')
+        if catalogue is not None:
+            removed = catalogue.get(recipe_id) is not None
+            catalogue.remove(recipe_id)
+            if catalogue._signature is not None:
+                # La baja puede haber sido la última edición: se acepta la firma de la base si solo cambia eso
+                count, updated_at = catalogue._signature
+                stored = recipes_signature()
+                same_edits = stored[1] is None or (updated_at is not None and stored[1] <= updated_at)
+                catalogue._signature = stored if stored[0] == count - removed and same_edits else None
+
+    @staticmethod
+    def reset() -> None:
+        """Descarta el catálogo de la aplicación (tras una carga masiva se reconstruye al pedirlo)"""
+        current_app.extensions.pop('ingredient_catalogue', None)
+
+    def _due_for_check(self) -> bool:
+        return time.monotonic() - self._checked_at >= current_app.config['CATALOGUE_CHECK_SECONDS']
+
+    def _is_stale(self) -> bool:
+        """Compara el catálogo con la base de datos (otro proceso ha podido escribir recetas)"""
+        self._checked_at = time.monotonic()
+        return self._signature is None or self._signature != recipes_signature()
+
+    # Consultas
+
+    def __len__(self) -> int:
+        return len(self._columns[0]) - len(self._columns[5])
+
+    def lookup(self, names: Iterable[str]) -> Set[int]:
+        """ids de los ingredientes conocidos (los que no aparecen en ninguna receta no pueden coincidir)"""
+        return {self.vocabulary[name] for name in names if name in self.vocabulary}
+
+    def records(self) -> Iterator[CatalogueRecipe]:
+        """Recorre las recetas vivas"""
+        ids, authors, categories, offsets, ingredients, deleted = self._columns
+        for row in range(len(ids)):
+            if row not in deleted:
+                yield CatalogueRecipe(ids[row], authors[row] or None, self._categories[categories[row]],
+                                      ingredients[offsets[row]:offsets[row + 1]])
+
+    __iter__ = records
+
+    def get(self, recipe_id: int) -> Optional[CatalogueRecipe]:
+        row = self._row_of(recipe_id)
+        if row is None:
+            return None
+        ids, authors, categories, offsets, ingredients, _ = self._columns
+        return CatalogueRecipe(ids[row], authors[row] or None, self._categories[categories[row]],
+                               ingredients[offsets[row]:offsets[row + 1]])
+
+    def user_ingredients(self, user_id: int) -> array:
+        """ids de los ingredientes de un usuario, ordenados"""
+        if user_id in self._stale_users:
+            self._recompute_users({user_id})
+        return self._user_sets.get(user_id, array('I'))
+
+    def user_names(self, user_id: int) -> Set[str]:
+        return {self.names[ingredient_id] for ingredient_id in self.user_ingredients(user_id)}
+
+    def user_sets(self) -> Dict[int, array]:
+        """Conjunto de ingredientes de cada usuario con recetas"""
+        if self._stale_users:
+            self._recompute_users(set(self._stale_users))
+        return dict(self._user_sets)
+
+    def nbytes(self) -> int:
+        """Memoria aproximada de los arrays del catálogo (sin el vocabulario)"""
+        arrays = list(self._columns[:5]) + list(self._user_sets.values())
+        return sum(values.itemsize * len(values) for values in arrays)
+
+    # Escrituras
+
+    def intern(self, names: Iterable[str]) -> List[int]:
+        """ids ordenados de los ingredientes, dando uno nuevo a los que no estaban en el vocabulario"""
+        ingredient_ids = set()
+        for name in names:
+            ingredient_id = self.vocabulary.get(name)
+            if ingredient_id is None:
+                ingredient_id = self._name(name, max(len(self.names), 1))  # El 0 no se usa, como en la base
+            ingredient_ids.add(ingredient_id)
+        return sorted(ingredient_ids)
+
+    def add(self, recipe_id: int, author_id: Optional[int], category: Optional[str], names: Iterable[str]) -> None:
+        """Añade una receta o sustituye su versión anterior"""
+        with self._lock:
+            ingredient_ids = self.intern(names)
+            self._remove(recipe_id)
+            self._tail[recipe_id] = self._append(recipe_id, author_id, category, ingredient_ids)
+            if author_id is not None and author_id not in self._stale_users:
+                current = self._user_sets.get(author_id, ())
+                self._user_sets[author_id] = array('I', sorted(set(current).union(ingredient_ids)))
+            self._maybe_compact()
+
+    def remove(self, recipe_id: int) -> None:
+        with self._lock:
+            self._remove(recipe_id)
+            self._maybe_compact()
+
+    def _name(self, name: str, ingredient_id: int) -> int:
+        if ingredient_id >= len(self.names):
+            self.names.extend([None] * (ingredient_id + 1 - len(self.names)))
+        self.names[ingredient_id] = name
+        self.vocabulary[name] = ingredient_id
+        return ingredient_id
+
+    def _append(self, recipe_id: int, author_id: Optional[int], category: Optional[str],
+                ingredient_ids: List[int]) -> int:
+        if category not in self._category_ids:
+            self._category_ids[category] = len(self._categories)
+            self._categories.append(category)
+        ids, authors, categories, offsets, ingredients, _ = self._columns
+        # Los ids de receta van los últimos: quien lea len(ids) tiene ya el resto de columnas completas
+        ingredients.extend(ingredient_ids)
+        offsets.append(len(ingredients))
+        categories.append(self._category_ids[category])
+        authors.append(author_id or 0)
+        ids.append(recipe_id)
+        return len(ids) - 1
+
+    def _row_of(self, recipe_id: int) -> Optional[int]:
+        row = self._tail.get(recipe_id)
+        if row is None:
+            ids = self._columns[0]
+            row = bisect_left(ids, recipe_id, 0, self._sorted)
+            if row == self._sorted or ids[row] != recipe_id:
+                return None
+        return None if row in self._columns[5] else row
+
+    def _remove(self, recipe_id: int) -> None:
+        row = self._row_of(recipe_id)
+        if row is not None:
+            self._columns[5].add(row)
+            self._tail.pop(recipe_id, None)
+            if self._columns[1][row]:
+                self._stale_users.add(self._columns[1][row])
+
+    def _recompute_users(self, user_ids: Set[int]) -> None:
+        with self._lock:
+            sets: Dict[int, Set[int]] = {user_id: set() for user_id in user_ids}
+            for recipe in self.records():
+                if recipe.author_id in sets:
+                    sets[recipe.author_id].update(recipe.ingredient_ids)
+            for user_id, ingredient_ids in sets.items():
+                if ingredient_ids:
+                    self._user_sets[user_id] = array('I', sorted(ingredient_ids))
+                else:
+                    self._user_sets.pop(user_id, None)
+            self._stale_users -= user_ids
+
+    def _finish_build(self) -> None:
+        """Tras cargar filas ordenadas por id: calcula los conjuntos de ingredientes de cada usuario"""
+        self._sorted = len(self._columns[0])
+        sets: Dict[int, Set[int]] = {}
+        for recipe in self.records():
+            if recipe.author_id is not None:
+                sets.setdefault(recipe.author_id, set()).update(recipe.ingredient_ids)
+        self._user_sets = {user_id: array('I', sorted(ingredient_ids)) for user_id, ingredient_ids in sets.items()}
+
+    def _maybe_compact(self) -> None:
+        changed = len(self._tail) + len(self._columns[5])
+        if changed > max(_COMPACT_MIN_ROWS, _COMPACT_RATIO * len(self._columns[0])):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Reescribe las columnas sin filas borradas y ordenadas por id (se sustituyen de una vez)"""
+        live = sorted(self.records(), key=lambda recipe: recipe.id)
+        compact = IngredientCatalogue()
+        compact._category_ids, compact._categories = self._category_ids, self._categories
+        for recipe in live:
+            compact._append(recipe.id, recipe.author_id, recipe.category, recipe.ingredient_ids)
+        self._columns, self._sorted, self._tail = compact._columns, len(live), {}
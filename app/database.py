@@ -0,0 +1,147 @@
+# Configuración del motor de base de datos
+# SQLite: WAL y PRAGMAs en cada conexión nueva, con un pool que las reutiliza (cache_size es por conexión).
+# PostgreSQL/MySQL: tamaño del pool, desbordamiento, reciclado y pre-ping desde la configuración.
+# Réplica de lectura opcional (bind "replica"): los get_* de los servicios leen de ella mientras la sesión no
+# haya escrito nada en la transacción en curso; desde la primera escritura se lee del primario hasta el commit.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Iterator, List
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import event, orm
+from sqlalchemy.pool import QueuePool
+
+REPLICA_BIND = 'replica'
+_use_replica: ContextVar[bool] = ContextVar('use_replica', default=False)
+_READ_STATEMENTS = ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN', 'SAVEPOINT', 'RELEASE')
+_IN_CLAUSE_CHUNK = 500  # Límite prudente de parámetros por consulta IN (SQLite)
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    """Divide una lista en bloques de tamaño fijo"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sqlite_pragmas(config) -> Dict[str, object]:
+    """PRAGMAs aplicados a cada conexión SQLite en fichero (None desactiva uno)"""
+    pragmas = {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'cache_size': config['SQLITE_CACHE_SIZE'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT_MS'],
+    }
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def _apply_pragmas(pragmas: Dict[str, object]):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout primero: cambiar a WAL necesita un bloqueo breve si otro proceso tiene la base abierta
+            for name in sorted(pragmas, key=lambda name: name != 'busy_timeout'):
+                cursor.execute(f'PRAGMA {name}={pragmas[name]}')
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def _record_write(connection, cursor, statement, parameters, context, executemany) -> None:
+    """Marca la sesión dueña de una conexión del primario en cuanto ejecuta algo que no es una lectura"""
+    session_info = connection.info.get('session_info')
+    if session_info is not None and not statement.lstrip().upper().startswith(_READ_STATEMENTS):
+        session_info['wrote'] = True
+
+
+def _unlink_session(dbapi_connection, connection_record) -> None:
+    connection_record.info.pop('session_info', None)
+
+
+class RoutingSession(SignallingSession):
+    """Sesión que envía las lecturas marcadas con read_replica() a la réplica, si está configurada"""
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        self.replica = None
+        if REPLICA_BIND in (self.app.config.get('SQLALCHEMY_BINDS') or {}):
+            self.replica = db.get_engine(self.app, bind=REPLICA_BIND)
+            writer = db.get_engine(self.app)
+            if not event.contains(writer, 'before_cursor_execute', _record_write):
+                event.listen(writer, 'before_cursor_execute', _record_write)
+                event.listen(writer.pool, 'checkin', _unlink_session)
+            event.listen(self, 'after_begin', self._link_connection)
+            event.listen(self, 'after_commit', self._forget_writes)
+            event.listen(self, 'after_rollback', self._forget_writes)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.replica is not None and _use_replica.get() and self._can_read_replica():
+            return self.replica
+        return super().get_bind(mapper, clause)
+
+    def _can_read_replica(self) -> bool:
+        return not (self._flushing or self.new or self.dirty or self.deleted or self.info.get('wrote'))
+
+    @staticmethod
+    def _link_connection(session, transaction, connection) -> None:
+        if connection.engine is not session.replica:
+            connection.info['session_info'] = session.info
+
+    @staticmethod
+    def _forget_writes(session) -> None:
+        session.info.pop('wrote', None)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy con opciones de motor por backend, PRAGMAs de SQLite y réplica de lectura"""
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        if sa_url.drivername.startswith('sqlite'):
+            if sa_url.database not in (None, '', ':memory:') and app.config['SQLITE_POOL_SIZE']:
+                # Flask-SQLAlchemy usaría NullPool: una conexión (y sus PRAGMAs) nueva en cada petición
+                options.setdefault('poolclass', QueuePool)
+                options.setdefault('pool_size', app.config['SQLITE_POOL_SIZE'])
+                options.setdefault('connect_args', {})['check_same_thread'] = False
+        else:
+            options.setdefault('pool_size', app.config['DATABASE_POOL_SIZE'])
+            options.setdefault('max_overflow', app.config['DATABASE_MAX_OVERFLOW'])
+            options.setdefault('pool_recycle', app.config['DATABASE_POOL_RECYCLE'])
+            options.setdefault('pool_timeout', app.config['DATABASE_POOL_TIMEOUT'])
+            options.setdefault('pool_pre_ping', app.config['DATABASE_POOL_PRE_PING'])
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super().create_engine(sa_url, engine_opts)
+        if engine.dialect.name == 'sqlite' and sa_url.database not in (None, '', ':memory:'):
+            event.listen(engine, 'connect', _apply_pragmas(sqlite_pragmas(self.get_app().config)))
+        return engine
+
+
+@contextmanager
+def read_replica() -> Iterator[None]:
+    """Las consultas dentro del bloque pueden servirse desde la réplica de lectura"""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def reads_from_replica(cls):
+    """Decorador de clase: los métodos estáticos get_* (salvo get_or_create_*) leen de la réplica"""
+    for name, member in list(vars(cls).items()):
+        if name.startswith('get_') and not name.startswith('get_or_create_') and isinstance(member, staticmethod):
+            setattr(cls, name, staticmethod(_on_replica(member.__func__)))
+    return cls
+
+
+def _on_replica(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        with read_replica():
+            return function(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,89 @@
+# Exportación / copia de seguridad del catálogo en JSON Lines
+# Un registro por línea con un campo "type": primero los usuarios, después las recetas (con el nombre de usuario del
+# autor, el mismo formato que lee `flask import-recipes`) y por último las relaciones de similitud. Las consultas
+# se recorren con yield_per sobre columnas (sin entidades ORM en el mapa de identidad) y la compresión se aplica al
+# vuelo, así que la memoria usada no depende del tamaño de las tablas.
+
+import json
+import zlib
+from typing import Iterable, Iterator, List, Optional
+from .models import Recipe, SimilarUser, User
+from . import db
+
+try:
+    import zstandard
+except ImportError:  # Dependencia opcional: sin ella solo se ofrece gzip
+    zstandard = None
+
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+MIMETYPES = {'none': 'application/x-ndjson', 'gzip': 'application/gzip', 'zstd': 'application/zstd'}
+
+
+def export_records(chunk_size: int = 1000, include_password_hashes: bool = False) -> Iterator[dict]:
+    """Usuarios, recetas y relaciones de similitud como diccionarios, en streaming"""
+    user_columns = [User.id, User.username] + ([User.password_hash] if include_password_hashes else [])
+    for row in db.session.query(*user_columns).order_by(User.id).yield_per(chunk_size):
+        yield dict(row._asdict(), type='user')
+
+    recipes = db.session.query(Recipe.id, Recipe.title, Recipe.description, Recipe.ingredients, Recipe.steps,
+                               Recipe.category, Recipe.timestamp, Recipe.updated_at,
+                               User.username.label('author')) \
+        .outerjoin(User, User.id == Recipe.author_id).order_by(Recipe.id)
+    for row in recipes.yield_per(chunk_size):
+        record = row._asdict()
+        record['type'] = 'recipe'
+        for field in ('timestamp', 'updated_at'):
+            record[field] = record[field].isoformat() if record[field] else None
+        yield record
+
+    edges = db.session.query(SimilarUser.user_id, SimilarUser.similar_user_id, SimilarUser.score) \
+        .order_by(SimilarUser.id)
+    for row in edges.yield_per(chunk_size):
+        yield dict(row._asdict(), type='similarity')
+
+
+def export_lines(records: Iterable[dict], lines_per_chunk: int = 500) -> Iterator[bytes]:
+    """Serializa los registros en JSON Lines, agrupando varias líneas por bloque de salida"""
+    buffer = []
+    for record in records:
+        buffer.append(json.dumps(record, ensure_ascii=False))
+        if len(buffer) >= lines_per_chunk:
+            yield ('\n'.join(buffer) + '\n').encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ('\n'.join(buffer) + '\n').encode('utf-8')
+
+
+def available_compressions() -> List[str]:
+    """Compresiones utilizables con las dependencias instaladas"""
+    return [method for method in COMPRESSIONS if method != 'zstd' or zstandard is not None]
+
+
+def compress(chunks: Iterable[bytes], method: Optional[str] = 'none') -> Iterator[bytes]:
+    """Comprime al vuelo un flujo de bloques (gzip, zstd o ninguno)"""
+    method = method or 'none'
+    if method == 'none':
+        yield from chunks
+        return
+    if method == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabecera y cola gzip
+    elif method == 'zstd':
+        if zstandard is None:
+            raise ImportError('La compresión zstd requiere el paquete zstandard')
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f'Compresión no soportada: {method}')
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compression_for(filename: Optional[str]) -> str:
+    """Compresión deducida de la extensión del fichero de salida"""
+    for method, extension in EXTENSIONS.items():
+        if extension and filename and filename.endswith(extension):
+            return method
+    return 'none'
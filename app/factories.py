@@ -5,8 +5,11 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from .models import Recipe, User
+from .cache import invalidate_on_commit
 from . import db
 
+DETAILED_REQUIRED_FIELDS = ('title', 'description', 'ingredients', 'steps', 'author')
+
 class RecipeFactory:
     """Factory para crear diferentes tipos de recetas"""
     
@@ -40,13 +43,19 @@ class RecipeFactory:
         )
     
     @staticmethod
-    def _create_detailed_recipe(**kwargs) -> Recipe:
-        """Crea una receta detallada con validaciones adicionales"""
+    def validate_detailed(data: Dict[str, Any]) -> None:
+        """Reglas de una receta detallada (también las aplica la importación masiva); lanza ValueError"""
         # Validar que todos los campos requeridos estén presentes
-        required_fields = ['title', 'description', 'ingredients', 'steps', 'author']
-        for field in required_fields:
-            if field not in kwargs or not kwargs[field]:
+        for field in DETAILED_REQUIRED_FIELDS:
+            if field not in data or not data[field]:
                 raise ValueError(f"Campo requerido '{field}' no proporcionado para receta detallada")
+        if len(data['title']) > Recipe.title.type.length:
+            raise ValueError(f"El título supera los {Recipe.title.type.length} caracteres")
+    
+    @staticmethod
+    def _create_detailed_recipe(**kwargs) -> Recipe:
+        """Crea una receta detallada con validaciones adicionales"""
+        RecipeFactory.validate_detailed(kwargs)
         
         return Recipe(
             title=kwargs['title'],
@@ -78,6 +87,8 @@ class UserFactory:
     @staticmethod
     def create_user(user_type: str, **kwargs) -> User:
         """Crea un usuario basado en el tipo especificado"""
+        # La lista de usuarios cacheada se invalida con el commit del nuevo usuario
+        invalidate_on_commit('users')
         
         if user_type == "standard":
             return UserFactory._create_standard_user(**kwargs)
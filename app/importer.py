@@ -0,0 +1,192 @@
+# Importación masiva de catálogos de recetas (JSONL o CSV)
+# Tubería de generadores: lectura línea a línea -> validación (reglas de la receta detallada) -> resolución de
+# autores con un mapa en memoria -> inserciones por bloques con executemany y un commit por bloque. El índice de
+# ingredientes, los perfiles de categoría, las firmas MinHash y las similitudes se recalculan una sola vez al
+# final. Cada bloque guarda en su misma transacción un checkpoint con la última línea confirmada para poder
+# reanudar: o se confirman las recetas y el checkpoint o ninguno de los dos.
+
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .cache import invalidate_on_commit
+from .factories import RecipeFactory
+from .models import ImportCheckpoint, Recipe, User
+from .search import RecipeSearch
+from .services import (CategoryProfileService, FeedService, IngredientIndexService, RecipeService,
+                       SignatureService, SimilarityService)
+from . import db
+
+ImportStats = namedtuple('ImportStats', ['read', 'imported', 'rejected', 'skipped', 'seconds'])
+
+RECIPE_FIELDS = ('title', 'description', 'ingredients', 'steps', 'category')
+
+Record = Tuple[int, Optional[Dict]]
+
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Record]:
+    """(nº de línea, registro) de un fichero JSONL o CSV con cabecera; None si la línea no es JSON válido"""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, encoding='utf-8', newline='') as source:
+        if fmt == 'csv':
+            # La línea de cabecera es la 1; cada registro se numera con la línea física en la que termina
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for number, line in enumerate(source, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield number, record if isinstance(record, dict) else None
+
+
+def _text(value, separator: str = ', ') -> str:
+    """Valor de un campo como texto (las listas de ingredientes o de pasos se unen con `separator`)"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return separator.join(str(item).strip() for item in value if str(item).strip())
+    return str(value).strip()
+
+
+def validate_records(records: Iterable[Record], on_reject: Callable[[int, str], None]) -> Iterator[Tuple[int, Dict]]:
+    """Filtra los registros que cumplen las reglas de RecipeFactory.validate_detailed"""
+    for number, record in records:
+        if record is None:
+            on_reject(number, 'JSON inválido')
+            continue
+        if record.get('type', 'recipe') != 'recipe':
+            continue  # Usuarios y similitudes de una exportación (flask export-recipes)
+        data = {field: _text(record.get(field), '\n' if field == 'steps' else ', ') for field in RECIPE_FIELDS}
+        data['author'] = _text(record.get('author') or record.get('username'))
+        try:
+            RecipeFactory.validate_detailed(data)
+        except ValueError as error:
+            on_reject(number, str(error))
+            continue
+        data['category'] = data['category'] or 'General'
+        yield number, data
+
+
+def batches(items: Iterable, size: int) -> Iterator[List]:
+    """Agrupa un iterable en listas de `size` elementos sin materializarlo"""
+    iterator = iter(items)
+    while True:
+        block = list(islice(iterator, size))
+        if not block:
+            return
+        yield block
+
+
+class Checkpoint:
+    """Última línea confirmada de un fichero de importación (fila de import_checkpoints)"""
+
+    def __init__(self, key: str, source: str):
+        self.source = os.path.abspath(source)
+        self.row = ImportCheckpoint.query.get(key)
+        if self.row is None or self.row.source != self.source:
+            self.row = self.row or ImportCheckpoint(key=key)
+            self.row.source, self.row.line, self.row.imported, self.row.rejected = self.source, 0, 0, 0
+            self.row.indexed = True
+        self.line, self.imported, self.rejected, self.indexed = \
+            self.row.line, self.row.imported, self.row.rejected, self.row.indexed
+
+    def save(self) -> None:
+        """Añade el estado a la transacción en curso (se confirma con el commit del bloque, no hace commit)"""
+        self.row.line, self.row.imported, self.row.rejected, self.row.indexed = \
+            self.line, self.imported, self.rejected, self.indexed
+        db.session.add(self.row)
+
+
+def _resolve_authors(authors: Dict[str, int], usernames: Iterable[str], create: bool) -> None:
+    """Completa el mapa usuario -> id, creando en bloque los autores que faltan si `create`"""
+    missing = sorted(set(usernames) - authors.keys())
+    if not missing or not create:
+        return
+    connection = db.session.connection()
+    connection.execute(User.__table__.insert(), [{'username': name, 'password_hash': ''} for name in missing])
+    authors.update(db.session.query(User.username, User.id).filter(User.username.in_(missing)))
+    invalidate_on_commit('users')
+
+
+def import_recipes(path: str, fmt: Optional[str] = None, chunk_size: int = 1000, create_authors: bool = False,
+                   checkpoint_key: Optional[str] = None, min_common_ingredients: int = 2,
+                   on_reject: Optional[Callable[[int, str], None]] = None,
+                   on_progress: Optional[Callable[[ImportStats], None]] = None) -> ImportStats:
+    """Importa un catálogo por bloques de `chunk_size` recetas; devuelve las estadísticas de la carga
+
+    Con `checkpoint_key` se saltan las líneas ya confirmadas en una ejecución anterior del mismo fichero.
+    Los autores se buscan por nombre de usuario (campo `author`); si no existen la fila se rechaza, salvo
+    con `create_authors`, que los da de alta sin contraseña.
+    """
+    start = time.perf_counter()
+    checkpoint = Checkpoint(checkpoint_key, path) if checkpoint_key else None
+    resume_after = checkpoint.line if checkpoint else 0
+    rejected_before = checkpoint.rejected if checkpoint else 0
+    counts = {'read': 0, 'imported': 0, 'rejected': 0, 'skipped': 0}
+
+    def reject(number: int, reason: str) -> None:
+        counts['rejected'] += 1
+        if on_reject is not None:
+            on_reject(number, reason)
+
+    def pending(records: Iterable[Record]) -> Iterator[Record]:
+        for number, record in records:
+            if number <= resume_after:
+                counts['skipped'] += 1
+                continue
+            counts['read'] += 1
+            yield number, record
+
+    def stats() -> ImportStats:
+        return ImportStats(counts['read'], counts['imported'], counts['rejected'], counts['skipped'],
+                           time.perf_counter() - start)
+
+    authors: Dict[str, int] = dict(db.session.query(User.username, User.id))
+    table = Recipe.__table__
+    for block in batches(validate_records(pending(read_records(path, fmt)), reject), chunk_size):
+        _resolve_authors(authors, (data['author'] for _, data in block), create_authors)
+        rows = []
+        for number, data in block:
+            author_id = authors.get(data['author'])
+            if author_id is None:
+                reject(number, f"Autor desconocido '{data['author']}'")
+                continue
+            rows.append(dict({field: data[field] for field in RECIPE_FIELDS}, author_id=author_id))
+        if rows:
+            db.session.connection().execute(table.insert(), rows)
+            invalidate_on_commit('recipes', *{f"category:{row['category']}" for row in rows},
+                                 *{f"user:{row['author_id']}" for row in rows})
+        if checkpoint is not None:
+            checkpoint.line = block[-1][0]
+            checkpoint.imported += len(rows)
+            checkpoint.rejected = rejected_before + counts['rejected']
+            checkpoint.indexed = False
+            checkpoint.save()
+        db.session.commit()  # Recetas y checkpoint juntos
+        counts['imported'] += len(rows)
+        if on_progress is not None:
+            on_progress(stats())
+
+    # Un único recálculo al final en lugar de indexar receta a receta (también si una ejecución
+    # anterior se interrumpió después de cargar los datos y antes de terminar de indexar)
+    if counts['imported'] or (checkpoint is not None and not checkpoint.indexed):
+        IngredientIndexService.rebuild()
+        CategoryProfileService.rebuild()
+        RecipeService.rebuild_summaries()
+        SignatureService.rebuild_all()
+        SimilarityService.recompute_similarities(min_common_ingredients=min_common_ingredients)
+        FeedService.rebuild_all()
+        RecipeSearch.reset()
+        if checkpoint is not None:
+            checkpoint.indexed = True
+            checkpoint.save()
+            db.session.commit()
+    return stats()
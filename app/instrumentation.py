@@ -0,0 +1,198 @@
+# Instrumentación por petición (opcional, INSTRUMENTATION=true)
+# Cuenta y cronometra las consultas SQL de cada petición (eventos before/after_cursor_execute), mide el
+# renderizado de plantillas y avisa cuando una misma sentencia se repite muchas veces (patrón N+1).
+# El resultado se publica en la cabecera Server-Timing, en una línea de log JSON por petición y, agregado
+# por endpoint, en /metrics con el formato de texto de Prometheus.
+
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+from flask import current_app, g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de los buckets del histograma de duración de las peticiones
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+_STATEMENT_LOG_LENGTH = 200
+
+
+class RequestStats:
+    """Consultas, tiempo de SQL y de plantillas acumulados durante una petición"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Sentencias ejecutadas al menos `threshold` veces (probable N+1)"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+def _current_stats():
+    return g.get('_request_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_stats() is not None:
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current_stats()
+    started = conn.info.get('_query_started')
+    if stats is None or not started:
+        return
+    stats.queries += 1
+    stats.sql_seconds += time.perf_counter() - started.pop()
+    stats.statements[statement] += 1
+
+
+class TimedTemplate(Template):
+    """Plantilla Jinja que suma su tiempo de renderizado a la petición en curso"""
+
+    def render(self, *args, **kwargs) -> str:
+        stats = _current_stats()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class RequestMetrics:
+    """Agregados por endpoint de este proceso, exportados en formato de texto de Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self._sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, List[int]] = defaultdict(lambda: [0] * len(self.buckets))
+
+    def observe(self, endpoint: str, method: str, status: int, duration: float, stats: RequestStats,
+                n_plus_one: int) -> None:
+        with self._lock:
+            self._requests[endpoint, method, status] += 1
+            sums = self._sums[endpoint]
+            sums['duration_seconds'] += duration
+            sums['queries'] += stats.queries
+            sums['sql_seconds'] += stats.sql_seconds
+            sums['template_seconds'] += stats.template_seconds
+            sums['n_plus_one'] += n_plus_one
+            histogram = self._histograms[endpoint]
+            for i, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    histogram[i] += 1
+
+    def render(self, extra: Dict[str, Dict[str, float]] = None) -> str:
+        """Texto de exposición de Prometheus; `extra` añade contadores {métrica: {evento: valor}}"""
+        with self._lock:
+            requests = dict(self._requests)
+            sums = {endpoint: dict(values) for endpoint, values in self._sums.items()}
+            histograms = {endpoint: list(counts) for endpoint, counts in self._histograms.items()}
+        lines = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} {kind}'])
+
+        family('recetas_requests_total', 'counter', 'Peticiones atendidas por endpoint, método y estado')
+        for (endpoint, method, status), count in sorted(requests.items()):
+            lines.append(f'recetas_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} '
+                         f'{count}')
+
+        family('recetas_request_duration_seconds', 'histogram', 'Duración de las peticiones por endpoint')
+        for endpoint, counts in sorted(histograms.items()):
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'recetas_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} '
+                             f'{count}')
+            total = sum(count for (name, _, _), count in requests.items() if name == endpoint)
+            lines.append(f'recetas_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {total}')
+            lines.append(f'recetas_request_duration_seconds_sum{{endpoint="{endpoint}"}} '
+                         f'{sums[endpoint]["duration_seconds"]:.6f}')
+            lines.append(f'recetas_request_duration_seconds_count{{endpoint="{endpoint}"}} {total}')
+
+        for key, name, help_text in (
+                ('queries', 'recetas_db_queries_total', 'Consultas SQL ejecutadas por endpoint'),
+                ('sql_seconds', 'recetas_db_seconds_total', 'Tiempo total en consultas SQL por endpoint'),
+                ('template_seconds', 'recetas_template_seconds_total', 'Tiempo total renderizando plantillas'),
+                ('n_plus_one', 'recetas_n_plus_one_total', 'Sentencias repetidas (posible N+1) por endpoint')):
+            family(name, 'counter', help_text)
+            for endpoint, values in sorted(sums.items()):
+                value = f'{values[key]:.6f}' if key.endswith('seconds') else int(values[key])
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {value}')
+
+        for name, values in (extra or {}).items():
+            family(name, 'counter', name.replace('_', ' '))
+            for label, value in sorted(values.items()):
+                lines.append(f'{name}{{event="{label}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _start_request() -> None:
+    g._request_stats = RequestStats()
+
+
+def _finish_request(response):
+    stats = g.pop('_request_stats', None)
+    if stats is None:
+        return response
+    duration = time.perf_counter() - stats.started
+    endpoint = request.endpoint or 'unknown'
+    repeated = stats.repeated(current_app.config['INSTRUMENTATION_N_PLUS_ONE_THRESHOLD'])
+    for statement, count in repeated:
+        logger.warning('Posible N+1 en %s: sentencia ejecutada %d veces: %s', endpoint, count,
+                       ' '.join(statement.split())[:_STATEMENT_LOG_LENGTH])
+    current_app.extensions['instrumentation'].observe(endpoint, request.method, response.status_code, duration,
+                                                      stats, len(repeated))
+
+    app_seconds = max(duration - stats.sql_seconds - stats.template_seconds, 0.0)
+    response.headers.add('Server-Timing', f'db;dur={stats.sql_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                                          f'tpl;dur={stats.template_seconds * 1000:.2f}, '
+                                          f'app;dur={app_seconds * 1000:.2f}')
+    logger.info(json.dumps({
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 2),
+        'queries': stats.queries,
+        'sql_ms': round(stats.sql_seconds * 1000, 2),
+        'template_ms': round(stats.template_seconds * 1000, 2),
+        'n_plus_one': [count for _, count in repeated],
+    }))
+    return response
+
+
+def metrics_view():
+    from .cache import cache
+    from .jobs import JobQueue
+    body = current_app.extensions['instrumentation'].render({
+        'recetas_cache_events_total': cache.metrics(),
+        'recetas_similarity_jobs_total': JobQueue.counters(),
+    })
+    return current_app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app) -> None:
+    """Activa la instrumentación si INSTRUMENTATION está activo (lo llama create_app)"""
+    if not app.config.get('INSTRUMENTATION'):
+        return
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    app.jinja_env.template_class = TimedTemplate
+    app.extensions['instrumentation'] = RequestMetrics()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,241 @@
+# Cola de trabajos en segundo plano para recalcular usuarios similares
+# La cola vive en la propia base de datos (tabla similarity_jobs), sin broker externo.
+# Varias ediciones seguidas del mismo usuario se agrupan en un único trabajo pendiente.
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from flask import current_app, has_app_context
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import Ingredient, SimilarityJob, UserIngredient
+from .services import FeedService, SimilarityService
+from .strategies import MatchingStrategyFactory
+
+logger = logging.getLogger(__name__)
+
+ClaimedJob = namedtuple('ClaimedJob', ['id', 'user_id', 'version', 'attempts'])
+
+_counters = {'enqueued': 0, 'coalesced': 0, 'processed': 0, 'failed': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def recompute_user_similarities(user_id: int, min_common_ingredients: int = 2) -> int:
+    """Recalcula los usuarios similares de un usuario con todos sus ingredientes; devuelve cuántos hay"""
+    names = {name for name, in db.session.query(Ingredient.name)
+             .join(UserIngredient, UserIngredient.ingredient_id == Ingredient.id)
+             .filter(UserIngredient.user_id == user_id)}
+    strategy = MatchingStrategyFactory.create_strategy("indexed_overlap",
+                                                       min_common_ingredients=min_common_ingredients,
+                                                       exclude_user_id=user_id)
+    # Jaccard, como el recálculo completo: la relación inversa recibe la misma puntuación con razón
+    ranked = strategy.rank_by_jaccard(names)
+
+    # Diferencia con las relaciones actuales en una sola transacción (sin vaciar la tabla)
+    SimilarityService.replace_user_similarities(user_id, ranked, strategy='indexed:jaccard')
+    # Feed del usuario con sus vecinos nuevos y sus recetas recientes en el feed de quienes lo tienen de vecino
+    FeedService.rebuild([user_id])
+    FeedService.fan_out(user_id)
+    db.session.commit()
+    return len(ranked)
+
+
+def schedule_similarity_update(user_id: int) -> bool:
+    """Encola el recálculo de un usuario; devuelve False si se ejecutó en línea (SIMILARITY_ASYNC desactivado)"""
+    app = current_app._get_current_object()
+    if not app.config['SIMILARITY_ASYNC']:
+        recompute_user_similarities(user_id)
+        return False
+    JobQueue.enqueue(user_id)
+    if app.config['SIMILARITY_WORKER_THREADS'] > 0:
+        SimilarityWorker.ensure_started(app)
+    return True
+
+
+class JobQueue:
+    """Operaciones atómicas sobre la tabla de trabajos (seguras entre hilos y procesos)"""
+
+    @staticmethod
+    def enqueue(user_id: int) -> bool:
+        """Encola un recálculo; devuelve False si se agrupó con un trabajo ya existente"""
+        for _ in range(2):
+            if JobQueue._bump(user_id):
+                db.session.commit()
+                _count('coalesced')
+                return False
+            db.session.add(SimilarityJob(user_id=user_id))
+            try:
+                db.session.commit()
+                _count('enqueued')
+                return True
+            except IntegrityError:
+                # Otro proceso creó el trabajo a la vez: reintentar como agrupación
+                db.session.rollback()
+        return False
+
+    @staticmethod
+    def claim() -> Optional[ClaimedJob]:
+        """Toma el trabajo pendiente más antiguo y lo marca como en ejecución"""
+        while True:
+            job = SimilarityJob.query.filter_by(status='pending') \
+                .order_by(SimilarityJob.enqueued_at, SimilarityJob.id).first()
+            if job is None:
+                db.session.commit()
+                return None
+            claimed = ClaimedJob(job.id, job.user_id, job.version, job.attempts + 1)
+            updated = SimilarityJob.query.filter_by(id=job.id, status='pending', version=job.version) \
+                .update({'status': 'running', 'started_at': datetime.utcnow(), 'attempts': claimed.attempts},
+                        synchronize_session=False)
+            db.session.commit()
+            if updated == 1:
+                return claimed
+
+    @staticmethod
+    def complete(job: ClaimedJob) -> None:
+        """Elimina el trabajo terminado, o lo deja pendiente si hubo ediciones mientras se ejecutaba"""
+        deleted = SimilarityJob.query.filter_by(id=job.id, version=job.version) \
+            .delete(synchronize_session=False)
+        if not deleted:
+            SimilarityJob.query.filter_by(id=job.id) \
+                .update({'status': 'pending', 'attempts': 0, 'enqueued_at': datetime.utcnow()},
+                        synchronize_session=False)
+        db.session.commit()
+        _count('processed')
+
+    @staticmethod
+    def fail(job: ClaimedJob, error: str) -> None:
+        """Registra un error; el trabajo se reintenta hasta SIMILARITY_JOB_MAX_ATTEMPTS veces"""
+        status = 'failed' if job.attempts >= current_app.config['SIMILARITY_JOB_MAX_ATTEMPTS'] else 'pending'
+        SimilarityJob.query.filter_by(id=job.id) \
+            .update({'status': status, 'last_error': error}, synchronize_session=False)
+        db.session.commit()
+        _count('failed')
+
+    @staticmethod
+    def requeue_stale() -> int:
+        """Devuelve a la cola los trabajos abandonados por un worker caído"""
+        limit = datetime.utcnow() - timedelta(seconds=current_app.config['SIMILARITY_JOB_STALE_SECONDS'])
+        updated = SimilarityJob.query.filter(SimilarityJob.status == 'running', SimilarityJob.started_at < limit) \
+            .update({'status': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        return updated
+
+    @staticmethod
+    def counters() -> Dict[str, int]:
+        """Trabajos encolados, agrupados, procesados y fallidos en este proceso"""
+        with _counters_lock:
+            return dict(_counters)
+
+    @staticmethod
+    def metrics() -> Dict[str, float]:
+        """Profundidad de la cola, retraso del trabajo más antiguo y contadores de este proceso"""
+        counts = dict(db.session.query(SimilarityJob.status, db.func.count(SimilarityJob.id))
+                      .group_by(SimilarityJob.status))
+        oldest = db.session.query(db.func.min(SimilarityJob.enqueued_at)) \
+            .filter(SimilarityJob.status == 'pending').scalar()
+        metrics = JobQueue.counters()
+        metrics.update({
+            'depth': counts.get('pending', 0),
+            'running': counts.get('running', 0),
+            'failed_jobs': counts.get('failed', 0),
+            'lag_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+        })
+        return metrics
+
+    @staticmethod
+    def _bump(user_id: int) -> bool:
+        """Marca un trabajo existente como desactualizado; devuelve si existía"""
+        updated = SimilarityJob.query.filter_by(user_id=user_id) \
+            .update({'version': SimilarityJob.version + 1}, synchronize_session=False)
+        if updated:
+            SimilarityJob.query.filter_by(user_id=user_id, status='failed') \
+                .update({'status': 'pending', 'attempts': 0}, synchronize_session=False)
+        return bool(updated)
+
+
+class SimilarityWorker:
+    """Pool de hilos que consume la cola de recálculos"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, app, threads: int = 1, poll_interval: float = 1.0):
+        self.app = app
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    @classmethod
+    def ensure_started(cls, app) -> 'SimilarityWorker':
+        """Arranca (una sola vez por proceso) el worker en hilos dentro de la aplicación"""
+        with cls._lock:
+            worker = app.extensions.get('similarity_worker')
+            if worker is None:
+                worker = cls(app, app.config['SIMILARITY_WORKER_THREADS'],
+                             app.config['SIMILARITY_WORKER_POLL_SECONDS'])
+                worker.start()
+                app.extensions['similarity_worker'] = worker
+            return worker
+
+    def start(self) -> None:
+        """Lanza los hilos del worker (demonios)"""
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f'similarity-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Detiene los hilos al terminar el trabajo en curso"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_once(self) -> bool:
+        """Procesa un trabajo si hay alguno; devuelve si procesó algo"""
+        if has_app_context():
+            return self._process_next()
+        # Al salir del contexto Flask-SQLAlchemy cierra la sesión del hilo
+        with self.app.app_context():
+            return self._process_next()
+
+    def run_forever(self) -> None:
+        """Bucle bloqueante (para ejecutar el worker como proceso aparte)"""
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self._threads):
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _process_next(self) -> bool:
+        job = JobQueue.claim()
+        if job is None:
+            return False
+        try:
+            recompute_user_similarities(job.user_id)
+            JobQueue.complete(job)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Error recalculando similitudes del usuario %s', job.user_id)
+            JobQueue.fail(job, repr(e))
+        return True
+
+    def _loop(self) -> None:
+        with self.app.app_context():
+            JobQueue.requeue_stale()
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once()
+            except Exception:
+                logger.exception('Error en el worker de similitudes')
+                worked = False
+            if not worked:
+                self._stop.wait(self.poll_interval)
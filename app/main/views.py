@@ -1,13 +1,18 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort, current_app, stream_with_context
 from flask_login import login_required, current_user, login_user, logout_user
 from . import main
 from .. import db
 from ..models import User, Recipe, SimilarUser
 from werkzeug.security import generate_password_hash, check_password_hash
 # Importar servicios para separar responsabilidades
-from ..services import UserService, RecipeService, SimilarityService
-# Importar estrategias de matching
-from ..strategies import MatchingStrategyFactory
+from ..services import UserService, RecipeService, SimilarityService, PantryService, FeedService
+# Cola de recálculo de usuarios similares en segundo plano
+from ..jobs import JobQueue, schedule_similarity_update
+# Caché de páginas invalidada por etiquetas (ver app/cache.py)
+from ..cache import cache, cached_view
+from ..search import render_snippet
+# Exportación del catálogo en JSON Lines (streaming)
+from ..export import EXTENSIONS, MIMETYPES, available_compressions, compress, export_lines, export_records
 # Importar factories para crear entidades
 from ..factories import RecipeFactory, UserFactory
 
@@ -50,11 +55,28 @@ def logout():
 
 # Página principal: lista de recetas
 @main.route('/')
+@cached_view('recipes', 'users')
 def index():
-    # Usar servicios para obtener datos
-    recipes = RecipeService.get_all_recipes()
-    users = UserService.get_all_users()
-    return render_template('index.html', recipes=recipes, users=users)
+    # Usar servicios para obtener datos (una página de recetas y una lista acotada de usuarios)
+    recipes, next_cursor = _recipes_page()
+    users, more_users = UserService.get_users_page(per_page=current_app.config['SIDEBAR_USERS'])
+    return render_template('index.html', recipes=recipes, next_cursor=next_cursor,
+                           users=users, more_users=more_users is not None)
+
+# Listado paginado de usuarios
+@main.route('/users')
+def users():
+    users, next_after = UserService.get_users_page(after=request.args.get('after'),
+                                                   per_page=current_app.config['USERS_PER_PAGE'])
+    return render_template('users.html', users=users, next_after=next_after)
+
+def _recipes_page(category=None):
+    """Página de resúmenes de recetas según el cursor de la petición (400 si el cursor no es válido)"""
+    try:
+        return RecipeService.get_summaries_page(category=category, cursor=request.args.get('cursor'),
+                                                per_page=current_app.config['RECIPES_PER_PAGE'])
+    except ValueError:
+        abort(400)
 
 # Crear receta
 @main.route('/new_recipe', methods=['GET', 'POST'])
@@ -75,32 +97,20 @@ def new_recipe():
                                            steps=steps,
                                            category=category,
                                            author=current_user)
-        db.session.add(recipe)
-        db.session.commit()
+        # Usar servicio para guardar la receta y mantener el índice de ingredientes
+        RecipeService.add_recipe(recipe)
 
-        # Usar estrategia de matching para encontrar usuarios similares
-        # Limpiar relaciones previas del usuario actual
-        SimilarityService.clear_user_similarities(current_user.id)
-        
-        # Obtener todas las recetas de otros usuarios
-        all_recipes = RecipeService.get_other_users_recipes(current_user.id)
-        new_ingredients = set([i.strip().lower() for i in ingredients.split(',')])
-        
-        # Usar Factory para crear estrategia de matching
-        strategy = MatchingStrategyFactory.create_strategy("ingredient_overlap", min_common_ingredients=2)
-        matched_user_ids = strategy.find_similar_users(new_ingredients, all_recipes)
-        
-        # Crear relaciones bidireccionales usando servicios
-        for uid in matched_user_ids:
-            SimilarityService.create_similarity_relationship(current_user.id, uid)
-        
-        db.session.commit()
-        flash('Receta publicada exitosamente. Se han actualizado tus usuarios similares.')
+        # Recalcular usuarios similares en segundo plano (la respuesta no espera al matching)
+        if schedule_similarity_update(current_user.id):
+            flash('Receta publicada exitosamente. Tus usuarios similares se actualizarán en unos instantes.')
+        else:
+            flash('Receta publicada exitosamente. Se han actualizado tus usuarios similares.')
         return redirect(url_for('.index'))
     return render_template('new_recipe.html')
 
 # Ver receta
 @main.route('/recipe/<int:recipe_id>')
+@cached_view('recipe:{recipe_id}')
 def recipe_detail(recipe_id):
     # Usar servicio para obtener receta
     recipe = RecipeService.get_recipe_by_id(recipe_id)
@@ -110,13 +120,48 @@ def recipe_detail(recipe_id):
     return render_template('recipe_detail.html', recipe=recipe)
 
 @main.route('/category/<category>')
+@cached_view('category:{category}')
 def category(category):
-    # Usar servicio para obtener recetas por categoría
-    recipes = RecipeService.get_recipes_by_category(category)
-    return render_template('category.html', recipes=recipes, category=category)
+    # Usar servicio para obtener recetas por categoría (paginadas por cursor)
+    recipes, next_cursor = _recipes_page(category)
+    return render_template('category.html', recipes=recipes, category=category, next_cursor=next_cursor)
+
+# Búsqueda de texto completo en recetas
+@main.route('/search')
+@cached_view('recipes')
+def search():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    results, has_more = RecipeService.search(query, page=page, per_page=current_app.config['RECIPES_PER_PAGE']) \
+        if query else ([], False)
+    results = [(recipe, render_snippet(hit.snippet)) for recipe, hit in results]
+    return render_template('search.html', query=query, results=results, page=page, has_more=has_more)
+
+# ¿Qué puedo cocinar? Recetas ordenadas por cobertura de los ingredientes de la despensa
+@main.route('/cook')
+@cached_view('recipes')
+def cook():
+    pantry = request.args.get('ingredients', '').strip()
+    page = request.args.get('page', 1, type=int)
+    results, has_more = PantryService.what_can_i_cook(pantry, page=page,
+                                                      per_page=current_app.config['RECIPES_PER_PAGE']) \
+        if pantry else ([], False)
+    return render_template('cook.html', pantry=pantry, results=results, page=page, has_more=has_more)
+
+# Recomendaciones: recetas recientes de los usuarios más similares (feed precalculado)
+@main.route('/feed')
+@login_required
+def feed():
+    try:
+        recipes, next_cursor = FeedService.get_feed_page(current_user.id, cursor=request.args.get('cursor'),
+                                                         per_page=current_app.config['RECIPES_PER_PAGE'])
+    except ValueError:
+        abort(400)
+    return render_template('feed.html', recipes=recipes, next_cursor=next_cursor)
 
 # Perfil de usuario
 @main.route('/user/<int:user_id>')
+@cached_view('user:{user_id}', 'similar:{user_id}', 'similarities')
 def user_profile(user_id):
     # Usar servicios para obtener datos
     user = UserService.get_user_by_id(user_id)
@@ -164,20 +209,32 @@ def edit_recipe(recipe_id):
                                   steps=request.form['steps'],
                                   category=request.form['category'])
 
-        # Usar estrategia de matching para encontrar usuarios similares
-        SimilarityService.clear_user_similarities(current_user.id)
-        all_recipes = RecipeService.get_other_users_recipes(current_user.id)
-        new_ingredients = set([i.strip().lower() for i in recipe.ingredients.split(',')])
-        
-        # Usar Factory para crear estrategia de matching
-        strategy = MatchingStrategyFactory.create_strategy("ingredient_overlap", min_common_ingredients=2)
-        matched_user_ids = strategy.find_similar_users(new_ingredients, all_recipes)
-        
-        # Crear relaciones bidireccionales usando servicios
-        for uid in matched_user_ids:
-            SimilarityService.create_similarity_relationship(current_user.id, uid)
-        
-        db.session.commit()
-        flash('Receta actualizada exitosamente. Se han actualizado tus usuarios similares.')
+        # Recalcular usuarios similares en segundo plano (la respuesta no espera al matching)
+        if schedule_similarity_update(current_user.id):
+            flash('Receta actualizada exitosamente. Tus usuarios similares se actualizarán en unos instantes.')
+        else:
+            flash('Receta actualizada exitosamente. Se han actualizado tus usuarios similares.')
         return redirect(url_for('.recipe_detail', recipe_id=recipe.id))
     return render_template('edit_recipe.html', recipe=recipe)
+
+# Copia del catálogo (usuarios, recetas y similitudes) en JSON Lines, generada en streaming
+@main.route('/export.jsonl')
+@login_required
+def export():
+    compression = request.args.get('compression', 'none')
+    if compression not in available_compressions():
+        abort(400)
+    body = compress(export_lines(export_records()), compression)
+    return current_app.response_class(
+        stream_with_context(body), mimetype=MIMETYPES[compression],
+        headers={'Content-Disposition': f'attachment; filename=recetas.jsonl{EXTENSIONS[compression]}'})
+
+# Métricas de la cola de recálculo (profundidad y retraso)
+@main.route('/jobs/metrics')
+def job_metrics():
+    return jsonify(JobQueue.metrics())
+
+# Aciertos y fallos de la caché de páginas de este proceso
+@main.route('/cache/metrics')
+def cache_metrics():
+    return jsonify(cache.metrics())
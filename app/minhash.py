@@ -0,0 +1,116 @@
+# Firmas MinHash e índice LSH por bandas para buscar usuarios similares de forma aproximada
+# Cada usuario se resume en un vector fijo de enteros; dos usuarios caen en el mismo cubo de una
+# banda con probabilidad alta cuando la similitud de Jaccard de sus ingredientes es alta
+
+import random
+from array import array
+from collections import defaultdict
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+
+
+def _hash_name(name: str) -> int:
+    """Hash estable (entre procesos) de un ingrediente normalizado"""
+    return int.from_bytes(blake2b(name.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class MinHasher:
+    """Genera firmas MinHash de tamaño fijo con permutaciones universales (a*x + b) mod p"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                        for _ in range(num_perm)]
+
+    def signature(self, names: Iterable[str]) -> List[int]:
+        """Firma de un conjunto de ingredientes (todo a 0xFFFFFFFF si está vacío)"""
+        signature = [_MAX_HASH] * self.num_perm
+        for name in set(names):
+            x = _hash_name(name)
+            for i, (a, b) in enumerate(self._params):
+                value = ((a * x + b) % _MERSENNE_PRIME) & _MAX_HASH
+                if value < signature[i]:
+                    signature[i] = value
+        return signature
+
+    @staticmethod
+    def merge(signature: Sequence[int], other: Sequence[int]) -> List[int]:
+        """Firma de la unión de dos conjuntos (permite añadir ingredientes de forma incremental)"""
+        return [min(a, b) for a, b in zip(signature, other)]
+
+    @staticmethod
+    def to_bytes(signature: Sequence[int]) -> bytes:
+        """Serializa la firma como array de enteros sin signo de 32 bits"""
+        return array('I', signature).tobytes()
+
+    @staticmethod
+    def from_bytes(data: bytes) -> List[int]:
+        """Reconstruye una firma serializada con to_bytes"""
+        values = array('I')
+        values.frombytes(data)
+        return values.tolist()
+
+    @staticmethod
+    def estimate_jaccard(signature: Sequence[int], other: Sequence[int]) -> float:
+        """Estimación de la similitud de Jaccard a partir de dos firmas"""
+        if not signature:
+            return 0.0
+        return sum(1 for a, b in zip(signature, other) if a == b) / len(signature)
+
+
+def band_hashes(signature: Sequence[int], bands: int, rows: int) -> List[Tuple[int, int]]:
+    """Divide la firma en bandas de `rows` valores y devuelve (banda, cubo) para cada una"""
+    if bands * rows > len(signature):
+        raise ValueError(f"La firma tiene {len(signature)} valores; no alcanza para {bands}x{rows} bandas")
+    buckets = []
+    for band in range(bands):
+        chunk = array('I', signature[band * rows:(band + 1) * rows]).tobytes()
+        # 63 bits para que el cubo quepa en una columna BIGINT con signo
+        bucket = int.from_bytes(blake2b(chunk, digest_size=8).digest(), 'little') & 0x7FFFFFFFFFFFFFFF
+        buckets.append((band, bucket))
+    return buckets
+
+
+def candidate_probability(jaccard: float, bands: int, rows: int) -> float:
+    """Probabilidad de que dos conjuntos con esa similitud compartan al menos un cubo"""
+    return 1 - (1 - jaccard ** rows) ** bands
+
+
+class LSHIndex:
+    """Índice LSH en memoria (banda, cubo) -> usuarios; útil para pruebas y benchmarks"""
+
+    def __init__(self, bands: int = 16, rows: int = 4):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._signatures: Dict[int, List[int]] = {}
+
+    def add(self, user_id: int, signature: Sequence[int]) -> None:
+        """Inserta o reemplaza la firma de un usuario"""
+        self.remove(user_id)
+        self._signatures[user_id] = list(signature)
+        for key in band_hashes(signature, self.bands, self.rows):
+            self._buckets[key].add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        """Elimina a un usuario del índice"""
+        signature = self._signatures.pop(user_id, None)
+        if signature is None:
+            return
+        for key in band_hashes(signature, self.bands, self.rows):
+            self._buckets[key].discard(user_id)
+
+    def candidates(self, signature: Sequence[int]) -> Set[int]:
+        """Usuarios que comparten al menos un cubo con la firma dada"""
+        found = set()
+        for key in band_hashes(signature, self.bands, self.rows):
+            found |= self._buckets.get(key, set())
+        return found
+
+    def signature_of(self, user_id: int) -> List[int]:
+        """Firma almacenada de un usuario"""
+        return self._signatures[user_id]
@@ -18,6 +18,13 @@ class User(UserMixin, db.Model):
 
 class Recipe(db.Model):
     __tablename__ = 'recipes'
+    __table_args__ = (
+        # Paginación por cursor (timestamp, id) en el listado general y por categoría
+        db.Index('ix_recipes_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_recipes_category_timestamp_id', 'category', 'timestamp', 'id'),
+        # Recetas de un autor por fecha (y búsquedas por la clave ajena author_id)
+        db.Index('ix_recipes_author_timestamp_id', 'author_id', 'timestamp', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(128), nullable=False)
     description = db.Column(db.Text, nullable=False)  # Descripción corta de la receta
@@ -26,12 +33,125 @@ class Recipe(db.Model):
     category = db.Column(db.String(64))  # Desayuno, Almuerzo, Cena, Postre, etc.
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+# Índice invertido de ingredientes: receta <-> ingrediente normalizado
+recipe_ingredients = db.Table(
+    'recipe_ingredients',
+    db.Column('recipe_id', db.Integer, db.ForeignKey('recipes.id'), primary_key=True),
+    db.Column('ingredient_id', db.Integer, db.ForeignKey('ingredients.id'), primary_key=True),
+    # Nº de ingredientes de la receta (desnormalizado) para recorrer cada lista por tamaño en "¿Qué puedo cocinar?"
+    db.Column('recipe_size', db.Integer, nullable=False, default=0, server_default='0'),
+    db.Index('ix_recipe_ingredients_ingredient_recipe', 'ingredient_id', 'recipe_id'),
+    db.Index('ix_recipe_ingredients_ingredient_size', 'ingredient_id', 'recipe_size', 'recipe_id')
+)
+
+class Ingredient(db.Model):
+    __tablename__ = 'ingredients'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(128), unique=True, index=True, nullable=False)
+
+class UserIngredient(db.Model):
+    __tablename__ = 'user_ingredients'
+    __table_args__ = (
+        db.Index('ix_user_ingredients_ingredient_user', 'ingredient_id', 'user_id'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id'), primary_key=True)
+    recipe_count = db.Column(db.Integer, nullable=False, default=0)  # Recetas del usuario que lo usan
+
+class UserCategory(db.Model):
+    __tablename__ = 'user_categories'
+    __table_args__ = (
+        db.Index('ix_user_categories_category_user', 'category', 'user_id'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category = db.Column(db.String(64), primary_key=True)
+    recipe_count = db.Column(db.Integer, nullable=False, default=0)  # Histograma de categorías del usuario
+
+class UserSignature(db.Model):
+    __tablename__ = 'user_signatures'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False)  # Firma MinHash como array('I')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class LSHBucket(db.Model):
+    __tablename__ = 'lsh_buckets'
+    __table_args__ = (
+        db.Index('ix_lsh_buckets_user', 'user_id'),
+    )
+    band = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
 
 class SimilarUser(db.Model):
     __tablename__ = 'similar_users'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'similar_user_id', name='uq_similar_users_pair'),
+        # Relaciones que tocan a un usuario en sentido inverso (recálculos parciales)
+        db.Index('ix_similar_users_similar_user', 'similar_user_id', 'user_id'),
+        # Top-K de un usuario por puntuación leyendo solo el índice (get_similar_users)
+        db.Index('ix_similar_users_user_score', 'user_id', 'score', 'similar_user_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     similar_user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    score = db.Column(db.Float)  # Puntuación de la estrategia que creó la relación (si la hay)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    strategy = db.Column(db.String(32))  # posting:jaccard, indexed:jaccard, matrix:cosine...
+
+class FeedItem(db.Model):
+    """Feed precalculado: recetas recientes de los usuarios más similares, ya ordenadas"""
+    __tablename__ = 'feed_items'
+    __table_args__ = (
+        db.Index('ix_feed_items_user_rank', 'user_id', 'rank', 'recipe_id'),
+        db.Index('ix_feed_items_recipe', 'recipe_id'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipes.id'), primary_key=True)
+    # log2(similitud) + días desde 1970 / vida media: ordena igual que similitud x decaimiento por antigüedad
+    # sin depender de la fecha actual, así que no hay que recalcularlo con el paso del tiempo
+    rank = db.Column(db.Float, nullable=False)
+
+class RecipeSummary(db.Model):
+    """Resumen desnormalizado de cada receta con lo que muestran los listados (portada y categorías)"""
+    __tablename__ = 'recipe_summaries'
+    __table_args__ = (
+        db.Index('ix_recipe_summaries_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_recipe_summaries_category_timestamp_id', 'category', 'timestamp', 'id'),
+    )
+    id = db.Column(db.Integer, db.ForeignKey('recipes.id'), primary_key=True)
+    title = db.Column(db.String(128), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    author_username = db.Column(db.String(64))
+    category = db.Column(db.String(64))
+    timestamp = db.Column(db.DateTime)
+    excerpt = db.Column(db.String(150), nullable=False)  # Primeros caracteres de la descripción
+    truncated = db.Column(db.Boolean, nullable=False, default=False)  # Si la descripción es más larga
+
+class ImportCheckpoint(db.Model):
+    """Progreso de una importación: se guarda en la misma transacción que cada bloque de recetas"""
+    __tablename__ = 'import_checkpoints'
+    key = db.Column(db.String(512), primary_key=True)  # Ruta absoluta del fichero salvo que se indique otra
+    source = db.Column(db.String(1024), nullable=False)
+    line = db.Column(db.Integer, nullable=False, default=0)  # Última línea confirmada
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    indexed = db.Column(db.Boolean, nullable=False, default=True)  # Si el recálculo final terminó
+
+class SimilarityJob(db.Model):
+    __tablename__ = 'similarity_jobs'
+    __table_args__ = (
+        db.Index('ix_similarity_jobs_status_enqueued', 'status', 'enqueued_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)  # Un trabajo por usuario
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, running, failed
+    version = db.Column(db.Integer, nullable=False, default=1)  # Aumenta con cada edición coalescida
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -0,0 +1,118 @@
+# Normalización canónica de ingredientes
+# Único punto que convierte el texto libre de una receta ("200g de harina; 3 tomates maduros") en nombres
+# canónicos ("harina", "tomate maduro"): separa por comas, punto y coma o saltos de línea, quita cantidades y
+# unidades, pasa a minúsculas sin tildes (se conserva la ñ), reduce los plurales y aplica la tabla de sinónimos.
+# Las expresiones regulares y las tablas se compilan una sola vez al importar el módulo; los textos repetidos
+# se resuelven con una caché LRU.
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional
+
+_SEPARATORS = re.compile(r'[,;\n]')
+_ACCENTS = str.maketrans('áéíóúüàèìòùâêîôû', 'aeiouuaeiouaeiou')
+
+_NUMBER_WORDS = ('un', 'una', 'unos', 'unas', 'medio', 'media', 'dos', 'tres', 'cuatro', 'cinco', 'seis',
+                 'siete', 'ocho', 'nueve', 'diez', 'docena', 'algunos', 'algunas', 'varios', 'varias')
+_UNITS = ('g', 'gr', 'grs', 'gramo', 'gramos', 'kg', 'kilo', 'kilos', 'mg', 'ml', 'cl', 'dl', 'l', 'litro',
+          'litros', 'cc', 'oz', 'lb', 'cda', 'cdas', 'cdta', 'cdtas', 'cucharada', 'cucharadas', 'cucharadita',
+          'cucharaditas', 'taza', 'tazas', 'vaso', 'vasos', 'pizca', 'pizcas', 'puñado', 'puñados', 'chorro',
+          'chorros', 'chorrito', 'chorritos', 'diente', 'dientes', 'lata', 'latas', 'bote', 'botes', 'sobre',
+          'sobres', 'paquete', 'paquetes', 'unidad', 'unidades', 'rama', 'ramas', 'ramita', 'ramitas', 'hoja',
+          'hojas', 'rodaja', 'rodajas', 'loncha', 'lonchas', 'trozo', 'trozos', 'pellizco', 'pellizcos',
+          'manojo', 'manojos', 'cabeza', 'cabezas', 'tarro', 'tarros')
+_UNIT = r'(?:%s)' % '|'.join(sorted(_UNITS, key=len, reverse=True))
+_NUMBER = r'(?:\d+(?:[.,/]\d+)?(?=%s\b|\W|$)|[½¼¾⅓]|(?:%s)\b)' % (_UNIT, '|'.join(_NUMBER_WORDS))
+# "200g", "2 dientes de ajo", "1/2 kg de", "una pizca de", "lata de": cantidad y/o unidad al principio
+_QUANTITY = re.compile(
+    rf'^(?:{_NUMBER}(?:\s*(?:-|a|o|y)?\s*{_NUMBER})*\s*(?:{_UNIT}\.?(?=\s|$))?\s*(?:de\s+)?|{_UNIT}\s+de\s+)')
+_TRAILING_QUANTITY = re.compile(rf'\s+\d+(?:[.,/]\d+)?\s*(?:{_UNIT})?$')  # "harina 200 g"
+_NOISE = re.compile(r'\([^)]*\)|\b(?:al gusto|opcional|c/?s|cantidad necesaria|a ser posible)\b|[.:*]')
+_SPACES = re.compile(r'\s+')
+
+_INVARIANT = frozenset({'anis', 'cuscus', 'ananas', 'gas', 'mas', 'pais', 'menos', 'tres', 'seis'})
+# Lemas que no siguen las reglas de plural
+_LEMMAS: Dict[str, str] = {
+    'carnes': 'carne', 'verdes': 'verde', 'grandes': 'grande', 'dulces': 'dulce', 'hojaldres': 'hojaldre',
+    'especies': 'especie', 'nueces': 'nuez', 'maices': 'maiz', 'arroces': 'arroz', 'raices': 'raiz',
+}
+# Sinónimos y variantes regionales -> nombre canónico (claves y valores ya en singular)
+_SYNONYMS: Dict[str, str] = {
+    'papa': 'patata', 'jitomate': 'tomate', 'palta': 'aguacate', 'durazno': 'melocoton', 'frutilla': 'fresa',
+    'frijol': 'judia', 'alubia': 'judia', 'poroto': 'judia', 'habichuela': 'judia', 'ejote': 'judia verde',
+    'arveja': 'guisante', 'chicharo': 'guisante', 'elote': 'maiz', 'choclo': 'maiz', 'betabel': 'remolacha',
+    'zapallo': 'calabaza', 'chile': 'guindilla', 'aji': 'guindilla', 'cilantro fresco': 'cilantro',
+    'aove': 'aceite de oliva', 'aceite oliva': 'aceite de oliva', 'aceite de oliva virgen': 'aceite de oliva',
+    'aceite de oliva virgen extra': 'aceite de oliva', 'huevo de gallina': 'huevo', 'huevo campero': 'huevo',
+    'azucar blanco': 'azucar', 'azucar blanca': 'azucar', 'harina de trigo': 'harina', 'sal fina': 'sal',
+    'agua del grifo': 'agua', 'diente de ajo': 'ajo', 'pimenton dulce': 'pimenton',
+}
+
+
+def _lemma(word: str) -> str:
+    """Singular de una palabra ya en minúsculas y sin tildes"""
+    if word in _LEMMAS:
+        return _LEMMAS[word]
+    if len(word) <= 3 or word in _INVARIANT or not word.endswith('s'):
+        return word
+    if word.endswith('ces'):
+        return word[:-3] + 'z'  # nueces -> nuez
+    if word.endswith('es') and word[-3] in 'lnrdjy':
+        return word[:-2]  # limones -> limon, caracoles -> caracol
+    if word[-2] in 'aeiou':
+        return word[:-1]  # tomates -> tomate, huevos -> huevo
+    return word
+
+
+def _canonical(phrase: str) -> str:
+    return ' '.join(_lemma(word) for word in phrase.split(' '))
+
+
+@lru_cache(maxsize=65536)
+def normalize_ingredient(name: str) -> str:
+    """Nombre canónico de un ingrediente ("3 Tomates maduros" -> "tomate maduro"); cadena vacía si no queda nada"""
+    text = _SPACES.sub(' ', _NOISE.sub(' ', name.lower().translate(_ACCENTS))).strip()
+    text = _TRAILING_QUANTITY.sub('', _QUANTITY.sub('', text)).strip()
+    if not text:
+        return ''
+    text = _canonical(text)
+    return _SYNONYMS.get(text, text)
+
+
+@lru_cache(maxsize=8192)
+def normalize_ingredients(text: Optional[str]) -> FrozenSet[str]:
+    """Conjunto de nombres canónicos de un texto de ingredientes (comas, punto y coma o líneas)"""
+    if not text:
+        return frozenset()
+    names = (normalize_ingredient(part) for part in _SEPARATORS.split(text))
+    return frozenset(name for name in names if name)
+
+
+def tidy_text(text: Optional[str]) -> str:
+    """Texto de ingredientes con los espacios limpios: sin espacios repetidos ni líneas vacías
+
+    Cantidades, mayúsculas, tildes, orden y separadores se conservan: es el texto que ve el autor. Los nombres
+    canónicos solo se guardan en el índice de ingredientes (normalize_ingredients).
+    """
+    lines = (_SPACES.sub(' ', line).strip() for line in (text or '').splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def load_synonyms(lines: Iterable[str]) -> int:
+    """Añade sinónimos con líneas "variante = canónico" (# comenta); devuelve cuántos se cargaron
+
+    Se llama una vez al arrancar (INGREDIENT_SYNONYMS_FILE) y vacía las cachés para no servir nombres antiguos.
+    """
+    loaded = 0
+    for line in lines:
+        line = line.split('#', 1)[0]
+        if '=' not in line:
+            continue
+        alias, canonical = (_canonical(_SPACES.sub(' ', part.lower().translate(_ACCENTS)).strip())
+                            for part in line.split('=', 1))
+        if alias and canonical:
+            _SYNONYMS[alias] = canonical
+            loaded += 1
+    normalize_ingredient.cache_clear()
+    normalize_ingredients.cache_clear()
+    return loaded
@@ -0,0 +1,89 @@
+# Motor de "¿Qué puedo cocinar?": recetas ordenadas por la fracción de sus ingredientes que ya tengo
+# Algoritmo de umbral (Fagin/WAND) sobre las listas ingrediente -> recetas del índice recipe_ingredients,
+# recorridas por tamaño de receta creciente. Una receta aún no vista que contenga j ingredientes de la
+# despensa tiene como mínimo el tamaño de la j-ésima frontera más pequeña, así que su cobertura no puede
+# superar j / frontera; en cuanto el K-ésimo resultado supera esa cota se deja de leer.
+
+import heapq
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Tuple
+from . import db
+from .database import _IN_CLAUSE_CHUNK, _chunks
+from .models import recipe_ingredients
+
+CoverageHit = namedtuple('CoverageHit', ['recipe_id', 'coverage', 'matched', 'size'])
+
+
+def _rank_key(hit: CoverageHit) -> Tuple[float, int, int]:
+    """Mayor cobertura primero; a igualdad, recetas más sencillas y después las más recientes"""
+    return hit.coverage, -hit.size, hit.recipe_id
+
+
+def unseen_upper_bound(frontiers: Iterable[int]) -> float:
+    """Cobertura máxima posible de una receta que todavía no ha aparecido en ninguna lista"""
+    best = 0.0
+    for j, size in enumerate(sorted(frontiers), start=1):
+        best = max(best, min(1.0, j / size) if size else 1.0)
+    return best
+
+
+def top_recipes_by_coverage(ingredient_ids: Iterable[int], k: int, batch: int = 256) -> List[CoverageHit]:
+    """Las K recetas con mayor cobertura de los ingredientes dados (sin recorrer las listas completas)"""
+    pantry = sorted(set(ingredient_ids))
+    if not pantry or k <= 0:
+        return []
+    table = recipe_ingredients
+    cursors: Dict[int, Optional[Tuple[int, int]]] = dict.fromkeys(pantry)
+    frontiers: Dict[int, int] = dict.fromkeys(pantry, 0)
+    seen = set()
+    top: List[Tuple[Tuple[float, int, int], CoverageHit]] = []  # Montículo de mínimos con los K mejores
+
+    while frontiers:
+        sizes: Dict[int, int] = {}
+        for ingredient_id in list(frontiers):
+            query = db.select([table.c.recipe_id, table.c.recipe_size]).where(table.c.ingredient_id == ingredient_id)
+            cursor = cursors[ingredient_id]
+            if cursor is not None:
+                query = query.where(db.or_(table.c.recipe_size > cursor[0],
+                                           db.and_(table.c.recipe_size == cursor[0],
+                                                   table.c.recipe_id > cursor[1])))
+            rows = db.session.execute(query.order_by(table.c.recipe_size, table.c.recipe_id).limit(batch)).fetchall()
+            for recipe_id, size in rows:
+                if recipe_id not in seen:
+                    sizes[recipe_id] = size
+            if len(rows) < batch:
+                del frontiers[ingredient_id]  # Lista agotada: ya no puede aportar recetas nuevas
+            else:
+                cursors[ingredient_id] = (rows[-1].recipe_size, rows[-1].recipe_id)
+                frontiers[ingredient_id] = rows[-1].recipe_size
+
+        # Acceso aleatorio: ingredientes de la despensa que tiene cada receta nueva
+        matched = _matched_counts(list(sizes), pantry)
+        for recipe_id, size in sizes.items():
+            seen.add(recipe_id)
+            hit = CoverageHit(recipe_id, matched[recipe_id] / size if size else 0.0, matched[recipe_id], size)
+            item = (_rank_key(hit), hit)
+            if len(top) < k:
+                heapq.heappush(top, item)
+            elif item[0] > top[0][0]:
+                heapq.heapreplace(top, item)
+
+        if len(top) == k and frontiers:
+            kth = top[0][1]
+            bound = unseen_upper_bound(frontiers.values())
+            if kth.coverage > bound or (kth.coverage == bound and kth.size < min(frontiers.values())):
+                break
+    return [hit for _, hit in sorted(top, reverse=True)]
+
+
+def _matched_counts(recipe_ids: List[int], pantry: List[int]) -> Dict[int, int]:
+    counts: Dict[int, int] = dict.fromkeys(recipe_ids, 0)
+    table = recipe_ingredients
+    for block in _chunks(recipe_ids, _IN_CLAUSE_CHUNK):
+        rows = db.session.execute(
+            db.select([table.c.recipe_id, db.func.count()])
+            .where(table.c.recipe_id.in_(block))
+            .where(table.c.ingredient_id.in_(pantry))
+            .group_by(table.c.recipe_id)).fetchall()
+        counts.update(rows)
+    return counts
@@ -0,0 +1,117 @@
+# Recálculo de similitudes repartido entre varios procesos
+# El proceso principal escribe en un fichero temporal, como arrays de enteros, los ingredientes de cada usuario
+# y las listas invertidas ingrediente -> usuarios. Cada worker lo abre con mmap (solo lectura): el sistema
+# operativo comparte las mismas páginas entre todos los procesos y no hay que serializar el catálogo. Los
+# usuarios a recalcular se reparten en porciones; cada worker puntúa la suya y devuelve solo sus top-K, que el
+# proceso principal une y guarda con una única escritura (SimilarityService._store_neighbours).
+
+import heapq
+import mmap
+import os
+import tempfile
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_ALIGNMENT = 8
+_SHARD_SIZE = 256  # Usuarios por tarea: porciones pequeñas reparten mejor la carga entre workers
+
+# Estado de cada worker (lo rellena _attach al arrancar el proceso)
+_views: Dict[str, memoryview] = {}
+_sizes: List[int] = []  # Tamaño de cada usuario como lista: se consulta por cada candidato
+_mapping: Optional[mmap.mmap] = None
+
+
+def _layout(user_sets: Dict[int, Set[int]]) -> Dict[str, array]:
+    """Arrays CSR: ids de usuario, desplazamientos e ingredientes por usuario y usuarios por ingrediente"""
+    user_ids = array('I', sorted(user_sets))
+    vocabulary: Dict[int, int] = {}
+    user_ptr, user_items = array('q', [0]), array('I')
+    for user_id in user_ids:
+        user_items.extend(sorted(vocabulary.setdefault(ingredient_id, len(vocabulary))
+                                 for ingredient_id in user_sets[user_id]))
+        user_ptr.append(len(user_items))
+    # Listas invertidas por recuento (posiciones de usuario, no ids)
+    counts = array('q', [0]) * (len(vocabulary) + 1)
+    for column in user_items:
+        counts[column + 1] += 1
+    posting_ptr = array('q', [0]) * (len(vocabulary) + 1)
+    for column in range(len(vocabulary)):
+        posting_ptr[column + 1] = posting_ptr[column] + counts[column + 1]
+    posting_users = array('I', [0]) * len(user_items)
+    fill = array('q', posting_ptr[:-1])
+    for position in range(len(user_ids)):
+        for column in user_items[user_ptr[position]:user_ptr[position + 1]]:
+            posting_users[fill[column]] = position
+            fill[column] += 1
+    user_sizes = array('I', (user_ptr[i + 1] - user_ptr[i] for i in range(len(user_ids))))
+    return {'user_ids': user_ids, 'user_ptr': user_ptr, 'user_items': user_items, 'user_sizes': user_sizes,
+            'posting_ptr': posting_ptr, 'posting_users': posting_users}
+
+
+def _write(arrays: Dict[str, array], path: str) -> Dict[str, Tuple[str, int, int]]:
+    """Escribe los arrays alineados en un fichero; devuelve nombre -> (tipo, desplazamiento, bytes)"""
+    spans, offset = {}, 0
+    with open(path, 'wb') as output:
+        for name, values in arrays.items():
+            data = values.tobytes()
+            spans[name] = (values.typecode, offset, len(data))
+            padding = -len(data) % _ALIGNMENT
+            output.write(data + b'\0' * padding)
+            offset += len(data) + padding
+        if offset == 0:
+            output.write(b'\0' * _ALIGNMENT)  # mmap no admite ficheros vacíos
+    return spans
+
+
+def _attach(path: str, spans: Dict[str, Tuple[str, int, int]]) -> None:
+    """Inicializador de cada worker: abre el fichero compartido con mmap una sola vez"""
+    global _mapping, _sizes
+    with open(path, 'rb') as source:
+        _mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(_mapping)
+    for name, (typecode, offset, size) in spans.items():
+        _views[name] = buffer[offset:offset + size].cast(typecode)
+    _sizes = _views['user_sizes'].tolist()
+
+
+def score_positions(positions: Iterable[int], min_common: int, top_k: int) -> Dict[int, Dict[int, float]]:
+    """Top-K por Jaccard de los usuarios en esas posiciones contra todos los demás (en un worker)"""
+    user_ids, user_ptr, user_items = _views['user_ids'], _views['user_ptr'], _views['user_items']
+    posting_ptr, posting_users = _views['posting_ptr'], _views['posting_users']
+    sizes = _sizes
+    results = {}
+    for position in positions:
+        counts = Counter()
+        for column in user_items[user_ptr[position]:user_ptr[position + 1]]:
+            counts.update(posting_users[posting_ptr[column]:posting_ptr[column + 1]])
+        size = sizes[position]
+        scored = [(-common / (size + sizes[other] - common), other)
+                  for other, common in counts.items() if common >= min_common and other != position]
+        # Mismo orden que SimilarityService._best: mayor puntuación y, a igualdad, menor id (las posiciones
+        # siguen el orden de los ids)
+        results[user_ids[position]] = {user_ids[other]: -score for score, other in heapq.nsmallest(top_k, scored)}
+    return results
+
+
+def score_in_parallel(user_sets: Dict[int, Set[int]], targets: List[int], min_common: int, top_k: int,
+                      workers: int) -> Dict[int, Dict[int, float]]:
+    """Vecinos top-K por Jaccard de `targets`, repartidos entre `workers` procesos"""
+    arrays = _layout(user_sets)
+    position_of = {user_id: position for position, user_id in enumerate(arrays['user_ids'])}
+    positions = sorted(position_of[user_id] for user_id in targets if user_id in position_of)
+    shards = [positions[start:start + _SHARD_SIZE] for start in range(0, len(positions), _SHARD_SIZE)]
+    neighbours: Dict[int, Dict[int, float]] = {user_id: {} for user_id in targets}
+    handle, path = tempfile.mkstemp(prefix='similarity-', suffix='.bin')
+    os.close(handle)
+    try:
+        spans = _write(arrays, path)
+        del arrays  # El proceso principal no necesita más su copia
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(path, spans)) as executor:
+            for result in executor.map(score_positions, shards, [min_common] * len(shards),
+                                       [top_k] * len(shards)):
+                neighbours.update(result)
+    finally:
+        os.remove(path)
+    return neighbours
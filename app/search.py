@@ -0,0 +1,470 @@
+# Búsqueda de texto completo en recetas (título, descripción, ingredientes y pasos)
+# En SQLite se usa una tabla virtual FTS5 sincronizada con triggers sobre `recipes`, con ranking BM25,
+# prefijos ("torti*") y fragmentos resaltados. Si FTS5 no está disponible (otro motor o SQLite
+# compilado sin él) se usa un índice invertido en memoria con el mismo ranking, construido al primer uso y
+# puesto al día cada SEARCH_CHECK_SECONDS con las recetas que escriben otros procesos.
+
+import bisect
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict, namedtuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from . import db
+from .cache import LRUCache
+from .catalogue import recipes_signature
+from .database import _IN_CLAUSE_CHUNK, _chunks
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'recipes_fts'
+FTS_TERMS = 'recipes_fts_terms'  # fts5vocab: documentos por término (para el IDF)
+FIELDS = ('title', 'description', 'ingredients', 'steps')
+FIELD_WEIGHTS = (10.0, 2.0, 5.0, 1.0)  # Peso BM25 de cada campo (mismo orden que FIELDS)
+BM25_K1, BM25_B = 1.2, 0.75
+SNIPPET_TOKENS = 12
+MIN_PREFIX = 2  # Prefijos más cortos recorrerían todo el vocabulario; se buscan como término exacto
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'  # Marcadores internos; se convierten a <mark> al escapar
+_WORD = re.compile(r'\w+')
+_QUERY_WORD = re.compile(r'(\w+)(\*?)')
+_MARKED = re.compile(_MARK_OPEN + '(.*?)' + _MARK_CLOSE)
+_LAST_CHAR = '\uffff'  # Cota superior de los términos que empiezan por un prefijo
+
+SearchHit = namedtuple('SearchHit', ['recipe_id', 'score', 'snippet'])
+QueryTerm = namedtuple('QueryTerm', ['term', 'prefix'])
+
+_FTS_DDL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, ingredients, steps,
+        content='recipes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5')""",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TERMS} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"""CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, ingredients, steps)
+        VALUES (new.id, new.title, new.description, new.ingredients, new.steps);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, ingredients, steps)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients, old.steps);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE OF title, description, ingredients, steps
+    ON recipes BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, ingredients, steps)
+        VALUES ('delete', old.id, old.title, old.description, old.ingredients, old.steps);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, ingredients, steps)
+        VALUES (new.id, new.title, new.description, new.ingredients, new.steps);
+    END""",
+)
+
+
+def fold(word: str) -> str:
+    """Minúsculas y sin tildes, igual que el tokenizador unicode61 con remove_diacritics"""
+    decomposed = unicodedata.normalize('NFKD', word.lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Términos indexables de un texto"""
+    return [fold(word) for word in _WORD.findall(text or '')]
+
+
+def parse_query(query: Optional[str]) -> List[QueryTerm]:
+    """Términos de una consulta; los que terminan en * son prefijos ("torti*")"""
+    terms = []
+    for word, star in _QUERY_WORD.findall(query or ''):
+        term = fold(word)
+        terms.append(QueryTerm(term, bool(star) and len(term) >= MIN_PREFIX))
+    return terms
+
+
+def _matches(word: str, query_term: QueryTerm) -> bool:
+    return word == query_term.term or (query_term.prefix and word.startswith(query_term.term))
+
+
+def _idf(n_docs: int, df: int) -> float:
+    return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+
+def _bm25(idf: float, tf: float, length: float, avg_length: float) -> float:
+    """BM25 con frecuencias y longitudes ya ponderadas por campo (BM25F simplificado)"""
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+
+def render_snippet(snippet: str) -> Markup:
+    """Escapa el fragmento y resalta las coincidencias con <mark>"""
+    html = str(escape(snippet))
+    return Markup(html.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+def install_fts(connection) -> bool:
+    """Crea la tabla FTS5 y sus triggers y la reconstruye desde `recipes`; devuelve si FTS5 está disponible"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        for statement in _FTS_DDL:
+            connection.execute(text(statement))
+    except OperationalError:
+        logger.warning('SQLite sin FTS5: la búsqueda usará el índice en memoria')
+        return False
+    connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return True
+
+
+@event.listens_for(Recipe.__table__, 'after_create')
+def _create_fts(target, connection, **kw) -> None:
+    install_fts(connection)
+
+
+class InvertedIndex:
+    """Índice invertido en memoria con BM25 por campos ponderados (alternativa a FTS5)"""
+
+    def __init__(self, weights: Sequence[float] = FIELD_WEIGHTS):
+        self.weights = weights
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)  # término -> doc -> tf ponderada
+        self._terms: List[str] = []  # Vocabulario ordenado para las búsquedas por prefijo
+        self._doc_terms: Dict[int, Set[str]] = {}
+        self._lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+        # (nº de recetas, última updated_at) que refleja el índice y momento de la última comprobación
+        self.signature = None
+        self.checked_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._lengths
+
+    def doc_ids(self) -> Set[int]:
+        with self._lock:
+            return set(self._lengths)
+
+    def add(self, doc_id: int, fields: Sequence[Optional[str]]) -> None:
+        """Indexa (o reindexa) un documento con sus campos en el orden de FIELDS"""
+        frequencies: Dict[str, float] = defaultdict(float)
+        length = 0.0
+        for weight, value in zip(self.weights, fields):
+            tokens = tokenize(value)
+            length += weight * len(tokens)
+            for token in tokens:
+                frequencies[token] += weight
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in frequencies.items():
+                if term not in self._postings:
+                    bisect.insort(self._terms, term)
+                self._postings[term][doc_id] = frequency
+            self._doc_terms[doc_id] = set(frequencies)
+            self._lengths[doc_id] = length
+            self._total_length += length
+
+    def remove(self, doc_id: int) -> None:
+        """Elimina un documento del índice"""
+        with self._lock:
+            for term in self._doc_terms.pop(doc_id, ()):
+                postings = self._postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+                    self._terms.pop(bisect.bisect_left(self._terms, term))
+            self._total_length -= self._lengths.pop(doc_id, 0.0)
+
+    def expand(self, query_term: QueryTerm) -> List[str]:
+        """Términos del vocabulario que casan con un término de la consulta"""
+        if not query_term.prefix:
+            return [query_term.term] if query_term.term in self._postings else []
+        start = bisect.bisect_left(self._terms, query_term.term)
+        end = bisect.bisect_left(self._terms, query_term.term + _LAST_CHAR)
+        return self._terms[start:end]
+
+    def search(self, query_terms: Sequence[QueryTerm], limit: int, offset: int = 0) -> List[Tuple[int, float]]:
+        """Documentos que contienen todos los términos, ordenados por BM25"""
+        if not query_terms:
+            return []
+        with self._lock:
+            n_docs = len(self._lengths)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            matches = [self.expand(query_term) for query_term in query_terms]
+            doc_sets = [set().union(*(self._postings[t] for t in expanded)) for expanded in matches]
+            if not all(doc_sets):
+                return []
+            candidates = set.intersection(*sorted(doc_sets, key=len))
+            scores: Dict[int, float] = dict.fromkeys(candidates, 0.0)
+            for expanded in matches:
+                for term in expanded:
+                    postings = self._postings[term]
+                    idf = _idf(n_docs, len(postings))
+                    for doc_id in candidates.intersection(postings):
+                        scores[doc_id] += _bm25(idf, postings[doc_id], self._lengths[doc_id], avg_length)
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return ranked[offset:]
+
+
+def make_snippet(fields: Sequence[Optional[str]], query_terms: Sequence[QueryTerm],
+                 size: int = SNIPPET_TOKENS) -> str:
+    """Fragmento del campo más relevante con las coincidencias marcadas (como snippet() de FTS5)"""
+    def matches(word: str) -> bool:
+        folded = fold(word)
+        return any(_matches(folded, query_term) for query_term in query_terms)
+
+    best = None
+    for weight, value in sorted(zip(FIELD_WEIGHTS, fields), key=lambda item: -item[0]):
+        words = list(_WORD.finditer(value or ''))
+        hits = [i for i, word in enumerate(words) if matches(word.group())]
+        if hits:
+            best = (value, words, hits)
+            break
+    if best is None:
+        value = next((v for v in fields if v), '')
+        best = (value, list(_WORD.finditer(value)), [0])
+    value, words, hits = best
+    if not words:
+        return ''
+    start = max(0, min(hits[0] - size // 4, len(words) - size))
+    window = words[start:start + size]
+    parts, cursor = [], window[0].start()
+    for word in window:
+        parts.append(value[cursor:word.start()])
+        parts.append(_MARK_OPEN + word.group() + _MARK_CLOSE if matches(word.group()) else word.group())
+        cursor = word.end()
+    snippet = ''.join(parts)
+    if start > 0:
+        snippet = '…' + snippet
+    if start + size < len(words):
+        snippet += '…'
+    return snippet
+
+
+class RecipeSearch:
+    """Punto de entrada de la búsqueda: elige FTS5 o el índice en memoria"""
+
+    _lock = threading.Lock()
+
+    @staticmethod
+    def fts_enabled() -> bool:
+        """Indica si la base de datos actual tiene las tablas FTS5"""
+        connection = db.session.connection()
+        if connection.dialect.name != 'sqlite':
+            return False
+        return connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                  {'name': FTS_TERMS}).first() is not None
+
+    @staticmethod
+    def search(query: str, limit: int = 12, offset: int = 0) -> List[SearchHit]:
+        """Recetas que contienen todos los términos de la consulta, ordenadas por relevancia"""
+        query_terms = parse_query(query)
+        if not query_terms:
+            return []
+        if RecipeSearch.fts_enabled():
+            return RecipeSearch._search_fts(query_terms, limit, offset)
+        return RecipeSearch._search_memory(query_terms, limit, offset)
+
+    @staticmethod
+    def refresh(recipe: Recipe) -> None:
+        """Actualiza la receta en el índice en memoria (FTS5 se sincroniza con triggers)"""
+        index = current_app.extensions.get('recipe_search_index')
+        if index is not None:
+            created = recipe.id not in index
+            index.add(recipe.id, [getattr(recipe, field) for field in FIELDS])
+            if index.signature is not None:
+                count, updated_at = index.signature
+                if recipe.updated_at is not None and (updated_at is None or recipe.updated_at > updated_at):
+                    updated_at = recipe.updated_at
+                index.signature = (count + created, updated_at)
+
+    @staticmethod
+    def discard(recipe_id: int) -> None:
+        """Quita una receta del índice en memoria"""
+        index = current_app.extensions.get('recipe_search_index')
+        if index is not None:
+            removed = recipe_id in index
+            index.remove(recipe_id)
+            if index.signature is not None:
+                index.signature = (index.signature[0] - removed, index.signature[1])
+
+    @staticmethod
+    def reset() -> None:
+        """Descarta el índice en memoria y las estadísticas de términos (tras una carga masiva)"""
+        current_app.extensions.pop('recipe_search_index', None)
+        current_app.extensions.pop('recipe_search_stats', None)
+
+    @staticmethod
+    def rebuild() -> bool:
+        """Reconstruye el índice de búsqueda; devuelve si se usa FTS5"""
+        RecipeSearch.reset()
+        enabled = install_fts(db.session.connection())
+        db.session.commit()
+        if not enabled:
+            RecipeSearch._memory_index()
+        return enabled
+
+    @staticmethod
+    def _search_fts(query_terms: List[QueryTerm], limit: int, offset: int) -> List[SearchHit]:
+        """Consulta FTS5 ordenada por bm25() con los pesos de FIELD_WEIGHTS entre todas las coincidencias
+
+        SQLite puntúa cada coincidencia y devuelve solo la página pedida (ORDER BY ... LIMIT); los textos para
+        los fragmentos se leen después solo de esas recetas. Con SEARCH_RANK_WINDOW > 0 se usa en su lugar la
+        aproximación de _search_fts_window.
+        """
+        expression = ' '.join(f'"{t.term}"' + ('*' if t.prefix else '') for t in query_terms)
+        window = current_app.config.get('SEARCH_RANK_WINDOW', 0)
+        if window:
+            return RecipeSearch._search_fts_window(query_terms, expression, max(window, offset + limit), limit,
+                                                   offset)
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        rows = db.session.connection().execute(text(
+            f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :expression ORDER BY score, rowid LIMIT :limit OFFSET :offset"),
+            {'expression': expression, 'limit': limit, 'offset': offset}).fetchall()
+        # bm25() de FTS5 es negativo (más relevante cuanto menor); se devuelve con el signo del índice en memoria
+        return RecipeSearch._hits([(rowid, -score) for rowid, score in rows], query_terms)
+
+    @staticmethod
+    def _search_fts_window(query_terms: List[QueryTerm], expression: str, window: int, limit: int,
+                           offset: int) -> List[SearchHit]:
+        """Aproximación opcional: puntúa en Python solo las `window` coincidencias más recientes
+
+        bm25() recorre todas las coincidencias de cada término, así que con términos muy frecuentes en
+        tablas grandes tarda decenas de milisegundos. Aquí se localiza el rowid a partir del cual están las N
+        coincidencias más nuevas, se obtienen sus frecuencias con highlight() y se aplica el mismo BM25 que el
+        índice en memoria, con el IDF cacheado desde fts5vocab. Las coincidencias más antiguas no aparecen
+        aunque sean más relevantes: es un filtro por recencia y solo se usa si se configura SEARCH_RANK_WINDOW.
+        """
+        connection = db.session.connection()
+        floor = connection.execute(text(
+            f"SELECT min(rowid) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expression "
+            f"ORDER BY rowid DESC LIMIT :window)"), {'expression': expression, 'window': window}).scalar()
+        if floor is None:
+            return []
+        highlights = ', '.join(f'highlight({FTS_TABLE}, {i}, :open, :close)' for i in range(len(FIELDS)))
+        rows = connection.execute(text(
+            f"SELECT rowid, {highlights} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :expression AND rowid >= :floor"),
+            {'open': _MARK_OPEN, 'close': _MARK_CLOSE, 'expression': expression, 'floor': floor}).fetchall()
+
+        candidates = []
+        for row in rows:
+            frequencies, length = [0.0] * len(query_terms), 0.0
+            for weight, marked in zip(FIELD_WEIGHTS, row[1:]):
+                if not marked:
+                    continue
+                length += weight * (marked.count(' ') + 1)
+                for word in _MARKED.findall(marked):
+                    folded = fold(word)
+                    for i, query_term in enumerate(query_terms):
+                        if _matches(folded, query_term):
+                            frequencies[i] += weight
+            candidates.append((row[0], frequencies, length, row[1:]))
+        avg_length = sum(length for _, _, length, _ in candidates) / len(candidates) or 1.0
+        n_docs, dfs = RecipeSearch._term_stats(query_terms)
+        idfs = [_idf(n_docs, min(df, n_docs)) for df in dfs]
+        scored = [(rowid, sum(_bm25(idf, tf, length, avg_length) for idf, tf in zip(idfs, frequencies)), fields)
+                  for rowid, frequencies, length, fields in candidates]
+        top = heapq.nlargest(offset + limit, scored, key=lambda item: (item[1], -item[0]))[offset:]
+        return [SearchHit(rowid, score, make_snippet([_unmark(value) for value in fields], query_terms))
+                for rowid, score, fields in top]
+
+    @staticmethod
+    def _term_stats(query_terms: List[QueryTerm]) -> Tuple[int, List[int]]:
+        """Número de recetas y de documentos por término, cacheados SEARCH_STATS_TTL segundos
+
+        Contar los documentos de un término frecuente cuesta lo mismo que recorrer su lista, pero
+        el IDF apenas varía de una consulta a otra.
+        """
+        app = current_app._get_current_object()
+        stats = app.extensions.get('recipe_search_stats')
+        if stats is None:
+            stats = app.extensions.setdefault('recipe_search_stats',
+                                              LRUCache(10000, app.config.get('SEARCH_STATS_TTL', 300)))
+        connection = db.session.connection()
+
+        def cached(key, statement: str, params: Dict) -> int:
+            value = stats.get(key)
+            if value is None:
+                value = connection.execute(text(statement), params).scalar() or 0
+                stats.set(key, value)
+            return value
+
+        n_docs = cached('docs', 'SELECT count(*) FROM recipes', {})
+        dfs = []
+        for query_term in query_terms:
+            if query_term.prefix:
+                dfs.append(cached(query_term, f"SELECT sum(doc) FROM {FTS_TERMS} WHERE term >= :lo AND term < :hi",
+                                  {'lo': query_term.term, 'hi': query_term.term + _LAST_CHAR}))
+            else:
+                dfs.append(cached(query_term, f"SELECT doc FROM {FTS_TERMS} WHERE term = :term",
+                                  {'term': query_term.term}))
+        return max(n_docs, 1), dfs
+
+    @staticmethod
+    def _search_memory(query_terms: List[QueryTerm], limit: int, offset: int) -> List[SearchHit]:
+        return RecipeSearch._hits(RecipeSearch._memory_index().search(query_terms, limit, offset), query_terms)
+
+    @staticmethod
+    def _hits(ranked: List[Tuple[int, float]], query_terms: List[QueryTerm]) -> List[SearchHit]:
+        """Resultados con fragmento a partir de pares (receta, puntuación) ya ordenados"""
+        texts = {row.id: row for row in db.session.query(Recipe.id, *(getattr(Recipe, f) for f in FIELDS))
+                 .filter(Recipe.id.in_([doc_id for doc_id, _ in ranked]))} if ranked else {}
+        return [SearchHit(doc_id, score, make_snippet(texts[doc_id][1:], query_terms))
+                for doc_id, score in ranked if doc_id in texts]
+
+    @staticmethod
+    def _memory_index(chunk_size: int = 1000) -> InvertedIndex:
+        """Índice en memoria de la aplicación (se construye en una pasada al primer uso y se pone al día con las
+        escrituras de otros procesos cada SEARCH_CHECK_SECONDS)"""
+        app = current_app._get_current_object()
+        with RecipeSearch._lock:
+            index = app.extensions.get('recipe_search_index')
+            if index is None:
+                index = InvertedIndex()
+                # Antes de leer: lo que se escriba durante la construcción se recoge en la siguiente puesta al día
+                index.signature, index.checked_at = recipes_signature(), time.monotonic()
+                rows = db.session.query(Recipe.id, *(getattr(Recipe, f) for f in FIELDS)).yield_per(chunk_size)
+                for row in rows:
+                    index.add(row.id, row[1:])
+                app.extensions['recipe_search_index'] = index
+            elif time.monotonic() - index.checked_at >= app.config['SEARCH_CHECK_SECONDS']:
+                RecipeSearch._catch_up(index, chunk_size)
+            return index
+
+    @staticmethod
+    def _catch_up(index: InvertedIndex, chunk_size: int) -> None:
+        """Aplica al índice las altas, ediciones y bajas de otros procesos desde la última comprobación
+
+        Se reindexan las recetas editadas desde la última updated_at conocida; solo si el número de recetas
+        sigue sin cuadrar (bajas) se comparan los ids del índice con los de la tabla.
+        """
+        index.checked_at = time.monotonic()
+        signature = recipes_signature()
+        if signature == index.signature:
+            return
+        columns = (Recipe.id, *(getattr(Recipe, f) for f in FIELDS))
+        query = db.session.query(*columns)
+        if index.signature is not None and index.signature[1] is not None:
+            query = query.filter(Recipe.updated_at >= index.signature[1])
+        for row in query.yield_per(chunk_size):
+            index.add(row.id, row[1:])
+        if len(index) != signature[0]:
+            stored = {recipe_id for recipe_id, in db.session.query(Recipe.id).yield_per(chunk_size * 10)}
+            indexed = index.doc_ids()
+            for recipe_id in indexed - stored:
+                index.remove(recipe_id)
+            for block in _chunks(sorted(stored - indexed), _IN_CLAUSE_CHUNK):
+                for row in db.session.query(*columns).filter(Recipe.id.in_(block)):
+                    index.add(row.id, row[1:])
+        index.signature = signature
+
+
+def _unmark(value: Optional[str]) -> Optional[str]:
+    return value.replace(_MARK_OPEN, '').replace(_MARK_CLOSE, '') if value else value
@@ -1,10 +1,67 @@
 # Servicios de la aplicación
 # Este archivo contiene servicios especializados para separar la lógica de negocio de las vistas
 
-from typing import List, Set
-from .models import User, Recipe, SimilarUser
+import base64
+import math
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, load_only
+from .models import (User, Recipe, RecipeSummary, SimilarUser, FeedItem, Ingredient, UserIngredient, UserCategory, UserSignature,
+                     LSHBucket, recipe_ingredients)
+from .minhash import MinHasher, band_hashes
+from .cache import invalidate_on_commit
+from .search import RecipeSearch, SearchHit
+from .catalogue import IngredientCatalogue
+from . import summaries
+from .pantry import CoverageHit, top_recipes_by_coverage
+from .factories import RecipeFactory
+from .normalization import normalize_ingredient, normalize_ingredients, tidy_text
+from .database import _IN_CLAUSE_CHUNK, _chunks, reads_from_replica
 from . import db
 
+_hashers: Dict[int, MinHasher] = {}
+
+def _insert_ignore(table, rows: List[Dict]) -> None:
+    """INSERT en bloque (executemany) que ignora filas que violan una restricción única"""
+    if not rows:
+        return
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        statement = insert(table).on_conflict_do_nothing()
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).on_conflict_do_nothing()
+    elif dialect == 'mysql':
+        statement = table.insert().prefix_with('IGNORE')
+    else:
+        statement = table.insert()
+    for block in _chunks(rows, _IN_CLAUSE_CHUNK * 2):
+        connection.execute(statement, block)
+
+def _delete_beyond_rank(table, partition, order_by, limit: int, keys: Optional[Iterable] = None) -> int:
+    """Borra de cada partición (p. ej. cada usuario) las filas que quedan tras las `limit` primeras según `order_by`
+    
+    Con `keys` solo se recortan esas particiones. Devuelve el número de filas borradas.
+    """
+    primary_key = list(table.primary_key.columns)
+    deleted = 0
+    for block in [None] if keys is None else _chunks(list(keys), _IN_CLAUSE_CHUNK):
+        rank = func.row_number().over(partition_by=partition, order_by=order_by)
+        ranked = db.select(primary_key + [rank.label('rank')])
+        if block is not None:
+            ranked = ranked.where(partition.in_(block))
+        ranked = ranked.subquery()
+        beyond = db.select([ranked.c[column.name] for column in primary_key]).where(ranked.c.rank > limit)
+        target = primary_key[0] if len(primary_key) == 1 else db.tuple_(*primary_key)
+        deleted += db.session.execute(table.delete().where(target.in_(beyond))).rowcount
+    return deleted
+
+@reads_from_replica
 class UserService:
     """Servicio responsable únicamente de operaciones relacionadas con usuarios"""
     
@@ -13,6 +70,7 @@ class UserService:
         """Crea un nuevo usuario"""
         user = User(username=username, password_hash=password_hash)
         db.session.add(user)
+        invalidate_on_commit('users')
         db.session.commit()
         return user
     
@@ -30,7 +88,19 @@ class UserService:
     def get_all_users() -> List[User]:
         """Obtiene todos los usuarios ordenados por nombre"""
         return User.query.order_by(User.username.asc()).all()
+    
+    @staticmethod
+    def get_users_page(after: Optional[str] = None, per_page: int = 50) -> Tuple[List[User], Optional[str]]:
+        """Obtiene una página de usuarios ordenados por nombre y el nombre desde el que sigue la siguiente"""
+        query = User.query.order_by(User.username.asc())
+        if after:
+            query = query.filter(User.username > after)
+        users = query.limit(per_page + 1).all()
+        if len(users) > per_page:
+            return users[:per_page], users[per_page - 1].username
+        return users, None
 
+@reads_from_replica
 class RecipeService:
     """Servicio responsable únicamente de operaciones relacionadas con recetas"""
     
@@ -46,74 +116,911 @@ class RecipeService:
             category=category,
             author=author
         )
+        return RecipeService.add_recipe(recipe)
+    
+    @staticmethod
+    def add_recipe(recipe: Recipe) -> Recipe:
+        """Guarda una receta ya construida (por ejemplo, por un factory) y la indexa"""
         db.session.add(recipe)
+        db.session.flush()
+        IngredientIndexService.index_recipe(recipe)
+        CategoryProfileService.adjust(recipe.author_id, recipe.category, 1)
+        RecipeService._invalidate(recipe)
         db.session.commit()
+        RecipeSearch.refresh(recipe)
+        IngredientCatalogue.refresh(recipe)
         return recipe
     
+    @staticmethod
+    def create_recipes(items: List[Dict], author: User) -> List[Recipe]:
+        """Crea varias recetas detalladas en una sola transacción (todas o ninguna)
+        
+        Cada elemento se valida con las reglas de la receta detallada antes de crear ninguna; si
+        alguno falla se lanza ValueError con la posición del elemento.
+        """
+        for position, item in enumerate(items):
+            try:
+                RecipeFactory.validate_detailed(dict(item, author=author))
+            except ValueError as error:
+                raise ValueError(f'Receta {position}: {error}') from error
+        recipes = [RecipeFactory.create_recipe('detailed', **dict(item, author=author)) for item in items]
+        db.session.add_all(recipes)
+        db.session.flush()
+        for recipe in recipes:
+            IngredientIndexService.index_recipe(recipe)
+            CategoryProfileService.adjust(recipe.author_id, recipe.category, 1)
+            RecipeService._invalidate(recipe)
+        db.session.commit()
+        for recipe in recipes:
+            RecipeSearch.refresh(recipe)
+            IngredientCatalogue.refresh(recipe)
+        return recipes
+    
     @staticmethod
     def get_recipe_by_id(recipe_id: int) -> Recipe:
         """Obtiene una receta por su ID"""
         return Recipe.query.get(recipe_id)
     
     @staticmethod
-    def get_all_recipes() -> List[Recipe]:
-        """Obtiene todas las recetas ordenadas por fecha"""
-        return Recipe.query.order_by(Recipe.timestamp.desc()).all()
+    def get_all_recipes(chunk_size: int = 1000) -> Iterator[Recipe]:
+        """Recorre todas las recetas ordenadas por fecha, leyendo de `chunk_size` en `chunk_size`"""
+        return iter(Recipe.query.order_by(Recipe.timestamp.desc()).yield_per(chunk_size))
+    
+    @staticmethod
+    def get_recipes_by_ids(recipe_ids: Iterable[int], columns: Optional[Iterable[str]] = None,
+                           with_author: bool = True) -> List[Recipe]:
+        """Obtiene varias recetas en una consulta, en el orden pedido (las que no existen se omiten)"""
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return []
+        query = RecipeService._query(columns, with_author)
+        found = {recipe.id: recipe for block in _chunks(recipe_ids, _IN_CLAUSE_CHUNK)
+                 for recipe in query.filter(Recipe.id.in_(block))}
+        return [found[recipe_id] for recipe_id in recipe_ids if recipe_id in found]
+    
+    @staticmethod
+    def get_categories() -> List[Tuple[str, int]]:
+        """Categorías con su número de recetas, ordenadas por nombre"""
+        return db.session.query(Recipe.category, func.count(Recipe.id)).filter(Recipe.category.isnot(None)) \
+            .group_by(Recipe.category).order_by(Recipe.category).all()
+    
+    @staticmethod
+    def _query(columns: Optional[Iterable[str]] = None, with_author: bool = True):
+        """Consulta de recetas que solo carga las columnas pedidas (id y timestamp siempre) y, si hace falta, el autor"""
+        query = Recipe.query
+        if columns is not None:
+            query = query.options(load_only(*({'id', 'timestamp'} | set(columns))))
+        if with_author:
+            query = query.options(joinedload(Recipe.author))
+        return query
     
     @staticmethod
-    def get_recipes_by_category(category: str) -> List[Recipe]:
-        """Obtiene recetas por categoría"""
-        return Recipe.query.filter_by(category=category).order_by(Recipe.timestamp.desc()).all()
+    def get_recipes_page(category: Optional[str] = None, cursor: Optional[str] = None, per_page: int = 12,
+                         columns: Optional[Iterable[str]] = None,
+                         with_author: bool = True) -> Tuple[List[Recipe], Optional[str]]:
+        """Obtiene una página de recetas (más recientes primero) y el cursor de la siguiente
+        
+        La paginación es por cursor sobre (timestamp, id), así que cada página usa el índice
+        compuesto sin OFFSET. El autor se carga en la misma consulta; con `columns` solo se leen
+        esas columnas de la receta.
+        """
+        query = RecipeService._query(columns, with_author)
+        if category is not None:
+            query = query.filter(Recipe.category == category)
+        if cursor:
+            timestamp, recipe_id = RecipeService.decode_cursor(cursor)
+            query = query.filter(db.or_(Recipe.timestamp < timestamp,
+                                        db.and_(Recipe.timestamp == timestamp, Recipe.id < recipe_id)))
+        recipes = query.order_by(Recipe.timestamp.desc(), Recipe.id.desc()).limit(per_page + 1).all()
+        if len(recipes) > per_page:
+            recipes = recipes[:per_page]
+            return recipes, RecipeService.encode_cursor(recipes[-1])
+        return recipes, None
+    
+    @staticmethod
+    def get_summaries_page(category: Optional[str] = None, cursor: Optional[str] = None,
+                           per_page: int = 12) -> Tuple[List[RecipeSummary], Optional[str]]:
+        """Como get_recipes_page pero con los resúmenes de los listados (una consulta, sin unir con usuarios)
+        
+        Los resúmenes tienen id, título, nombre del autor, fecha, categoría y el principio de la
+        descripción; el cursor es el mismo que el de get_recipes_page.
+        """
+        query = RecipeSummary.query
+        if category is not None:
+            query = query.filter(RecipeSummary.category == category)
+        if cursor:
+            timestamp, recipe_id = RecipeService.decode_cursor(cursor)
+            query = query.filter(db.or_(RecipeSummary.timestamp < timestamp,
+                                        db.and_(RecipeSummary.timestamp == timestamp, RecipeSummary.id < recipe_id)))
+        rows = query.order_by(RecipeSummary.timestamp.desc(), RecipeSummary.id.desc()).limit(per_page + 1).all()
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            return rows, RecipeService.encode_cursor(rows[-1])
+        return rows, None
+    
+    @staticmethod
+    def rebuild_summaries() -> int:
+        """Regenera la tabla de resúmenes desde las recetas (tras inserciones masivas); devuelve el número de filas"""
+        rows = summaries.rebuild(db.session.connection())
+        invalidate_on_commit('recipes')
+        db.session.commit()
+        return rows
+    
+    @staticmethod
+    def search(query: str, page: int = 1, per_page: int = 12) -> Tuple[List[Tuple[Recipe, SearchHit]], bool]:
+        """Busca recetas por título, descripción, ingredientes y pasos ordenadas por relevancia (BM25)
+        
+        Todos los términos deben aparecer; los terminados en * son prefijos ("torti*" encuentra
+        "tortilla"). Devuelve pares (receta, resultado con puntuación y fragmento) de la página pedida
+        y si hay más páginas.
+        """
+        hits = RecipeSearch.search(query, limit=per_page + 1, offset=(max(page, 1) - 1) * per_page)
+        has_more = len(hits) > per_page
+        hits = hits[:per_page]
+        recipes = {recipe.id: recipe for recipe in Recipe.query.options(joinedload(Recipe.author))
+                   .filter(Recipe.id.in_([hit.recipe_id for hit in hits]))} if hits else {}
+        return [(recipes[hit.recipe_id], hit) for hit in hits if hit.recipe_id in recipes], has_more
+    
+    @staticmethod
+    def encode_cursor(recipe: Recipe) -> str:
+        """Cursor opaco con el (timestamp, id) de la última receta de una página"""
+        raw = f'{recipe.timestamp.isoformat()}|{recipe.id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        """Interpreta un cursor generado por encode_cursor (ValueError si no es válido)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            timestamp, recipe_id = raw.split('|')
+            return datetime.fromisoformat(timestamp), int(recipe_id)
+        except (UnicodeDecodeError, ValueError, TypeError) as e:
+            raise ValueError(f'Cursor de paginación no válido: {cursor!r}') from e
     
     @staticmethod
     def update_recipe(recipe: Recipe, title: str, description: str, 
                      ingredients: str, steps: str, category: str) -> Recipe:
         """Actualiza una receta existente"""
+        RecipeService._invalidate(recipe)  # Categoría anterior incluida
+        if recipe.category != category:
+            CategoryProfileService.adjust(recipe.author_id, recipe.category, -1)
+            CategoryProfileService.adjust(recipe.author_id, category, 1)
         recipe.title = title
         recipe.description = description
         recipe.ingredients = ingredients
         recipe.steps = steps
         recipe.category = category
+        IngredientIndexService.index_recipe(recipe)
+        RecipeService._invalidate(recipe)
         db.session.commit()
+        RecipeSearch.refresh(recipe)
+        IngredientCatalogue.refresh(recipe)
         return recipe
     
     @staticmethod
     def delete_recipe(recipe: Recipe) -> None:
-        """Elimina una receta"""
+        """Elimina una receta y encola el recálculo de similitudes de su autor
+        
+        Una baja no deja rastro en `recipes.updated_at`, así que `recompute_similarities(since=...)` no la ve:
+        el autor se recalcula aquí igual que tras publicar o editar.
+        """
+        from .jobs import schedule_similarity_update  # jobs importa este módulo
+        IngredientIndexService.unindex_recipe(recipe)
+        CategoryProfileService.adjust(recipe.author_id, recipe.category, -1)
+        RecipeService._invalidate(recipe)
+        recipe_id, author_id = recipe.id, recipe.author_id
+        FeedService.discard_recipe(recipe_id)
         db.session.delete(recipe)
         db.session.commit()
+        RecipeSearch.discard(recipe_id)
+        IngredientCatalogue.discard(recipe_id)
+        if author_id is not None:
+            schedule_similarity_update(author_id)
     
     @staticmethod
-    def get_other_users_recipes(user_id: int) -> List[Recipe]:
-        """Obtiene recetas de otros usuarios (excluyendo al usuario especificado)"""
-        return Recipe.query.filter(Recipe.author_id != user_id).all()
+    def get_other_users_recipes(user_id: int, chunk_size: int = 1000) -> Iterator[Recipe]:
+        """Recorre las recetas de otros usuarios (excluyendo al usuario especificado) por bloques"""
+        return iter(Recipe.query.filter(Recipe.author_id != user_id).yield_per(chunk_size))
+    
+    @staticmethod
+    def _invalidate(recipe: Recipe) -> None:
+        """Marca las páginas cacheadas que muestran la receta para invalidarlas tras el commit"""
+        invalidate_on_commit('recipes', f'recipe:{recipe.id}', f'category:{recipe.category}',
+                             f'user:{recipe.author_id}')
 
+@reads_from_replica
 class SimilarityService:
     """Servicio responsable únicamente de operaciones relacionadas con usuarios similares"""
     
     @staticmethod
-    def clear_user_similarities(user_id: int) -> None:
-        """Limpia las relaciones de similitud de un usuario"""
-        SimilarUser.query.filter_by(user_id=user_id).delete()
+    def top_k() -> int:
+        """Vecinos guardados por usuario (SIMILARITY_TOP_K): la tabla crece como U·K y no como U²"""
+        return current_app.config['SIMILARITY_TOP_K']
+    
+    @staticmethod
+    def _best(scores: Dict[int, Optional[float]], k: int) -> Dict[int, Optional[float]]:
+        """Los k mejores de un diccionario id -> puntuación (sin puntuación al final; empates por id)"""
+        ranked = sorted(scores.items(), key=lambda item: (item[1] is None, -(item[1] or 0), item[0]))
+        return dict(ranked[:k])
+    
+    @staticmethod
+    def replace_user_similarities(user_id: int, ids_with_scores, symmetric: bool = True, top_k: Optional[int] = None,
+                                  strategy: Optional[str] = None) -> Tuple[int, int]:
+        """Reemplaza los usuarios similares de un usuario en una sola transacción (no hace commit)
+        
+        `ids_with_scores` puede ser un diccionario id -> puntuación, pares (id, puntuación) o IDs
+        sueltos; solo se guardan los `top_k` mejores. Lee las relaciones actuales con una consulta,
+        inserta solo las nuevas y borra solo las que sobran, así que la tabla nunca queda vacía a
+        mitad de camino. Con `symmetric` la relación se ofrece también en sentido contrario, donde se
+        queda solo si entra en el top-K del otro usuario. Devuelve (insertadas, eliminadas).
+        """
+        if isinstance(ids_with_scores, dict):
+            desired = dict(ids_with_scores)
+        else:
+            desired = dict(item if isinstance(item, tuple) else (item, None) for item in ids_with_scores)
+        desired.pop(user_id, None)
+        top_k = top_k or SimilarityService.top_k()
+        desired = SimilarityService._best(desired, top_k)
+        
+        table = SimilarUser.__table__
+        touching = (table.c.user_id == user_id)
+        if symmetric:
+            touching = touching | (table.c.similar_user_id == user_id)
+        existing = {}
+        for row in db.session.execute(db.select([table.c.user_id, table.c.similar_user_id, table.c.score])
+                                      .where(touching)):
+            existing[(row.user_id, row.similar_user_id)] = row.score
+        
+        wanted = {(user_id, other): score for other, score in desired.items()}
+        if symmetric:
+            wanted.update({(other, user_id): score for other, score in desired.items()})
+        
+        now = datetime.utcnow()
+        stale = [pair for pair in existing if pair not in wanted]
+        for block in _chunks(stale, _IN_CLAUSE_CHUNK):
+            db.session.execute(table.delete().where(
+                db.tuple_(table.c.user_id, table.c.similar_user_id).in_(block)))
+        _insert_ignore(table, [{'user_id': a, 'similar_user_id': b, 'score': score, 'computed_at': now,
+                                'strategy': strategy}
+                               for (a, b), score in wanted.items() if (a, b) not in existing])
+        rescored = [{'a': a, 'b': b, 'new_score': score} for (a, b), score in wanted.items()
+                    if (a, b) in existing and existing[(a, b)] != score]
+        if rescored:
+            db.session.execute(table.update()
+                               .where((table.c.user_id == db.bindparam('a')) &
+                                      (table.c.similar_user_id == db.bindparam('b')))
+                               .values(score=db.bindparam('new_score'), computed_at=now, strategy=strategy),
+                               rescored)
+        if symmetric and desired:
+            SimilarityService.cap_neighbours(desired, top_k)
+        # Perfiles afectados: el usuario y todos los que ganan o pierden la relación
+        changed = set(stale) | {pair for pair, score in wanted.items() if pair not in existing or existing[pair] != score}
+        if changed:
+            invalidate_on_commit(*{f'similar:{u}' for pair in changed for u in pair})
+        return len(wanted) - (len(existing) - len(stale)), len(stale)
+    
+    @staticmethod
+    def cap_neighbours(user_ids: Optional[Iterable[int]] = None, top_k: Optional[int] = None) -> int:
+        """Borra las relaciones que quedan fuera del top-K de cada usuario (de todos con None); devuelve cuántas"""
+        table = SimilarUser.__table__
+        order = (table.c.score.desc().nullslast(), table.c.similar_user_id)
+        deleted = _delete_beyond_rank(table, table.c.user_id, order, top_k or SimilarityService.top_k(), user_ids)
+        if deleted:
+            invalidate_on_commit('similarities')
+        return deleted
+    
+    @staticmethod
+    def get_similar_users(user_id: int, k: Optional[int] = None) -> List[User]:
+        """Los k usuarios más similares a uno dado, de mayor a menor puntuación (una consulta indexada)"""
+        return User.query.join(SimilarUser, SimilarUser.similar_user_id == User.id) \
+            .filter(SimilarUser.user_id == user_id, User.id != user_id) \
+            .order_by(SimilarUser.score.desc().nullslast(), SimilarUser.similar_user_id) \
+            .limit(k or SimilarityService.top_k()).all()
+    
+    @staticmethod
+    def _store_neighbours(neighbours: Dict[int, Dict[int, float]], strategy: str, top_k: int,
+                          targets: Optional[List[int]] = None) -> None:
+        """Sustituye los vecinos de los usuarios recalculados (todos con `targets` None)
+        
+        En un recálculo parcial cada relación nueva se ofrece también en sentido contrario y se
+        queda si entra en el top-K actual del otro usuario, que no se ha recalculado.
+        """
+        if targets is None:
+            SimilarUser.query.delete()
+        else:
+            for block in _chunks(targets, _IN_CLAUSE_CHUNK):
+                SimilarUser.query.filter(db.or_(SimilarUser.user_id.in_(block),
+                                                SimilarUser.similar_user_id.in_(block))) \
+                    .delete(synchronize_session=False)
+        now = datetime.utcnow()
+        rows = {(user_id, other_id): score for user_id, scores in neighbours.items()
+                for other_id, score in SimilarityService._best(scores, top_k).items()}
+        offers: Dict[int, Dict[int, float]] = defaultdict(dict)
+        if targets is not None:
+            for user_id, other_id in list(rows):
+                if other_id not in neighbours:
+                    offers[other_id][user_id] = rows[(user_id, other_id)]
+        for block in _chunks(list(offers), _IN_CLAUSE_CHUNK):
+            current = {user_id: (count, lowest) for user_id, count, lowest in
+                       db.session.query(SimilarUser.user_id, func.count(SimilarUser.id), func.min(SimilarUser.score))
+                       .filter(SimilarUser.user_id.in_(block)).group_by(SimilarUser.user_id)}
+            for other_id in block:
+                count, lowest = current.get(other_id, (0, None))
+                for user_id, score in offers[other_id].items():
+                    if count < top_k or lowest is None or (score is not None and score > lowest):
+                        rows[(other_id, user_id)] = score
+        _insert_ignore(SimilarUser.__table__, [{'user_id': a, 'similar_user_id': b, 'score': score,
+                                                'computed_at': now, 'strategy': strategy}
+                                               for (a, b), score in sorted(rows.items())])
+        if offers:
+            SimilarityService.cap_neighbours(offers, top_k)
+        invalidate_on_commit('similarities')
+    
+    @staticmethod
+    def recompute_similarities(min_common_ingredients: int = 2, since: Optional[datetime] = None,
+                               chunk_size: int = 1000, top_k: Optional[int] = None, workers: int = 1) -> int:
+        """Recalcula las relaciones de similitud en bloque; devuelve el número de usuarios recalculados
+        
+        Carga los ingredientes de todos los usuarios en una sola pasada y cuenta coincidencias
+        mediante listas invertidas ingrediente -> usuarios. Cada usuario guarda sus `top_k` vecinos
+        por Jaccard de ingredientes. Con `since` solo se recalculan los usuarios con recetas creadas
+        o editadas desde ese momento (las bajas ya encolan el recálculo del autor en delete_recipe).
+        Con `workers` > 1 la puntuación se reparte entre procesos (app/parallel_similarity.py) y el
+        resultado se guarda igual, con una sola escritura.
+        """
+        ingredient_ids: Dict[str, int] = {}
+        user_sets: Dict[int, Set[int]] = defaultdict(set)
+        rows = db.session.query(Recipe.author_id, Recipe.ingredients).yield_per(chunk_size)
+        for author_id, text in rows:
+            if author_id is None:
+                continue
+            user_sets[author_id].update(ingredient_ids.setdefault(name, len(ingredient_ids))
+                                        for name in normalize_ingredients(text))
+        
+        if since is None:
+            targets = list(user_sets)
+        else:
+            targets = [row.author_id for row in db.session.query(Recipe.author_id)
+                       .filter(Recipe.updated_at >= since, Recipe.author_id.isnot(None)).distinct()]
+        top_k = top_k or SimilarityService.top_k()
+        
+        if workers > 1:
+            from .parallel_similarity import score_in_parallel
+            neighbours = score_in_parallel(user_sets, targets, min_common_ingredients, top_k, workers)
+        else:
+            postings: Dict[int, List[int]] = defaultdict(list)
+            for user_id, ingredients in user_sets.items():
+                for ingredient_id in ingredients:
+                    postings[ingredient_id].append(user_id)
+            neighbours: Dict[int, Dict[int, float]] = {}
+            for user_id in targets:
+                counts = Counter()
+                mine = user_sets.get(user_id, ())
+                for ingredient_id in mine:
+                    counts.update(postings[ingredient_id])
+                neighbours[user_id] = {other_id: common / (len(mine) + len(user_sets[other_id]) - common)
+                                       for other_id, common in counts.items()
+                                       if other_id != user_id and common >= min_common_ingredients}
+        
+        SimilarityService._store_neighbours(neighbours, 'posting:jaccard', top_k, None if since is None else targets)
+        db.session.commit()
+        return len(targets)
+    
+    @staticmethod
+    def recompute_top_k_similarities(metric: str = 'jaccard', top_k: Optional[int] = None,
+                                     min_common_ingredients: int = 1, since: Optional[datetime] = None,
+                                     block_size: int = 256) -> int:
+        """Recalcula los K vecinos de cada usuario con el motor matricial; devuelve los usuarios recalculados"""
+        from .similarity_matrix import UserIngredientMatrix
+        top_k = top_k or SimilarityService.top_k()
+        matrix = UserIngredientMatrix.from_database()
+        targets = None
+        if since is not None:
+            targets = [row.author_id for row in db.session.query(Recipe.author_id)
+                       .filter(Recipe.updated_at >= since, Recipe.author_id.isnot(None)).distinct()]
+        neighbours = matrix.top_k(k=top_k, metric=metric, min_common=min_common_ingredients,
+                                  user_ids=targets, block_size=block_size)
+        SimilarityService._store_neighbours({user_id: dict(ranked) for user_id, ranked in neighbours.items()},
+                                            f'matrix:{metric}', top_k, targets)
         db.session.commit()
+        return len(neighbours) if targets is None else len(targets)
+
+@reads_from_replica
+class FeedService:
+    """Feed de recomendaciones: recetas recientes de los usuarios más similares, precalculado por usuario
+    
+    Se reconstruye en el recálculo de similitudes (trabajos en segundo plano y comandos) y una receta
+    nueva se empuja solo a los FEED_FANOUT_LIMIT seguidores más similares de su autor; servir el
+    feed es una lectura del índice (user_id, rank).
+    """
+    
+    _EPOCH = datetime(1970, 1, 1)
+    _MIN_SCORE = 1e-3  # Relaciones sin puntuación: por detrás de cualquier vecino puntuado
+    
+    @staticmethod
+    def rank(score: Optional[float], timestamp: Optional[datetime]) -> float:
+        """log2(similitud) + antigüedad en vidas medias: equivale a similitud x 2^(-edad / vida media)"""
+        days = ((timestamp or datetime.utcnow()) - FeedService._EPOCH).total_seconds() / 86400
+        return math.log2(max(score or 0, FeedService._MIN_SCORE)) + days / current_app.config['FEED_HALF_LIFE_DAYS']
+    
+    @staticmethod
+    def _recent_recipes(author_ids: List[int]) -> Dict[int, List[Tuple[int, datetime]]]:
+        """Las FEED_RECIPES_PER_NEIGHBOUR recetas más recientes de cada autor: author_id -> [(id, timestamp)]"""
+        per_author = current_app.config['FEED_RECIPES_PER_NEIGHBOUR']
+        recent: Dict[int, List[Tuple[int, datetime]]] = defaultdict(list)
+        for block in _chunks(author_ids, _IN_CLAUSE_CHUNK):
+            position = func.row_number().over(partition_by=Recipe.author_id,
+                                              order_by=(Recipe.timestamp.desc(), Recipe.id.desc()))
+            ranked = db.session.query(Recipe.id, Recipe.author_id, Recipe.timestamp, position.label('position')) \
+                .filter(Recipe.author_id.in_(block)).subquery()
+            for recipe_id, author_id, timestamp in db.session.query(ranked.c.id, ranked.c.author_id,
+                                                                     ranked.c.timestamp) \
+                    .filter(ranked.c.position <= per_author):
+                recent[author_id].append((recipe_id, timestamp))
+        return recent
     
     @staticmethod
-    def create_similarity_relationship(user_id: int, similar_user_id: int) -> None:
-        """Crea una relación de similitud bidireccional entre usuarios"""
-        # Verificar que no exista ya la relación
-        if not SimilarUser.query.filter_by(user_id=user_id, similar_user_id=similar_user_id).first():
-            db.session.add(SimilarUser(user_id=user_id, similar_user_id=similar_user_id))
+    def rebuild(user_ids: Iterable[int]) -> int:
+        """Recalcula el feed de los usuarios indicados a partir de sus vecinos (no hace commit); devuelve las filas"""
+        size = current_app.config['FEED_SIZE']
+        total = 0
+        for block in _chunks(list(user_ids), _IN_CLAUSE_CHUNK):
+            neighbours: Dict[int, List[Tuple[int, Optional[float]]]] = defaultdict(list)
+            for user_id, other_id, score in db.session.query(SimilarUser.user_id, SimilarUser.similar_user_id,
+                                                             SimilarUser.score) \
+                    .filter(SimilarUser.user_id.in_(block)):
+                neighbours[user_id].append((other_id, score))
+            recent = FeedService._recent_recipes(sorted({other for pairs in neighbours.values()
+                                                         for other, _ in pairs}))
+            db.session.execute(FeedItem.__table__.delete().where(FeedItem.user_id.in_(block)))
+            rows = []
+            for user_id, pairs in neighbours.items():
+                ranked = {}
+                for other_id, score in pairs:
+                    if other_id == user_id:
+                        continue  # Nunca las recetas propias
+                    for recipe_id, timestamp in recent.get(other_id, ()):
+                        ranked[recipe_id] = max(ranked.get(recipe_id, -math.inf), FeedService.rank(score, timestamp))
+                best = sorted(ranked.items(), key=lambda item: -item[1])[:size]
+                rows.extend({'user_id': user_id, 'recipe_id': recipe_id, 'rank': rank} for recipe_id, rank in best)
+            if rows:
+                db.session.connection().execute(FeedItem.__table__.insert(), rows)
+            invalidate_on_commit(*(f'feed:{user_id}' for user_id in block))
+            total += len(rows)
+        return total
+    
+    @staticmethod
+    def rebuild_all(chunk_size: int = 1000) -> int:
+        """Recalcula el feed de todos los usuarios con vecinos, con un commit por bloque; devuelve las filas"""
+        user_ids = [user_id for user_id, in db.session.query(SimilarUser.user_id).distinct()
+                    .order_by(SimilarUser.user_id)]
+        db.session.query(FeedItem).delete()
+        total = 0
+        for block in _chunks(user_ids, chunk_size):
+            total += FeedService.rebuild(block)
+            db.session.commit()
+        return total
+    
+    @staticmethod
+    def fan_out(author_id: int) -> int:
+        """Empuja las recetas recientes de un autor al feed de sus seguidores más similares (no hace commit)
+        
+        Solo llega a los FEED_FANOUT_LIMIT usuarios que más puntúan al autor, así que un autor
+        parecido a medio catálogo no multiplica las escrituras; los demás la verán cuando se
+        recalcule su feed. Devuelve el número de filas insertadas o actualizadas.
+        """
+        followers = db.session.query(SimilarUser.user_id, SimilarUser.score) \
+            .filter(SimilarUser.similar_user_id == author_id, SimilarUser.user_id != author_id) \
+            .order_by(SimilarUser.score.desc().nullslast(), SimilarUser.user_id) \
+            .limit(current_app.config['FEED_FANOUT_LIMIT']).all()
+        recipes = FeedService._recent_recipes([author_id]).get(author_id, [])
+        if not followers or not recipes:
+            return 0
+        table = FeedItem.__table__
+        rows = {(user_id, recipe_id): FeedService.rank(score, timestamp)
+                for user_id, score in followers for recipe_id, timestamp in recipes}
+        for block in _chunks(list(rows), _IN_CLAUSE_CHUNK):
+            db.session.execute(table.delete().where(db.tuple_(table.c.user_id, table.c.recipe_id).in_(block)))
+        db.session.connection().execute(table.insert(), [{'user_id': user_id, 'recipe_id': recipe_id, 'rank': rank}
+                                                          for (user_id, recipe_id), rank in rows.items()])
+        follower_ids = [user_id for user_id, _ in followers]
+        _delete_beyond_rank(table, table.c.user_id, (table.c.rank.desc(), table.c.recipe_id.desc()),
+                            current_app.config['FEED_SIZE'], follower_ids)
+        invalidate_on_commit(*(f'feed:{user_id}' for user_id in follower_ids))
+        return len(rows)
+    
+    @staticmethod
+    def discard_recipe(recipe_id: int) -> None:
+        """Quita una receta de todos los feeds (no hace commit)"""
+        db.session.execute(FeedItem.__table__.delete().where(FeedItem.recipe_id == recipe_id))
+    
+    @staticmethod
+    def get_feed_page(user_id: int, cursor: Optional[str] = None,
+                      per_page: int = 12) -> Tuple[List[Recipe], Optional[str]]:
+        """Página del feed (mejor puntuadas primero) y cursor de la siguiente; una lectura del índice"""
+        query = Recipe.query.join(FeedItem, FeedItem.recipe_id == Recipe.id).options(joinedload(Recipe.author)) \
+            .filter(FeedItem.user_id == user_id)
+        if cursor:
+            rank, recipe_id = FeedService.decode_cursor(cursor)
+            query = query.filter(db.or_(FeedItem.rank < rank,
+                                        db.and_(FeedItem.rank == rank, FeedItem.recipe_id < recipe_id)))
+        rows = query.add_columns(FeedItem.rank).order_by(FeedItem.rank.desc(), FeedItem.recipe_id.desc()) \
+            .limit(per_page + 1).all()
+        recipes = [recipe for recipe, _ in rows[:per_page]]
+        if len(rows) > per_page:
+            rank = rows[per_page - 1][1]
+            return recipes, FeedService.encode_cursor(rank, recipes[-1].id)
+        return recipes, None
+    
+    @staticmethod
+    def encode_cursor(rank: float, recipe_id: int) -> str:
+        """Cursor opaco con el (rank, id) del último elemento de una página del feed"""
+        raw = f'{rank!r}|{recipe_id}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, int]:
+        """Interpreta un cursor generado por encode_cursor (ValueError si no es válido)"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            rank, recipe_id = raw.split('|')
+            return float(rank), int(recipe_id)
+        except (UnicodeDecodeError, ValueError, TypeError) as e:
+            raise ValueError(f'Cursor de paginación no válido: {cursor!r}') from e
+
+class IngredientIndexService:
+    """Servicio responsable únicamente del índice invertido de ingredientes"""
+    
+    @staticmethod
+    def parse_ingredients(text: str) -> Set[str]:
+        """Separa un texto de ingredientes (comas, punto y coma o líneas) en nombres canónicos"""
+        return set(normalize_ingredients(text))
+    
+    @staticmethod
+    def get_or_create_ingredient_ids(names: Iterable[str]) -> Dict[str, int]:
+        """Devuelve el ID de cada ingrediente, creando los que aún no existen"""
+        names = set(names)
+        if not names:
+            return {}
+        ids = dict(db.session.query(Ingredient.name, Ingredient.id).filter(Ingredient.name.in_(names)))
+        missing = [Ingredient(name=name) for name in names - ids.keys()]
+        if missing:
+            db.session.add_all(missing)
+            db.session.flush()
+            ids.update((ingredient.name, ingredient.id) for ingredient in missing)
+        return ids
+    
+    @staticmethod
+    def index_recipe(recipe: Recipe) -> None:
+        """Sincroniza el índice con los ingredientes actuales de una receta (no hace commit)"""
+        names = normalize_ingredients(recipe.ingredients)
+        ids = IngredientIndexService.get_or_create_ingredient_ids(names)
+        new_ids = set(ids.values())
+        old_ids = IngredientIndexService._indexed_ingredient_ids(recipe.id)
+        
+        added = new_ids - old_ids
+        removed = old_ids - new_ids
+        if removed:
+            db.session.execute(recipe_ingredients.delete().where(
+                (recipe_ingredients.c.recipe_id == recipe.id) &
+                (recipe_ingredients.c.ingredient_id.in_(removed))))
+        if len(new_ids) != len(old_ids) and old_ids - removed:
+            db.session.execute(recipe_ingredients.update()
+                               .where(recipe_ingredients.c.recipe_id == recipe.id)
+                               .values(recipe_size=len(new_ids)))
+        if added:
+            db.session.execute(recipe_ingredients.insert(),
+                               [{'recipe_id': recipe.id, 'ingredient_id': i, 'recipe_size': len(new_ids)}
+                                for i in added])
+        gained, lost = IngredientIndexService._adjust_user_counts(recipe.author_id, added, removed)
+        if gained or lost:
+            SignatureService.update_user(recipe.author_id,
+                                         added_names={name for name, i in ids.items() if i in gained},
+                                         rebuild=bool(lost))
+    
+    @staticmethod
+    def unindex_recipe(recipe: Recipe) -> None:
+        """Elimina una receta del índice (no hace commit)"""
+        old_ids = IngredientIndexService._indexed_ingredient_ids(recipe.id)
+        if old_ids:
+            db.session.execute(recipe_ingredients.delete().where(
+                recipe_ingredients.c.recipe_id == recipe.id))
+        _, lost = IngredientIndexService._adjust_user_counts(recipe.author_id, set(), old_ids)
+        if lost:
+            SignatureService.update_user(recipe.author_id, rebuild=True)
+    
+    @staticmethod
+    def rebuild(chunk_size: int = 10000) -> int:
+        """Reconstruye el índice completo a partir de las recetas; devuelve el número de recetas indexadas
+        
+        Lee las recetas por bloques de `chunk_size` (paginación por clave) e inserta sus enlaces bloque a
+        bloque, así que la memoria depende del bloque y del vocabulario, no del tamaño del catálogo. Los
+        recuentos por usuario se agregan después en la base de datos con un único INSERT ... SELECT.
+        """
+        db.session.execute(recipe_ingredients.delete())
+        UserIngredient.query.delete()
+        Ingredient.query.delete()
+        
+        ids: Dict[str, int] = {}
+        total, last_id = 0, 0
+        while True:
+            rows = db.session.query(Recipe.id, Recipe.ingredients).filter(Recipe.id > last_id) \
+                .order_by(Recipe.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id, total = rows[-1].id, total + len(rows)
+            parsed = [(recipe_id, normalize_ingredients(text)) for recipe_id, text in rows]
+            unknown = sorted({name for _, names in parsed for name in names} - ids.keys())
+            for block in _chunks(unknown, _IN_CLAUSE_CHUNK):
+                ids.update(IngredientIndexService.get_or_create_ingredient_ids(block))
+            links = [{'recipe_id': recipe_id, 'ingredient_id': ids[name], 'recipe_size': len(names)}
+                     for recipe_id, names in parsed for name in names]
+            if links:
+                db.session.execute(recipe_ingredients.insert(), links)
+        
+        counts = db.select([Recipe.author_id, recipe_ingredients.c.ingredient_id, func.count()]) \
+            .select_from(recipe_ingredients.join(Recipe, Recipe.id == recipe_ingredients.c.recipe_id)) \
+            .where(Recipe.author_id.isnot(None)) \
+            .group_by(Recipe.author_id, recipe_ingredients.c.ingredient_id)
+        db.session.execute(UserIngredient.__table__.insert().from_select(
+            ['user_id', 'ingredient_id', 'recipe_count'], counts))
+        db.session.commit()
+        IngredientCatalogue.reset()  # Se reconstruye desde el índice nuevo cuando se pida
+        return total
+    
+    @staticmethod
+    def normalize_recipe_texts(since: Optional[datetime] = None, chunk_size: int = 1000) -> int:
+        """Limpia los espacios del texto de ingredientes (tidy_text); devuelve cuántas recetas cambiaron
+        
+        El texto del autor no se sustituye por los nombres canónicos, que solo se guardan en el índice de
+        ingredientes. Recorre las recetas por bloques de `chunk_size` (paginación por clave) y solo actualiza,
+        con un commit por bloque, las filas cuyo texto limpio difiere del guardado.
+        """
+        query = db.session.query(Recipe.id, Recipe.ingredients)
+        if since is not None:
+            query = query.filter(Recipe.updated_at >= since)
+        changed, last_id = 0, 0
+        while True:
+            rows = query.filter(Recipe.id > last_id).order_by(Recipe.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            changes = [{'id': recipe_id, 'ingredients': normalized} for recipe_id, text in rows
+                       for normalized in [tidy_text(text)] if normalized != text]
+            if changes:
+                db.session.bulk_update_mappings(Recipe, changes)
+                invalidate_on_commit(*(f"recipe:{change['id']}" for change in changes))
+                db.session.commit()
+                changed += len(changes)
+        return changed
+    
+    @staticmethod
+    def _indexed_ingredient_ids(recipe_id: int) -> Set[int]:
+        """IDs de ingredientes indexados actualmente para una receta"""
+        rows = db.session.execute(
+            db.select([recipe_ingredients.c.ingredient_id]).where(recipe_ingredients.c.recipe_id == recipe_id))
+        return {row.ingredient_id for row in rows}
+    
+    @staticmethod
+    def _adjust_user_counts(user_id: int, added: Set[int], removed: Set[int]) -> Tuple[Set[int], Set[int]]:
+        """Actualiza los contadores usuario <-> ingrediente; devuelve los ingredientes que el usuario gana y pierde"""
+        gained, lost = set(), set()
+        if user_id is None or not (added or removed):
+            return gained, lost
+        existing = {row.ingredient_id: row for row in UserIngredient.query.filter(
+            UserIngredient.user_id == user_id,
+            UserIngredient.ingredient_id.in_(added | removed))}
+        for ingredient_id in added:
+            row = existing.get(ingredient_id)
+            if row is None:
+                db.session.add(UserIngredient(user_id=user_id, ingredient_id=ingredient_id, recipe_count=1))
+                gained.add(ingredient_id)
+            else:
+                row.recipe_count += 1
+        for ingredient_id in removed:
+            row = existing.get(ingredient_id)
+            if row is None:
+                continue
+            row.recipe_count -= 1
+            if row.recipe_count <= 0:
+                db.session.delete(row)
+                lost.add(ingredient_id)
+        return gained, lost
+
+class PantryService:
+    """Servicio responsable únicamente de la consulta "¿Qué puedo cocinar?" sobre una despensa"""
+    
+    @staticmethod
+    def what_can_i_cook(pantry, page: int = 1, per_page: int = 12) -> Tuple[List[Tuple[Recipe, CoverageHit, List[str]]], bool]:
+        """Recetas ordenadas por la fracción de sus ingredientes que hay en la despensa
         
-        if not SimilarUser.query.filter_by(user_id=similar_user_id, similar_user_id=user_id).first():
-            db.session.add(SimilarUser(user_id=similar_user_id, similar_user_id=user_id))
+        `pantry` es un texto de ingredientes (como el de una receta) o una colección de nombres.
+        Devuelve tuplas (receta, cobertura, ingredientes que faltan) de la página pedida y si hay
+        más páginas. Los ingredientes que no aparecen en ninguna receta se ignoran.
+        """
+        names = normalize_ingredients(pantry) if isinstance(pantry, str) else \
+            {normalize_ingredient(name) for name in pantry} - {''}
+        ids = dict(db.session.query(Ingredient.name, Ingredient.id).filter(Ingredient.name.in_(names))) \
+            if names else {}
+        page = max(page, 1)
+        hits = top_recipes_by_coverage(ids.values(), k=page * per_page + 1)
+        has_more = len(hits) > page * per_page
+        hits = hits[(page - 1) * per_page:page * per_page]
+        if not hits:
+            return [], has_more
+        
+        recipe_ids = [hit.recipe_id for hit in hits]
+        recipes = {recipe.id: recipe for recipe in Recipe.query.options(joinedload(Recipe.author))
+                   .filter(Recipe.id.in_(recipe_ids))}
+        missing: Dict[int, List[str]] = defaultdict(list)
+        rows = db.session.query(recipe_ingredients.c.recipe_id, Ingredient.name) \
+            .join(Ingredient, Ingredient.id == recipe_ingredients.c.ingredient_id) \
+            .filter(recipe_ingredients.c.recipe_id.in_(recipe_ids),
+                    recipe_ingredients.c.ingredient_id.notin_(list(ids.values()) or [0])) \
+            .order_by(Ingredient.name)
+        for recipe_id, name in rows:
+            missing[recipe_id].append(name)
+        return [(recipes[hit.recipe_id], hit, missing[hit.recipe_id])
+                for hit in hits if hit.recipe_id in recipes], has_more
+
+@reads_from_replica
+class CategoryProfileService:
+    """Servicio responsable únicamente del histograma de categorías por usuario"""
+    
+    @staticmethod
+    def adjust(user_id: int, category: Optional[str], delta: int) -> None:
+        """Suma o resta recetas al histograma de un usuario (no hace commit)"""
+        if user_id is None or category is None:
+            return
+        row = UserCategory.query.get((user_id, category))
+        if row is None:
+            if delta > 0:
+                db.session.add(UserCategory(user_id=user_id, category=category, recipe_count=delta))
+            return
+        row.recipe_count += delta
+        if row.recipe_count <= 0:
+            db.session.delete(row)
     
     @staticmethod
-    def get_similar_users(user_id: int) -> List[User]:
-        """Obtiene usuarios similares para un usuario dado"""
-        # Obtener usuarios similares en ambos sentidos
-        similar_ids_1 = [rel.similar_user_id for rel in SimilarUser.query.filter_by(user_id=user_id).all()]
-        similar_ids_2 = [rel.user_id for rel in SimilarUser.query.filter_by(similar_user_id=user_id).all()]
-        all_similar_ids = set(similar_ids_1 + similar_ids_2)
-        all_similar_ids.discard(user_id)  # Evitar que el usuario se vea a sí mismo
+    def get_profile(user_id: int) -> Dict[str, int]:
+        """Histograma categoría -> número de recetas de un usuario"""
+        return dict(db.session.query(UserCategory.category, UserCategory.recipe_count)
+                    .filter(UserCategory.user_id == user_id))
+    
+    @staticmethod
+    def score_users(user_id: int) -> Dict[int, float]:
+        """Intersección de histogramas normalizados con cada usuario que comparte alguna categoría
         
-        return User.query.filter(User.id.in_(all_similar_ids)).all() if all_similar_ids else [] 
\ No newline at end of file
+        Solo se leen las filas de las categorías del usuario (índice categoría -> autores),
+        así que el coste es proporcional al tamaño del resultado.
+        """
+        profile = CategoryProfileService.get_profile(user_id)
+        total = sum(profile.values())
+        if not total:
+            return {}
+        shared: Dict[int, Dict[str, int]] = defaultdict(dict)
+        rows = db.session.query(UserCategory.user_id, UserCategory.category, UserCategory.recipe_count) \
+            .filter(UserCategory.category.in_(profile), UserCategory.user_id != user_id)
+        for other_id, category, count in rows:
+            shared[other_id][category] = count
+        
+        totals: Dict[int, int] = {}
+        for block in _chunks(list(shared), _IN_CLAUSE_CHUNK):
+            totals.update(db.session.query(UserCategory.user_id, func.sum(UserCategory.recipe_count))
+                          .filter(UserCategory.user_id.in_(block)).group_by(UserCategory.user_id))
+        return {other_id: sum(min(profile[c] / total, count / totals[other_id]) for c, count in cats.items())
+                for other_id, cats in shared.items()}
+    
+    @staticmethod
+    def rebuild() -> int:
+        """Reconstruye todos los histogramas a partir de las recetas; devuelve el número de filas"""
+        UserCategory.query.delete()
+        rows = db.session.query(Recipe.author_id, Recipe.category, func.count(Recipe.id)) \
+            .filter(Recipe.author_id.isnot(None), Recipe.category.isnot(None)) \
+            .group_by(Recipe.author_id, Recipe.category).all()
+        db.session.bulk_insert_mappings(UserCategory, [
+            {'user_id': user_id, 'category': category, 'recipe_count': count}
+            for user_id, category, count in rows])
+        db.session.commit()
+        return len(rows)
+
+@reads_from_replica
+class SignatureService:
+    """Servicio responsable únicamente de las firmas MinHash y del índice LSH de usuarios"""
+    
+    @staticmethod
+    def banding() -> Tuple[int, int]:
+        """Bandas y filas configuradas para el índice LSH"""
+        return current_app.config['MINHASH_BANDS'], current_app.config['MINHASH_ROWS']
+    
+    @staticmethod
+    def get_hasher() -> MinHasher:
+        """MinHasher compartido para el tamaño de firma configurado"""
+        bands, rows = SignatureService.banding()
+        num_perm = bands * rows
+        if num_perm not in _hashers:
+            _hashers[num_perm] = MinHasher(num_perm)
+        return _hashers[num_perm]
+    
+    @staticmethod
+    def update_user(user_id: int, added_names: Iterable[str] = (), rebuild: bool = False) -> None:
+        """Actualiza la firma de un usuario (no hace commit)
+        
+        Si solo se añadieron ingredientes la firma se combina con la de los nuevos; si alguno
+        desapareció se recalcula a partir del índice de ingredientes.
+        """
+        hasher = SignatureService.get_hasher()
+        row = UserSignature.query.get(user_id)
+        if row is not None and not rebuild:
+            current = MinHasher.from_bytes(row.signature)
+            if len(current) == hasher.num_perm:
+                signature = MinHasher.merge(current, hasher.signature(added_names))
+                if signature != current:
+                    SignatureService._store(user_id, signature, row)
+                return
+        names = [name for name, in db.session.query(Ingredient.name)
+                 .join(UserIngredient, UserIngredient.ingredient_id == Ingredient.id)
+                 .filter(UserIngredient.user_id == user_id)]
+        if names:
+            SignatureService._store(user_id, hasher.signature(names), row)
+        else:
+            LSHBucket.query.filter_by(user_id=user_id).delete()
+            if row is not None:
+                db.session.delete(row)
+    
+    @staticmethod
+    def rebuild_all(chunk_size: int = 10000) -> int:
+        """Recalcula todas las firmas y el índice LSH; devuelve el número de usuarios con firma"""
+        hasher = SignatureService.get_hasher()
+        bands, rows = SignatureService.banding()
+        user_names: Dict[int, List[str]] = defaultdict(list)
+        query = db.session.query(UserIngredient.user_id, Ingredient.name) \
+            .join(Ingredient, Ingredient.id == UserIngredient.ingredient_id)
+        for user_id, name in query.yield_per(chunk_size):
+            user_names[user_id].append(name)
+        
+        LSHBucket.query.delete()
+        UserSignature.query.delete()
+        signatures, buckets = [], []
+        for user_id, names in user_names.items():
+            signature = hasher.signature(names)
+            signatures.append({'user_id': user_id, 'signature': MinHasher.to_bytes(signature)})
+            buckets.extend({'band': band, 'bucket': bucket, 'user_id': user_id}
+                           for band, bucket in band_hashes(signature, bands, rows))
+        for block in _chunks(signatures, chunk_size):
+            db.session.bulk_insert_mappings(UserSignature, block)
+        for block in _chunks(buckets, chunk_size):
+            db.session.execute(LSHBucket.__table__.insert(), block)
+        db.session.commit()
+        return len(signatures)
+    
+    @staticmethod
+    def find_candidates(signature: List[int]) -> Set[int]:
+        """Usuarios que comparten al menos un cubo LSH con la firma (consulta indexada)"""
+        bands, rows = SignatureService.banding()
+        keys = band_hashes(signature, bands, rows)
+        query = db.session.query(LSHBucket.user_id).filter(
+            db.tuple_(LSHBucket.band, LSHBucket.bucket).in_(keys)).distinct()
+        return {row.user_id for row in query}
+    
+    @staticmethod
+    def get_signatures(user_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Firmas almacenadas de los usuarios indicados"""
+        signatures = {}
+        for block in _chunks(list(user_ids), _IN_CLAUSE_CHUNK):
+            for row in UserSignature.query.filter(UserSignature.user_id.in_(block)):
+                signatures[row.user_id] = MinHasher.from_bytes(row.signature)
+        return signatures
+    
+    @staticmethod
+    def _store(user_id: int, signature: List[int], row: Optional[UserSignature]) -> None:
+        """Guarda la firma y reemplaza los cubos LSH del usuario"""
+        if row is None:
+            db.session.add(UserSignature(user_id=user_id, signature=MinHasher.to_bytes(signature)))
+        else:
+            row.signature = MinHasher.to_bytes(signature)
+        bands, rows = SignatureService.banding()
+        LSHBucket.query.filter_by(user_id=user_id).delete()
+        db.session.execute(LSHBucket.__table__.insert(), [
+            {'band': band, 'bucket': bucket, 'user_id': user_id}
+            for band, bucket in band_hashes(signature, bands, rows)])
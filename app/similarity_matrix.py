@@ -0,0 +1,149 @@
+# Motor vectorizado de similitud entre usuarios
+# Construye una sola vez una matriz dispersa usuario x ingrediente y calcula todas las parejas
+# con productos matriciales por bloques de filas (SciPy) o con listas invertidas en arrays (NumPy)
+
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Dependencia opcional
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:  # Dependencia opcional: sin SciPy se usa la variante NumPy
+    sparse = None
+
+METRICS = ('overlap', 'jaccard', 'cosine')
+
+
+def matrix_engine_available() -> bool:
+    """Indica si el motor matricial puede usarse (requiere NumPy)"""
+    return np is not None
+
+
+class UserIngredientMatrix:
+    """Matriz binaria usuario x ingrediente con vecinos top-K por solapamiento, Jaccard o coseno"""
+
+    def __init__(self, user_sets: Dict[int, Iterable[int]], vocabulary: Optional[Dict[str, int]] = None):
+        if np is None:
+            raise ImportError('El motor matricial de similitud requiere NumPy (y opcionalmente SciPy)')
+        rows = [(user_id, sorted(set(cols))) for user_id, cols in sorted(user_sets.items())]
+        self.user_ids = np.array([user_id for user_id, _ in rows], dtype=np.int64)
+        self.row_of = {user_id: row for row, (user_id, _) in enumerate(rows)}
+        self.vocabulary = vocabulary or {}
+
+        lengths = np.array([len(cols) for _, cols in rows], dtype=np.int64)
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.indptr[1:])
+        self.indices = np.fromiter(chain.from_iterable(cols for _, cols in rows),
+                                   dtype=np.int64, count=int(self.indptr[-1]))
+        self.sizes = lengths.astype(np.float64)
+        n_cols = int(self.indices.max()) + 1 if len(self.indices) else 0
+
+        # Vista por columnas (ingrediente -> usuarios) para consultas y para la variante sin SciPy
+        row_numbers = np.repeat(np.arange(len(rows), dtype=np.int64), lengths)
+        order = np.argsort(self.indices, kind='stable')
+        self.col_rows = row_numbers[order]
+        self.col_ptr = np.zeros(n_cols + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n_cols), out=self.col_ptr[1:])
+
+        self._csr = None
+        if sparse is not None and len(rows):
+            data = np.ones(len(self.indices), dtype=np.float32)
+            self._csr = sparse.csr_matrix((data, self.indices, self.indptr), shape=(len(rows), n_cols))
+            self._csr_t = self._csr.T.tocsr()
+
+    @classmethod
+    def from_recipes(cls, recipes: Iterable, parse=None) -> 'UserIngredientMatrix':
+        """Construye la matriz a partir de recetas ORM (une los ingredientes de cada autor)"""
+        if parse is None:
+            from .normalization import normalize_ingredients as parse
+        vocabulary: Dict[str, int] = {}
+        user_sets: Dict[int, Set[int]] = {}
+        for recipe in recipes:
+            cols = user_sets.setdefault(recipe.author_id, set())
+            cols.update(vocabulary.setdefault(name, len(vocabulary)) for name in parse(recipe.ingredients))
+        return cls(user_sets, vocabulary)
+
+    @classmethod
+    def from_catalogue(cls, catalogue) -> 'UserIngredientMatrix':
+        """Construye la matriz con los conjuntos de ingredientes de un IngredientCatalogue (ya internados)"""
+        return cls(catalogue.user_sets(), catalogue.vocabulary)
+
+    @classmethod
+    def from_database(cls, chunk_size: int = 10000) -> 'UserIngredientMatrix':
+        """Construye la matriz en una sola pasada sobre el índice usuario <-> ingrediente"""
+        from . import db
+        from .models import Ingredient, UserIngredient
+        user_sets: Dict[int, List[int]] = {}
+        rows = db.session.query(UserIngredient.user_id, UserIngredient.ingredient_id).yield_per(chunk_size)
+        for user_id, ingredient_id in rows:
+            user_sets.setdefault(user_id, []).append(ingredient_id)
+        vocabulary = dict(db.session.query(Ingredient.name, Ingredient.id))
+        return cls(user_sets, vocabulary)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def top_k(self, k: int = 20, metric: str = 'jaccard', min_common: int = 1,
+              user_ids: Optional[Sequence[int]] = None,
+              block_size: int = 256) -> Dict[int, List[Tuple[int, float]]]:
+        """Devuelve los K vecinos con mayor puntuación de cada usuario (o de los usuarios indicados)"""
+        rows = np.arange(len(self.user_ids)) if user_ids is None else \
+            np.array([self.row_of[u] for u in user_ids if u in self.row_of], dtype=np.int64)
+        neighbours = {}
+        for start in range(0, len(rows), block_size):
+            for row, cols, counts in self._block_overlaps(rows[start:start + block_size]):
+                keep = (cols != row) & (counts >= min_common)
+                neighbours[int(self.user_ids[row])] = self._rank(
+                    self.sizes[row], cols[keep], counts[keep], k, metric)
+        return neighbours
+
+    def query(self, ingredient_names: Iterable[str], k: Optional[int] = 20, metric: str = 'jaccard',
+              min_common: int = 1, exclude_user_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Puntúa a todos los usuarios frente a un conjunto de ingredientes externo"""
+        query_cols = sorted({self.vocabulary[name] for name in ingredient_names if name in self.vocabulary})
+        cols, counts = self._column_overlaps(np.array(query_cols, dtype=np.int64))
+        keep = counts >= min_common
+        if exclude_user_id in self.row_of:
+            keep &= cols != self.row_of[exclude_user_id]
+        return self._rank(float(len(set(ingredient_names))), cols[keep], counts[keep], k, metric)
+
+    def _block_overlaps(self, rows) -> Iterator[Tuple[int, 'np.ndarray', 'np.ndarray']]:
+        """Cuenta ingredientes en común entre un bloque de filas y todos los usuarios"""
+        if self._csr is not None:
+            # Un único producto disperso por bloque: (b x I) @ (I x U) -> (b x U)
+            product = (self._csr[rows] @ self._csr_t).tocsr()
+            for i, row in enumerate(rows):
+                lo, hi = product.indptr[i], product.indptr[i + 1]
+                yield int(row), product.indices[lo:hi].astype(np.int64), product.data[lo:hi].astype(np.int64)
+        else:
+            for row in rows:
+                cols = self.indices[self.indptr[row]:self.indptr[row + 1]]
+                yield (int(row),) + self._column_overlaps(cols)
+
+    def _column_overlaps(self, cols) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Filas que comparten alguna de las columnas dadas y cuántas comparten"""
+        if not len(cols):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        hits = np.concatenate([self.col_rows[self.col_ptr[c]:self.col_ptr[c + 1]] for c in cols])
+        return np.unique(hits, return_counts=True)
+
+    def _rank(self, size: float, cols, counts, k: Optional[int], metric: str) -> List[Tuple[int, float]]:
+        """Convierte recuentos en puntuaciones y devuelve el top-K ordenado"""
+        if metric == 'overlap':
+            scores = counts.astype(np.float64)
+        elif metric == 'jaccard':
+            scores = counts / (size + self.sizes[cols] - counts)
+        elif metric == 'cosine':
+            scores = counts / np.sqrt(size * self.sizes[cols])
+        else:
+            raise ValueError(f"Métrica no soportada: {metric}")
+        if k is not None and len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            cols, scores = cols[top], scores[top]
+        user_ids = self.user_ids[cols]
+        order = np.lexsort((user_ids, -scores))
+        return [(int(user_ids[i]), float(scores[i])) for i in order]
@@ -3,73 +3,257 @@
 # Permite agregar nuevos algoritmos sin modificar el código existente
 
 from abc import ABC, abstractmethod
-from typing import List, Set
-from .models import Recipe, User
+from typing import Dict, List, Optional, Set, Tuple, Union
+from sqlalchemy import func
+from .models import Recipe, User, Ingredient, UserIngredient
+from . import db
+from .database import _IN_CLAUSE_CHUNK, _chunks
+from .catalogue import IngredientCatalogue
+from .minhash import LSHIndex, MinHasher
+from .services import CategoryProfileService, SignatureService
+from .similarity_matrix import UserIngredientMatrix
+
+# Las estrategias reciben una lista de recetas o, mejor, el catálogo compacto (app/catalogue.py)
+RecipeSource = Union[List[Recipe], IngredientCatalogue]
 
 class MatchingStrategy(ABC):
     """Interfaz abstracta para estrategias de matching de usuarios"""
     
     @abstractmethod
-    def find_similar_users(self, user_ingredients: Set[str], all_recipes: List[Recipe]) -> Set[int]:
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
         """Encuentra usuarios similares basado en ingredientes"""
         pass
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Devuelve usuarios similares con su puntuación, de mayor a menor (por defecto sin pesos)"""
+        return [(user_id, 1.0) for user_id in sorted(self.find_similar_users(user_ingredients, all_recipes))]
+    
+    @staticmethod
+    def _catalogue(all_recipes: Optional[RecipeSource]) -> IngredientCatalogue:
+        """Catálogo con las recetas recibidas; sin recetas, el catálogo de la aplicación"""
+        return IngredientCatalogue.current() if all_recipes is None else IngredientCatalogue.of(all_recipes)
 
 class IngredientOverlapStrategy(MatchingStrategy):
     """Estrategia: Usuarios similares basados en ingredientes en común"""
     
-    def __init__(self, min_common_ingredients: int = 2):
+    def __init__(self, min_common_ingredients: int = 2, exclude_user_id: Optional[int] = None):
         self.min_common_ingredients = min_common_ingredients
+        self.exclude_user_id = exclude_user_id
     
-    def find_similar_users(self, user_ingredients: Set[str], all_recipes: List[Recipe]) -> Set[int]:
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
         """Encuentra usuarios con al menos N ingredientes en común"""
-        matched_user_ids = set()
-        
-        for recipe in all_recipes:
-            recipe_ingredients = set([i.strip().lower() for i in recipe.ingredients.split(',')])
-            common_ingredients = user_ingredients & recipe_ingredients
-            
-            if len(common_ingredients) >= self.min_common_ingredients:
-                matched_user_ids.add(recipe.author_id)
+        return set(self._best_overlaps(user_ingredients, all_recipes))
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Puntúa con la mejor fracción de ingredientes compartidos en una receta de cada autor"""
+        if not user_ingredients:
+            return []
+        total = len(user_ingredients)
+        return sorted(((user_id, common / total)
+                       for user_id, common in self._best_overlaps(user_ingredients, all_recipes).items() if common),
+                      key=lambda item: (-item[1], item[0]))
+    
+    def _best_overlaps(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource]) -> Dict[int, int]:
+        """Mayor número de ingredientes compartidos con una receta de cada autor que alcanza el mínimo"""
+        catalogue = self._catalogue(all_recipes)
+        wanted = catalogue.lookup(user_ingredients)
+        best: Dict[int, int] = {}
+        for recipe in catalogue.records():
+            if recipe.author_id == self.exclude_user_id and recipe.author_id is not None:
+                continue
+            common = len(wanted.intersection(recipe.ingredient_ids))
+            if common >= self.min_common_ingredients and common > best.get(recipe.author_id, -1):
+                best[recipe.author_id] = common
+        return best
+
+class IndexedIngredientOverlapStrategy(MatchingStrategy):
+    """Estrategia: Ingredientes en común resueltos con el índice invertido (sin recorrer recetas)"""
+    
+    def __init__(self, min_common_ingredients: int = 2, exclude_user_id: Optional[int] = None):
+        self.min_common_ingredients = min_common_ingredients
+        self.exclude_user_id = exclude_user_id
+    
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
+        """Encuentra usuarios con al menos N ingredientes en común con un único GROUP BY/HAVING"""
+        return set(self.count_common_ingredients(user_ingredients))
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Puntúa con la fracción de los ingredientes consultados que comparte cada usuario"""
+        counts = self.count_common_ingredients(user_ingredients)
+        total = len(user_ingredients)
+        return sorted(((user_id, common / total) for user_id, common in counts.items()),
+                      key=lambda item: (-item[1], item[0]))
+    
+    def rank_by_jaccard(self, user_ingredients: Set[str]) -> List[Tuple[int, float]]:
+        """Puntúa con Jaccard de los conjuntos de ingredientes: simétrica y en la misma escala que el recálculo
+        completo (SimilarityService.recompute_similarities)"""
+        counts = self.count_common_ingredients(user_ingredients)
+        sizes: Dict[int, int] = {}
+        for block in _chunks(sorted(counts), _IN_CLAUSE_CHUNK):
+            sizes.update(db.session.query(UserIngredient.user_id, func.count(UserIngredient.ingredient_id))
+                         .filter(UserIngredient.user_id.in_(block)).group_by(UserIngredient.user_id))
+        mine = len(user_ingredients)
+        return sorted(((user_id, common / (mine + sizes[user_id] - common)) for user_id, common in counts.items()),
+                      key=lambda item: (-item[1], item[0]))
+    
+    def count_common_ingredients(self, user_ingredients: Set[str]) -> Dict[int, int]:
+        """Número de ingredientes en común por usuario (solo los que alcanzan el mínimo)"""
+        if not user_ingredients:
+            return {}
+        common = func.count(UserIngredient.ingredient_id)
+        query = db.session.query(UserIngredient.user_id, common) \
+            .join(Ingredient, Ingredient.id == UserIngredient.ingredient_id) \
+            .filter(Ingredient.name.in_(user_ingredients))
+        if self.exclude_user_id is not None:
+            query = query.filter(UserIngredient.user_id != self.exclude_user_id)
+        query = query.group_by(UserIngredient.user_id).having(common >= self.min_common_ingredients)
+        return dict(query)
+
+class MatrixSimilarityStrategy(MatchingStrategy):
+    """Estrategia: Puntuaciones de solapamiento, Jaccard o coseno con una matriz dispersa usuario x ingrediente"""
+    
+    def __init__(self, metric: str = 'jaccard', top_k: Optional[int] = 20, min_common_ingredients: int = 1,
+                 exclude_user_id: Optional[int] = None, matrix=None):
+        self.metric = metric
+        self.top_k = top_k
+        self.min_common_ingredients = min_common_ingredients
+        self.exclude_user_id = exclude_user_id
+        self.matrix = matrix  # Matriz ya construida (p. ej. con UserIngredientMatrix.from_database)
+    
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
+        """Encuentra los K usuarios con mayor puntuación"""
+        return {user_id for user_id, _ in self.rank_similar_users(user_ingredients, all_recipes)}
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Puntúa a todos los usuarios con una sola pasada vectorizada sobre la matriz"""
+        matrix = self.matrix
+        if matrix is None:
+            matrix = UserIngredientMatrix.from_catalogue(IngredientCatalogue.of(all_recipes))
+        return matrix.query(user_ingredients, k=self.top_k, metric=self.metric,
+                            min_common=self.min_common_ingredients, exclude_user_id=self.exclude_user_id)
+
+class MinHashLSHStrategy(MatchingStrategy):
+    """Estrategia: Vecinos aproximados con firmas MinHash y un índice LSH por bandas (sublineal)"""
+    
+    def __init__(self, bands: Optional[int] = None, rows: Optional[int] = None, threshold: float = 0.0,
+                 exclude_user_id: Optional[int] = None, index=None):
+        self.bands = bands  # None: MINHASH_BANDS y MINHASH_ROWS de la configuración
+        self.rows = rows
+        self.threshold = threshold
+        self.exclude_user_id = exclude_user_id
+        self.index = index  # LSHIndex en memoria; si es None se usan las tablas persistidas
+    
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
+        """Encuentra candidatos LSH cuya similitud de Jaccard estimada supera el umbral"""
+        return {user_id for user_id, _ in self.rank_similar_users(user_ingredients, all_recipes)}
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Devuelve los candidatos ordenados por similitud de Jaccard estimada"""
+        if not user_ingredients:
+            return []
+        if self.index is None and all_recipes is None:
+            # Índice persistido: se construyó con las bandas y filas de la configuración
+            bands, rows = SignatureService.banding()
+            if self.bands not in (None, bands) or self.rows not in (None, rows):
+                raise ValueError(f"El índice LSH persistido usa {bands} bandas x {rows} filas (MINHASH_BANDS, "
+                                 f"MINHASH_ROWS), no {self.bands} x {self.rows}; pasa las recetas o un índice")
+            signature = SignatureService.get_hasher().signature(user_ingredients)
+            candidates = SignatureService.find_candidates(signature)
+            candidates.discard(self.exclude_user_id)
+            signatures = SignatureService.get_signatures(candidates)
+        else:
+            bands, rows = self.bands, self.rows
+            if bands is None or rows is None:
+                configured_bands, configured_rows = SignatureService.banding()
+                bands, rows = bands or configured_bands, rows or configured_rows
+            hasher = MinHasher(bands * rows)
+            index = self.index
+            if index is None:
+                index = LSHIndex(bands, rows)
+                for user_id, names in self._user_ingredients(all_recipes).items():
+                    index.add(user_id, hasher.signature(names))
+            signature = hasher.signature(user_ingredients)
+            candidates = index.candidates(signature)
+            candidates.discard(self.exclude_user_id)
+            signatures = {user_id: index.signature_of(user_id) for user_id in candidates}
         
-        return matched_user_ids
+        scored = [(user_id, MinHasher.estimate_jaccard(signature, other))
+                  for user_id, other in signatures.items()]
+        return sorted([item for item in scored if item[1] > 0 and item[1] >= self.threshold],
+                      key=lambda item: (-item[1], item[0]))
+    
+    @staticmethod
+    def _user_ingredients(all_recipes: RecipeSource) -> dict:
+        """Agrupa los ingredientes de las recetas por autor"""
+        catalogue = IngredientCatalogue.of(all_recipes)
+        return {user_id: catalogue.user_names(user_id) for user_id in catalogue.user_sets()}
 
 class CategoryMatchingStrategy(MatchingStrategy):
     """Estrategia: Usuarios similares basados en categorías de recetas"""
     
-    def find_similar_users(self, user_ingredients: Set[str], all_recipes: List[Recipe]) -> Set[int]:
+    def __init__(self, user_id: Optional[int] = None):
+        # Con user_id se usa el histograma de categorías precalculado (tabla user_categories)
+        self.user_id = user_id
+    
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
         """Encuentra usuarios que comparten categorías de recetas"""
-        matched_user_ids = set()
+        if self.user_id is not None:
+            return set(CategoryProfileService.score_users(self.user_id))
         
-        # Obtener categorías de las recetas del usuario actual
-        user_categories = set()
-        for recipe in all_recipes:
-            if recipe.author_id in [r.author_id for r in all_recipes if any(ing in r.ingredients.lower() for ing in user_ingredients)]:
-                user_categories.add(recipe.category)
-        
-        # Buscar usuarios con categorías similares
-        for recipe in all_recipes:
-            if recipe.category in user_categories:
-                matched_user_ids.add(recipe.author_id)
-        
-        return matched_user_ids
+        # Sin perfil: tres pasadas lineales sobre el catálogo
+        catalogue = self._catalogue(all_recipes)
+        wanted = catalogue.lookup(user_ingredients)
+        ingredient_authors = {r.author_id for r in catalogue.records() if not wanted.isdisjoint(r.ingredient_ids)}
+        user_categories = {r.category for r in catalogue.records() if r.author_id in ingredient_authors}
+        return {r.author_id for r in catalogue.records() if r.category in user_categories}
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Puntúa con la intersección de histogramas de categorías (requiere user_id)"""
+        if self.user_id is None:
+            return super().rank_similar_users(user_ingredients, all_recipes)
+        return sorted(CategoryProfileService.score_users(self.user_id).items(),
+                      key=lambda item: (-item[1], item[0]))
 
 class HybridMatchingStrategy(MatchingStrategy):
     """Estrategia híbrida: Combina ingredientes y categorías"""
     
-    def __init__(self, ingredient_weight: float = 0.7, category_weight: float = 0.3):
-        self.ingredient_strategy = IngredientOverlapStrategy(min_common_ingredients=1)
-        self.category_strategy = CategoryMatchingStrategy()
+    def __init__(self, ingredient_weight: float = 0.7, category_weight: float = 0.3,
+                 user_id: Optional[int] = None, min_score: float = 0.0, top_k: Optional[int] = None):
+        if user_id is not None:
+            self.ingredient_strategy = IndexedIngredientOverlapStrategy(min_common_ingredients=1,
+                                                                        exclude_user_id=user_id)
+        else:
+            self.ingredient_strategy = IngredientOverlapStrategy(min_common_ingredients=1)
+        self.category_strategy = CategoryMatchingStrategy(user_id=user_id)
         self.ingredient_weight = ingredient_weight
         self.category_weight = category_weight
+        self.min_score = min_score
+        self.top_k = top_k
     
-    def find_similar_users(self, user_ingredients: Set[str], all_recipes: List[Recipe]) -> Set[int]:
+    def find_similar_users(self, user_ingredients: Set[str], all_recipes: Optional[RecipeSource] = None) -> Set[int]:
         """Combina resultados de múltiples estrategias"""
-        ingredient_matches = self.ingredient_strategy.find_similar_users(user_ingredients, all_recipes)
-        category_matches = self.category_strategy.find_similar_users(user_ingredients, all_recipes)
+        return {user_id for user_id, _ in self.rank_similar_users(user_ingredients, all_recipes)}
+    
+    def rank_similar_users(self, user_ingredients: Set[str],
+                           all_recipes: Optional[RecipeSource] = None) -> List[Tuple[int, float]]:
+        """Suma ponderada de las puntuaciones de ingredientes y categorías"""
+        if all_recipes is not None:
+            all_recipes = IngredientCatalogue.of(all_recipes)  # Una sola conversión para las dos estrategias
+        scores: Dict[int, float] = {}
+        for strategy, weight in ((self.ingredient_strategy, self.ingredient_weight),
+                                 (self.category_strategy, self.category_weight)):
+            for user_id, score in strategy.rank_similar_users(user_ingredients, all_recipes):
+                scores[user_id] = scores.get(user_id, 0.0) + weight * score
         
-        # Combinar resultados (usuarios que aparecen en ambas estrategias tienen mayor peso)
-        hybrid_matches = ingredient_matches | category_matches
-        return hybrid_matches
+        ranked = sorted(((user_id, score) for user_id, score in scores.items() if score >= self.min_score),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:self.top_k] if self.top_k is not None else ranked
 
 class MatchingStrategyFactory:
     """Factory para crear estrategias de matching"""
@@ -79,15 +263,38 @@ class MatchingStrategyFactory:
         """Crea una estrategia de matching basada en el tipo especificado"""
         if strategy_type == "ingredient_overlap":
             min_ingredients = kwargs.get('min_common_ingredients', 2)
-            return IngredientOverlapStrategy(min_common_ingredients=min_ingredients)
+            return IngredientOverlapStrategy(min_common_ingredients=min_ingredients,
+                                             exclude_user_id=kwargs.get('exclude_user_id'))
+        
+        elif strategy_type == "indexed_overlap":
+            min_ingredients = kwargs.get('min_common_ingredients', 2)
+            return IndexedIngredientOverlapStrategy(min_common_ingredients=min_ingredients,
+                                                    exclude_user_id=kwargs.get('exclude_user_id'))
+        
+        elif strategy_type == "matrix":
+            return MatrixSimilarityStrategy(metric=kwargs.get('metric', 'jaccard'),
+                                            top_k=kwargs.get('top_k', 20),
+                                            min_common_ingredients=kwargs.get('min_common_ingredients', 1),
+                                            exclude_user_id=kwargs.get('exclude_user_id'),
+                                            matrix=kwargs.get('matrix'))
+        
+        elif strategy_type == "minhash_lsh":
+            return MinHashLSHStrategy(bands=kwargs.get('bands'),
+                                      rows=kwargs.get('rows'),
+                                      threshold=kwargs.get('threshold', 0.0),
+                                      exclude_user_id=kwargs.get('exclude_user_id'),
+                                      index=kwargs.get('index'))
         
         elif strategy_type == "category_matching":
-            return CategoryMatchingStrategy()
+            return CategoryMatchingStrategy(user_id=kwargs.get('user_id'))
         
         elif strategy_type == "hybrid":
             ingredient_weight = kwargs.get('ingredient_weight', 0.7)
             category_weight = kwargs.get('category_weight', 0.3)
-            return HybridMatchingStrategy(ingredient_weight=ingredient_weight, category_weight=category_weight)
+            return HybridMatchingStrategy(ingredient_weight=ingredient_weight, category_weight=category_weight,
+                                          user_id=kwargs.get('user_id'),
+                                          min_score=kwargs.get('min_score', 0.0),
+                                          top_k=kwargs.get('top_k'))
         
         else:
             # Estrategia por defecto
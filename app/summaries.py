@@ -0,0 +1,67 @@
+# Tabla recipe_summaries: resumen de cada receta para los listados (portada y categorías)
+# Los listados solo muestran título, autor, fecha, categoría y el principio de la descripción; leerlos de
+# `recipes` obliga a cargar también ingredientes y pasos y a unir con `users`. Los resúmenes se mantienen con
+# eventos del mapper de Recipe en el mismo flush que la escritura (cualquier alta, cambio o baja por el ORM);
+# las cargas masivas con inserciones directas en la tabla (importador, benchmarks) llaman después a rebuild.
+
+from typing import Iterable, Optional
+from sqlalchemy import event, func, inspect, select
+from .models import Recipe, RecipeSummary, User
+
+EXCERPT_LENGTH = 150
+_LISTED_FIELDS = ('title', 'description', 'category', 'timestamp', 'author_id')  # Los que cambian el resumen
+
+
+def _summary_select(recipe_ids: Optional[Iterable[int]] = None):
+    """SELECT con las filas de resumen de las recetas indicadas (todas con None)"""
+    recipes, users = Recipe.__table__, User.__table__
+    query = select(recipes.c.id, recipes.c.title, recipes.c.author_id, users.c.username, recipes.c.category,
+                   recipes.c.timestamp, func.substr(recipes.c.description, 1, EXCERPT_LENGTH),
+                   func.length(recipes.c.description) > EXCERPT_LENGTH) \
+        .select_from(recipes.outerjoin(users, users.c.id == recipes.c.author_id))
+    if recipe_ids is not None:
+        query = query.where(recipes.c.id.in_(list(recipe_ids)))
+    return query
+
+
+def _insert(query):
+    table = RecipeSummary.__table__
+    return table.insert().from_select(['id', 'title', 'author_id', 'author_username', 'category', 'timestamp',
+                                       'excerpt', 'truncated'], query)
+
+
+def refresh(connection, recipe_ids: Iterable[int]) -> None:
+    """Vuelve a generar los resúmenes de esas recetas a partir de `recipes` (las que ya no existen se quitan)"""
+    recipe_ids = list(recipe_ids)
+    discard(connection, recipe_ids)
+    connection.execute(_insert(_summary_select(recipe_ids)))
+
+
+def discard(connection, recipe_ids: Iterable[int]) -> None:
+    """Quita los resúmenes de esas recetas"""
+    table = RecipeSummary.__table__
+    connection.execute(table.delete().where(table.c.id.in_(list(recipe_ids))))
+
+
+def rebuild(connection) -> int:
+    """Regenera todos los resúmenes con un único INSERT ... SELECT; devuelve el número de filas"""
+    connection.execute(RecipeSummary.__table__.delete())
+    return connection.execute(_insert(_summary_select())).rowcount
+
+
+@event.listens_for(Recipe, 'after_insert')
+def _recipe_inserted(mapper, connection, target) -> None:
+    refresh(connection, [target.id])
+
+
+@event.listens_for(Recipe, 'after_update')
+def _recipe_updated(mapper, connection, target) -> None:
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _LISTED_FIELDS) or \
+            state.attrs.author.history.has_changes():
+        refresh(connection, [target.id])
+
+
+@event.listens_for(Recipe, 'before_delete')
+def _recipe_deleted(mapper, connection, target) -> None:
+    discard(connection, [target.id])
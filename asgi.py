@@ -0,0 +1,5 @@
+# Punto de entrada ASGI: uvicorn asgi:app (ver requirements/asgi.txt)
+import os
+from app.asgi import create_asgi_app
+
+app = create_asgi_app(os.getenv('FLASK_CONFIG') or 'default')
@@ -0,0 +1,151 @@
+# Benchmark de rendimiento con conexiones concurrentes: despliegue síncrono (N workers) frente al modo ASGI
+# Uso: python -m benchmarks.asgi_throughput --requests 2000 --concurrency 64 --workers 4 --latency-ms 5
+# --latency-ms añade una espera por consulta para simular una base de datos remota (el caso en que un worker
+# síncrono se queda bloqueado esperando E/S).
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+
+from app import create_app, db
+from app.asgi import create_asgi_app
+from app.async_services import async_db
+from app.models import User
+from app.services import RecipeService, SimilarityService
+from benchmarks.search_latency import populate
+
+
+def add_latency(engine, seconds: float) -> None:
+    """Espera `seconds` en cada sentencia desde el hilo del controlador (con before_cursor_execute el motor
+    asíncrono dormiría en el bucle de eventos y no se mediría lo que se quiere medir)"""
+    if seconds <= 0:
+        return
+
+    def on_connect(dbapi_connection, connection_record):
+        if hasattr(dbapi_connection, 'await_'):  # aiosqlite: la conexión sqlite3 vive en su propio hilo
+            dbapi_connection.await_(dbapi_connection._connection.set_trace_callback(lambda sql: time.sleep(seconds)))
+        else:
+            dbapi_connection.set_trace_callback(lambda sql: time.sleep(seconds))
+
+    event.listen(engine, 'connect', on_connect)
+    engine.dispose()
+
+
+def paths(recipe_ids, user_ids, n):
+    """Mezcla de lecturas: detalle de receta, página de categoría y usuarios similares"""
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            yield f'/api/v1/recipes/{recipe_ids[i % len(recipe_ids)]}', ''
+        elif kind == 1:
+            yield '/api/v1/recipes', 'category=Cena&per_page=12'
+        else:
+            yield f'/api/v1/users/{user_ids[i % len(user_ids)]}/similar', ''
+
+
+def summary(label, timings, elapsed):
+    timings = sorted(timings)
+    print(f'{label:28} {len(timings) / elapsed:8.1f} peticiones/s  p50 {statistics.median(timings):7.2f} ms  '
+          f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms')
+
+
+def run_sync(app, requests, workers):
+    """Equivale a gunicorn con `workers` workers síncronos: como mucho `workers` peticiones a la vez"""
+    local = threading.local()
+
+    def fetch(item):
+        path, query = item
+        client = getattr(local, 'client', None) or app.test_client()
+        local.client = client
+        start = time.perf_counter()
+        response = client.get(path, query_string=query)
+        assert response.status_code in (200, 304), response.status_code
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        timings = list(executor.map(fetch, requests))
+    return timings, time.perf_counter() - start
+
+
+async def _asgi_get(app, path, query):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(), 'headers': [],
+               'http_version': '1.1', 'scheme': 'http', 'server': ('bench', 80), 'client': ('127.0.0.1', 1)},
+              receive, send)
+    return messages[0]['status']
+
+
+async def run_async(app, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def fetch(path, query):
+        async with semaphore:
+            start = time.perf_counter()
+            status = await _asgi_get(app, path, query)
+            assert status in (200, 304), status
+            timings.append((time.perf_counter() - start) * 1000)
+
+    # La primera conexión del motor ejecuta los eventos de conexión bajo un cerrojo: se abre antes de concurrir
+    await _asgi_get(app, *requests[0])
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(path, query) for path, query in requests))
+    elapsed = time.perf_counter() - start
+    await async_db.dispose()
+    return timings, elapsed
+
+
+def run(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'asgi_bench.db')
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    with app.app_context():
+        if not db.inspect(db.engine).has_table('recipes'):
+            db.create_all()
+            populate(args.recipes, seed=7)
+            RecipeService.get_recipes_page()  # Calienta la caché de sentencias
+        users = [user_id for user_id, in db.session.query(User.id).limit(200)]
+        for user_id, other_id in zip(users, users[1:]):
+            SimilarityService.replace_user_similarities(user_id, [other_id])
+        db.session.commit()
+        recipe_ids = list(range(1, args.recipes + 1, max(1, args.recipes // 500)))
+        requests = list(paths(recipe_ids, users[:-1], args.requests))
+        add_latency(db.engine, args.latency_ms / 1000)
+
+        timings, elapsed = run_sync(app, requests, args.workers)
+        summary(f'WSGI ({args.workers} workers síncronos)', timings, elapsed)
+
+        asgi = create_asgi_app(app=app)
+        add_latency(async_db.engine.sync_engine, args.latency_ms / 1000)
+        timings, elapsed = asyncio.run(run_async(asgi, requests, args.concurrency))
+        summary(f'ASGI ({args.concurrency} conexiones)', timings, elapsed)
+        asgi.wsgi.executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=1500)
+    parser.add_argument('--concurrency', type=int, default=64, help='Conexiones simultáneas contra el modo ASGI')
+    parser.add_argument('--workers', type=int, default=4, help='Workers síncronos (gunicorn -w)')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='Latencia simulada por consulta')
+    parser.add_argument('--db', help='Reutiliza una base de datos ya generada')
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Generador de catálogos sintéticos y reproducibles para los benchmarks
+# Los ingredientes siguen una distribución de Zipf (unos pocos como "sal" o "aceite" aparecen en casi todas las
+# recetas y la mayoría en muy pocas) y los autores están sesgados: pocos usuarios publican muchas recetas.
+# Con la misma semilla se obtiene exactamente el mismo catálogo.
+
+import bisect
+import itertools
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from app import db
+from app.factories import RecipeFactory
+from app.models import Recipe, User
+from app.services import (CategoryProfileService, FeedService, IngredientIndexService, RecipeService,
+                          SimilarityService)
+from benchmarks.search_latency import DISHES, INGREDIENTS, WORDS
+
+CATEGORIES = ['Cena', 'Comida', 'Postre', 'Desayuno', 'Merienda', 'Aperitivo']
+_RECIPE_COLUMNS = ('title', 'description', 'ingredients', 'steps', 'category', 'author_id', 'timestamp',
+                   'updated_at')
+
+
+def zipf_cum_weights(n: int, exponent: float) -> List[float]:
+    """Pesos acumulados de una Zipf truncada a n valores (el rango r tiene peso 1 / r^exponent)"""
+    return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, n + 1)))
+
+
+class CatalogueGenerator:
+    """Genera usuarios y recetas con ingredientes Zipf y autores sesgados a partir de una semilla"""
+
+    def __init__(self, recipes: int, seed: int = 7, users: int = None, vocabulary: int = 500,
+                 ingredient_exponent: float = 1.1, author_exponent: float = 1.0, days: int = 365):
+        self.recipes = recipes
+        self.users = users or max(10, recipes // 20)
+        self.seed = seed
+        self.vocabulary = INGREDIENTS + [f'ingrediente {i}' for i in range(max(0, vocabulary - len(INGREDIENTS)))]
+        self.ingredient_exponent = ingredient_exponent
+        self.author_exponent = author_exponent
+        self.days = days
+        self.now = datetime(2026, 1, 1)
+
+    def describe(self) -> Dict[str, object]:
+        """Parámetros del catálogo (se guardan junto a los resultados para comparar ejecuciones)"""
+        return {'recipes': self.recipes, 'users': self.users, 'seed': self.seed, 'vocabulary': len(self.vocabulary),
+                'ingredient_exponent': self.ingredient_exponent, 'author_exponent': self.author_exponent}
+
+    def recipes_rows(self, author_ids: List[int]) -> Iterator[Dict[str, object]]:
+        """Filas de recetas construidas con RecipeFactory, en el orden fijado por la semilla"""
+        rng = random.Random(self.seed)
+        ingredient_weights = zipf_cum_weights(len(self.vocabulary), self.ingredient_exponent)
+        author_weights = zipf_cum_weights(len(author_ids), self.author_exponent)
+        category_weights = zipf_cum_weights(len(CATEGORIES), 1.0)
+        for i in range(self.recipes):
+            wanted = rng.randint(3, 10)
+            names = []
+            while len(names) < wanted:
+                name = self.vocabulary[bisect.bisect(ingredient_weights, rng.random() * ingredient_weights[-1])]
+                if name not in names:
+                    names.append(name)
+            author_id = author_ids[bisect.bisect(author_weights, rng.random() * author_weights[-1])]
+            timestamp = self.now - timedelta(seconds=rng.randrange(self.days * 86400))
+            recipe = RecipeFactory.create_recipe(
+                'basic',
+                title=f'{rng.choice(DISHES).capitalize()} {rng.choice(WORDS)} {i}',
+                description=f'Receta {rng.choice(WORDS)} con {names[0]} y {names[1]}',
+                ingredients=', '.join(names),
+                steps=' '.join(f'Añadir {name} y remover.' for name in names),
+                category=CATEGORIES[bisect.bisect(category_weights, rng.random() * category_weights[-1])])
+            recipe.author_id, recipe.timestamp, recipe.updated_at = author_id, timestamp, timestamp
+            yield {column: getattr(recipe, column) for column in _RECIPE_COLUMNS}
+
+    def populate(self, batch: int = 20000) -> None:
+        """Carga el catálogo en la base de datos actual y construye los índices derivados"""
+        connection = db.session.connection()
+        connection.execute(User.__table__.insert(), [{'username': f'usuario{i}', 'password_hash': ''}
+                                                     for i in range(self.users)])
+        author_ids = [user_id for user_id, in db.session.query(User.id).order_by(User.id)]
+        rows = self.recipes_rows(author_ids)
+        while True:
+            chunk = list(itertools.islice(rows, batch))
+            if not chunk:
+                break
+            connection.execute(Recipe.__table__.insert(), chunk)
+        db.session.commit()
+        IngredientIndexService.rebuild()
+        CategoryProfileService.rebuild()
+        RecipeService.rebuild_summaries()
+        SimilarityService.recompute_similarities()
+        FeedService.rebuild_all()
@@ -0,0 +1,206 @@
+# Suite de benchmarks de las rutas calientes: estrategias de matching, recálculo de similitudes, vistas de
+# portada, categoría y perfil y publicación de recetas, sobre un catálogo sintético (benchmarks/catalogue.py)
+# Uso: python -m benchmarks.hot_paths --recipes 100000 --output resultados.json
+#      python -m benchmarks.hot_paths --recipes 100000 --db /tmp/recetas.db --baseline resultados.json
+# Con --baseline se compara la mediana de cada caso con la de una ejecución anterior y el proceso termina con
+# estado 1 si alguno empeora más de --threshold (0.2 = un 20 %).
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.cache import cache
+from app.catalogue import IngredientCatalogue
+from app.factories import UserFactory
+from app.models import Recipe, User, UserIngredient
+from app.normalization import normalize_ingredients
+from app.services import FeedService, IngredientIndexService, SimilarityService
+from app.similarity_matrix import matrix_engine_available
+from app.strategies import CategoryMatchingStrategy, HybridMatchingStrategy, IngredientOverlapStrategy
+from benchmarks.catalogue import CATEGORIES, CatalogueGenerator
+
+BENCHMARK_USER, BENCHMARK_PASSWORD = 'benchmark', 'benchmark'
+
+
+def measure(fn: Callable[[int], object], runs: int, budget: float, warmup: bool = True) -> Dict[str, float]:
+    """Ejecuta fn(i) hasta `runs` veces o hasta agotar `budget` segundos (al menos una) y resume las latencias"""
+    if warmup:
+        fn(0)
+    timings: List[float] = []
+    deadline = time.perf_counter() + budget
+    while len(timings) < runs and (not timings or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn(len(timings))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'runs': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings), math.ceil(len(timings) * 0.95)) - 1], 3),
+        'min_ms': round(timings[0], 3),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[Tuple[str, float, float, float]]:
+    """Casos cuya mediana empeora más de `threshold` respecto a la referencia: (caso, antes, ahora, cambio)"""
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or not previous['p50_ms']:
+            continue
+        change = current['p50_ms'] / previous['p50_ms'] - 1
+        if change > threshold:
+            regressions.append((name, previous['p50_ms'], current['p50_ms'], change))
+    return regressions
+
+
+def sample_users(count: int, seed: int) -> List[Tuple[int, set]]:
+    """Usuarios con recetas elegidos al azar, con su conjunto de ingredientes normalizados"""
+    user_ids = sorted(user_id for user_id, in db.session.query(UserIngredient.user_id).distinct())
+    chosen = random.Random(seed).sample(user_ids, min(count, len(user_ids)))
+    ingredients = {user_id: set() for user_id in chosen}
+    for author_id, text in db.session.query(Recipe.author_id, Recipe.ingredients) \
+            .filter(Recipe.author_id.in_(chosen)):
+        ingredients[author_id] |= normalize_ingredients(text)
+    return [(user_id, ingredients[user_id]) for user_id in chosen]
+
+
+def update_similar_users(engine: str = 'posting') -> None:
+    """Lo mismo que `flask update-similar-users` para todo el catálogo"""
+    IngredientIndexService.normalize_recipe_texts()
+    if engine == 'matrix':
+        SimilarityService.recompute_top_k_similarities()
+    else:
+        SimilarityService.recompute_similarities()
+    FeedService.rebuild_all()
+
+
+def cases(app, users: List[Tuple[int, set]], seed: int) -> Dict[str, Tuple[Callable[[int], object], bool]]:
+    """Casos de la suite: nombre -> (función que recibe el número de ejecución, si necesita calentamiento)"""
+    pick = lambda i: users[i % len(users)]
+    # IngredientOverlapStrategy recorre todas las recetas del catálogo compacto; se construye fuera de la medida
+    catalogue = IngredientCatalogue.from_database()
+    print(f'Catálogo compacto: {len(catalogue)} recetas, {catalogue.nbytes() / 2 ** 20:.1f} MB en arrays')
+    client = app.test_client()
+    if User.query.filter_by(username=BENCHMARK_USER).first() is None:
+        UserFactory.create_user('standard', username=BENCHMARK_USER,
+                                password_hash=generate_password_hash(BENCHMARK_PASSWORD))
+    publisher = app.test_client()
+    publisher.post('/login', data={'username': BENCHMARK_USER, 'password': BENCHMARK_PASSWORD})
+    rng = random.Random(seed)
+
+    def publish(i):
+        ingredients = sorted(pick(i)[1])
+        names = rng.sample(ingredients, min(4, len(ingredients)))
+        response = publisher.post('/new_recipe', data={
+            'title': f'Receta de prueba {i}', 'description': 'Publicada por el benchmark',
+            'ingredients': ', '.join(names), 'steps': 'Mezclar y servir.', 'category': CATEGORIES[i % len(CATEGORIES)]})
+        assert response.status_code == 302, response.status_code
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    suite = {
+        'catalogue.build': (lambda i: IngredientCatalogue.from_database(), False),
+        'strategy.ingredient_overlap': (lambda i: IngredientOverlapStrategy(exclude_user_id=pick(i)[0])
+                                        .rank_similar_users(pick(i)[1], catalogue), False),
+        'strategy.category_matching': (lambda i: CategoryMatchingStrategy(user_id=pick(i)[0]).rank_similar_users(
+            pick(i)[1]), False),
+        'strategy.hybrid': (lambda i: HybridMatchingStrategy(user_id=pick(i)[0]).rank_similar_users(pick(i)[1]),
+                            False),
+        'update_similar_users': (lambda i: update_similar_users(), False),
+    }
+    if matrix_engine_available():
+        suite['update_similar_users.matrix'] = (lambda i: update_similar_users('matrix'), False)
+    suite.update({
+        'view.index': (lambda i: get('/'), True),
+        'view.category': (lambda i: get(f'/category/{CATEGORIES[i % len(CATEGORIES)]}'), True),
+        'view.profile': (lambda i: get(f'/user/{pick(i)[0]}'), True),
+        'publish': (publish, True),
+    })
+    return suite
+
+
+def run(args) -> int:
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'hot_paths.db')
+    app = create_app('testing')
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + path, CACHE_TYPE='null',
+                      SIMILARITY_ASYNC=True, SIMILARITY_WORKER_THREADS=0)  # Publicar solo encola el recálculo
+    cache.init_app(app)
+    generator = CatalogueGenerator(args.recipes, seed=args.seed, users=args.users, vocabulary=args.vocabulary)
+    with app.app_context():
+        if not db.inspect(db.engine).has_table('recipes'):
+            db.create_all()
+            start = time.perf_counter()
+            generator.populate()
+            print(f'Catálogo generado en {time.perf_counter() - start:.1f}s ({path})')
+        users = sample_users(args.queries, args.seed)
+        results = {}
+        for name, (fn, warmup) in cases(app, users, args.seed).items():
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            results[name] = measure(fn, args.runs, args.budget, warmup)
+            db.session.rollback()
+            print(f'{name:32} n={results[name]["runs"]:<4} p50 {results[name]["p50_ms"]:10.2f} ms  '
+                  f'p95 {results[name]["p95_ms"]:10.2f} ms')
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'catalogue': generator.describe(),
+        'environment': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                        'platform': platform.platform()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('catalogue') != report['catalogue']:
+        print('Aviso: la referencia se generó con otro catálogo; la comparación no es fiable')
+    regressions = compare(results, baseline['results'], args.threshold)
+    for name, before, after, change in regressions:
+        print(f'REGRESIÓN {name}: p50 {before:.2f} ms -> {after:.2f} ms (+{change:.0%})')
+    if not regressions:
+        print(f'Sin regresiones por encima del {args.threshold:.0%} respecto a {args.baseline}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=10000, help='Recetas del catálogo (de 10^3 a 10^6)')
+    parser.add_argument('--users', type=int, default=None, help='Usuarios (por defecto una vigésima parte)')
+    parser.add_argument('--vocabulary', type=int, default=500, help='Ingredientes distintos')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--queries', type=int, default=20, help='Usuarios de muestra para estrategias y perfiles')
+    parser.add_argument('--runs', type=int, default=20, help='Ejecuciones máximas por caso')
+    parser.add_argument('--budget', type=float, default=10.0, help='Segundos máximos por caso')
+    parser.add_argument('--only', nargs='*', help='Prefijos de los casos a ejecutar (p. ej. view strategy)')
+    parser.add_argument('--db', help='Reutiliza una base de datos ya generada')
+    parser.add_argument('--output', help='Guarda los resultados en este fichero JSON')
+    parser.add_argument('--baseline', help='Resultados JSON de una ejecución anterior con los que comparar')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Empeoramiento de la mediana tolerado')
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# Benchmark de recall: índice MinHash/LSH frente a IngredientOverlapStrategy (exacta)
+# Uso: python -m benchmarks.minhash_recall --users 2000 --configs 16x4 32x2 8x8
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from app.minhash import LSHIndex, MinHasher, candidate_probability
+from app.strategies import IngredientOverlapStrategy, MinHashLSHStrategy
+
+
+def generate_catalogue(users: int, recipes_per_user: int, cuisines: int, seed: int):
+    """Usuarios agrupados por cocina: cada cocina tiene su propio conjunto de ingredientes"""
+    rng = random.Random(seed)
+    pools = [[f'ing{c}_{i}' for i in range(40)] + [f'comun_{i}' for i in range(10)] for c in range(cuisines)]
+    recipes, user_sets = [], {}
+    for user_id in range(1, users + 1):
+        pool = pools[rng.randrange(cuisines)]
+        user_sets[user_id] = set()
+        for _ in range(rng.randint(1, recipes_per_user)):
+            ingredients = rng.sample(pool, rng.randint(3, 8))
+            user_sets[user_id].update(ingredients)
+            recipes.append(SimpleNamespace(author_id=user_id, ingredients=', '.join(ingredients)))
+    return recipes, user_sets
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def run(args):
+    recipes, user_sets = generate_catalogue(args.users, args.recipes_per_user, args.cuisines, args.seed)
+    queries = random.Random(args.seed).sample(sorted(user_sets), min(args.queries, len(user_sets)))
+    print(f'{len(user_sets)} usuarios, {len(recipes)} recetas, {len(queries)} consultas')
+
+    exact = IngredientOverlapStrategy(min_common_ingredients=args.min_common)
+    start = time.perf_counter()
+    overlap_truth = {}
+    for user_id in queries:
+        others = [r for r in recipes if r.author_id != user_id]
+        overlap_truth[user_id] = exact.find_similar_users(user_sets[user_id], others)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    jaccard_truth = {u: {o for o, s in user_sets.items() if o != u and jaccard(user_sets[u], s) >= args.jaccard}
+                     for u in queries}
+    print(f'exacta (IngredientOverlapStrategy, min={args.min_common}): {exact_ms:.2f} ms/consulta')
+
+    for config in args.configs:
+        bands, rows = (int(x) for x in config.split('x'))
+        hasher = MinHasher(bands * rows)
+        index = LSHIndex(bands, rows)
+        start = time.perf_counter()
+        for user_id, names in user_sets.items():
+            index.add(user_id, hasher.signature(names))
+        build_s = time.perf_counter() - start
+
+        found_overlap = found_jaccard = total_candidates = 0
+        start = time.perf_counter()
+        for user_id in queries:
+            strategy = MinHashLSHStrategy(bands, rows, exclude_user_id=user_id, index=index)
+            result = strategy.find_similar_users(user_sets[user_id])
+            total_candidates += len(result)
+            found_overlap += len(result & overlap_truth[user_id])
+            found_jaccard += len(result & jaccard_truth[user_id])
+        lsh_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        overlap_total = sum(len(t) for t in overlap_truth.values()) or 1
+        jaccard_total = sum(len(t) for t in jaccard_truth.values()) or 1
+        print(f'LSH {bands}x{rows}: construcción {build_s:.2f} s, {lsh_ms:.2f} ms/consulta, '
+              f'{total_candidates / len(queries):.1f} candidatos/consulta, '
+              f'recall solapamiento {found_overlap / overlap_total:.1%}, '
+              f'recall Jaccard>={args.jaccard} {found_jaccard / jaccard_total:.1%} '
+              f'(teórico {candidate_probability(args.jaccard, bands, rows):.1%})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--recipes-per-user', type=int, default=5)
+    parser.add_argument('--cuisines', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--min-common', type=int, default=2)
+    parser.add_argument('--jaccard', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--configs', nargs='+', default=['16x4', '32x2', '8x8'])
+    run(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# Benchmark de escalado del recálculo de similitudes en varios procesos (app/parallel_similarity.py)
+# Uso: python -m benchmarks.parallel_recompute --users 100000 --workers 1 2 4 8 --output escalado.json
+# Mide solo la puntuación (la escritura en similar_users es la misma con cualquier número de procesos) y la
+# compara con el bucle en un único proceso de SimilarityService.recompute_similarities. El informe JSON
+# guarda los núcleos disponibles: con más procesos que núcleos solo se mide el coste de repartir el trabajo y
+# esas filas quedan marcadas con "oversubscribed" (--require-cores hace que falle en vez de medirlas).
+
+import argparse
+import bisect
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from app.parallel_similarity import score_in_parallel
+from benchmarks.catalogue import zipf_cum_weights
+
+
+def generate_user_sets(users: int, vocabulary: int, seed: int):
+    """Ingredientes por usuario con distribución de Zipf (entre 5 y 80 por usuario)"""
+    rng = random.Random(seed)
+    weights = zipf_cum_weights(vocabulary, 1.1)
+    return {user_id: {bisect.bisect(weights, rng.random() * weights[-1]) for _ in range(rng.randint(5, 80))}
+            for user_id in range(1, users + 1)}
+
+
+def score_serial(user_sets, targets, min_common, top_k):
+    """El bucle de un solo proceso de recompute_similarities (con el recorte a top-K incluido)"""
+    postings = defaultdict(list)
+    for user_id, ingredients in user_sets.items():
+        for ingredient_id in ingredients:
+            postings[ingredient_id].append(user_id)
+    neighbours = {}
+    for user_id in targets:
+        counts = Counter()
+        mine = user_sets[user_id]
+        for ingredient_id in mine:
+            counts.update(postings[ingredient_id])
+        scores = sorted(((common / (len(mine) + len(user_sets[other_id]) - common), other_id)
+                         for other_id, common in counts.items() if other_id != user_id and common >= min_common),
+                        key=lambda item: (-item[0], item[1]))
+        neighbours[user_id] = {other_id: score for score, other_id in scores[:top_k]}
+    return neighbours
+
+
+def available_cores() -> int:
+    """Núcleos que puede usar este proceso (la afinidad de CPU, si el sistema la expone)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run(args):
+    user_sets = generate_user_sets(args.users, args.vocabulary, args.seed)
+    targets = sorted(user_sets)[:args.targets] if args.targets else sorted(user_sets)
+    cores = available_cores()
+    print(f'{len(user_sets)} usuarios, {len(targets)} a recalcular, {cores} núcleos')
+    if max(args.workers) > cores and args.require_cores:
+        print(f'Hacen falta {max(args.workers)} núcleos para medir el escalado y solo hay {cores}')
+        return 2
+    if max(args.workers) > cores:
+        print(f'Aviso: hay más procesos que núcleos ({cores}); por encima de {cores} no se mide el escalado')
+
+    start = time.perf_counter()
+    expected = score_serial(user_sets, targets, args.min_common, args.top_k)
+    serial = time.perf_counter() - start
+    print(f'{"1 proceso (bucle actual)":26} {serial:8.2f} s')
+
+    results = []
+    for workers in args.workers:
+        start = time.perf_counter()
+        neighbours = score_in_parallel(user_sets, targets, args.min_common, args.top_k, workers)
+        elapsed = time.perf_counter() - start
+        assert neighbours == expected, 'El resultado en paralelo difiere del de un proceso'
+        note = '  (más procesos que núcleos)' if workers > cores else ''
+        print(f'{f"{workers} procesos":26} {elapsed:8.2f} s  aceleración x{serial / elapsed:5.2f}  '
+              f'eficiencia {serial / elapsed / workers:4.0%}{note}')
+        results.append({'workers': workers, 'seconds': round(elapsed, 3), 'speedup': round(serial / elapsed, 2),
+                        'oversubscribed': workers > cores})
+
+    if args.output:
+        report = {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'parameters': {'users': args.users, 'vocabulary': args.vocabulary, 'targets': len(targets),
+                           'min_common': args.min_common, 'top_k': args.top_k, 'seed': args.seed},
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'cores': cores},
+            'serial_seconds': round(serial, 3),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--vocabulary', type=int, default=2000)
+    parser.add_argument('--targets', type=int, default=None, help='Recalcula solo los primeros N usuarios')
+    parser.add_argument('--min-common', type=int, default=2)
+    parser.add_argument('--top-k', type=int, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Guarda los tiempos y los núcleos disponibles en este fichero JSON')
+    parser.add_argument('--require-cores', action='store_true',
+                        help='Falla si hay menos núcleos que procesos en lugar de medir sin escalado')
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
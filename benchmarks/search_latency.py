@@ -0,0 +1,121 @@
+# Benchmark de latencia de la búsqueda de recetas (FTS5 frente al índice en memoria)
+# Uso: python -m benchmarks.search_latency --recipes 1000000 [--memory] [--db /tmp/recetas.db] [--target-ms 10]
+# Termina con código 1 si alguna consulta supera el objetivo de latencia (mediana en caliente)
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from unittest import mock
+
+from app import create_app, db
+from app.models import Recipe, User
+from app.search import RecipeSearch
+from app.services import RecipeService
+
+DISHES = ['tortilla', 'paella', 'gazpacho', 'croquetas', 'lentejas', 'fabada', 'pisto', 'flan', 'bizcocho',
+          'ensalada', 'empanada', 'cocido', 'salmorejo', 'migas', 'torrijas', 'churros', 'pulpo', 'arroz']
+INGREDIENTS = ['huevo', 'patata', 'cebolla', 'ajo', 'tomate', 'pimiento', 'aceite', 'sal', 'harina', 'leche',
+               'azúcar', 'arroz', 'garbanzos', 'chorizo', 'pollo', 'gambas', 'calamar', 'perejil', 'limón',
+               'canela', 'queso', 'jamón', 'lentejas', 'zanahoria', 'calabacín', 'berenjena', 'atún', 'pan']
+WORDS = ['casera', 'rápida', 'tradicional', 'de la abuela', 'ligera', 'al horno', 'en olla', 'para niños',
+         'de temporada', 'picante', 'suave', 'con un toque', 'sin gluten', 'vegana', 'festiva']
+QUERIES = ['tortilla', 'paella marisco', 'gazp*', 'huevo patata', 'croquetas jamón', 'flan casero', 'azucar',
+           'lentejas chorizo', 'sin gluten', 'abuela', 'horno pollo', 'pulpo gallega', 'churr*', 'berenjena queso']
+
+
+def populate(recipes: int, seed: int, batch: int = 20000) -> None:
+    rng = random.Random(seed)
+    users = [User(username=f'usuario{i}') for i in range(max(1, recipes // 50))]
+    db.session.add_all(users)
+    db.session.commit()
+    user_ids = [user.id for user in users]
+    table = Recipe.__table__
+    connection = db.session.connection()
+    for start in range(0, recipes, batch):
+        rows = []
+        for i in range(start, min(start + batch, recipes)):
+            ingredients = rng.sample(INGREDIENTS, rng.randint(3, 8))
+            rows.append({
+                'title': f'{rng.choice(DISHES).capitalize()} {rng.choice(WORDS)} {i}',
+                'description': f'Receta {rng.choice(WORDS)} con {ingredients[0]} y {ingredients[1]}',
+                'ingredients': ', '.join(ingredients),
+                'steps': ' '.join(f'Añadir {name} y remover.' for name in ingredients),
+                'category': rng.choice(['Cena', 'Postre', 'Comida', 'Desayuno']),
+                'author_id': rng.choice(user_ids),
+            })
+        connection.execute(table.insert(), rows)
+    db.session.commit()
+
+
+def measure(fn, queries, repeat):
+    """Latencias (ms) de la primera pasada (IDF sin cachear), de las siguientes y mediana caliente por consulta"""
+    passes = []
+    for _ in range(repeat):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        passes.append(timings)
+    warm = passes[1:] or passes
+    per_query = {query: statistics.median(timings[i] for timings in warm) for i, query in enumerate(queries)}
+    return passes[0], sorted(t for timings in passes[1:] for t in timings), per_query
+
+
+def summary(timings):
+    timings = sorted(timings)
+    return (f'p50 {statistics.median(timings):7.2f} ms  p95 {timings[max(0, int(len(timings) * 0.95) - 1)]:7.2f} ms  '
+            f'máx {timings[-1]:7.2f} ms')
+
+
+def run(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'search_bench.db')
+    app = create_app('testing')
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    with app.app_context():
+        if not db.inspect(db.engine).has_table('recipes'):
+            db.create_all()
+            start = time.perf_counter()
+            populate(args.recipes, args.seed)
+            print(f'{args.recipes} recetas cargadas en {time.perf_counter() - start:.1f}s ({path})')
+        missed = 0
+        engine = 'memoria' if args.memory or not RecipeSearch.fts_enabled() else 'FTS5'
+        with mock.patch.object(RecipeSearch, 'fts_enabled', return_value=False) if args.memory else nullcontext():
+            if args.memory:
+                start = time.perf_counter()
+                RecipeSearch._memory_index()
+                print(f'Índice en memoria construido en {time.perf_counter() - start:.1f}s')
+            for label, fn in (('RecipeSearch.search', lambda q: RecipeSearch.search(q, limit=args.per_page)),
+                              ('RecipeService.search', lambda q: RecipeService.search(q, per_page=args.per_page))):
+                app.extensions.pop('recipe_search_stats', None)
+                cold, warm, per_query = measure(fn, QUERIES, args.repeat)
+                print(f'{engine:8} {label:22} frío      {summary(cold)}')
+                print(f'{engine:8} {label:22} caliente  {summary(warm)}')
+                slow = {query: ms for query, ms in per_query.items() if ms > args.target_ms}
+                for query, ms in sorted(slow.items(), key=lambda item: -item[1]):
+                    print(f'    FUERA DE OBJETIVO {query!r}: p50 {ms:.2f} ms > {args.target_ms:g} ms')
+                missed += len(slow)
+    if missed:
+        print(f'Objetivo de {args.target_ms:g} ms incumplido en {missed} mediciones')
+    return 1 if missed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--per-page', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--memory', action='store_true', help='Mide el índice invertido en memoria en lugar de FTS5')
+    parser.add_argument('--db', help='Reutiliza una base de datos ya generada')
+    parser.add_argument('--target-ms', type=float, default=10.0, help='Latencia máxima por consulta (mediana)')
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
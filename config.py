@@ -7,6 +7,64 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
+    # Réplica de lectura opcional: los get_* de los servicios leen de ella (app/database.py)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.environ.get('DATABASE_REPLICA_URL') \
+        else None
+    # Pool de conexiones de PostgreSQL/MySQL
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or 10)
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or 20)
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE') or 1800)  # Segundos
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT') or 30)
+    DATABASE_POOL_PRE_PING = os.environ.get('DATABASE_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # SQLite en fichero: PRAGMAs de cada conexión y conexiones reutilizadas por proceso
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024)
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE') or -64000)  # Negativo: KiB (64 MB)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE') or 5)
+    RECIPES_PER_PAGE = 12
+    USERS_PER_PAGE = 50
+    SIDEBAR_USERS = 30  # Usuarios mostrados en "Nuestra Comunidad" de la portada
+    # Índice LSH: bandas x filas valores de firma MinHash por usuario
+    MINHASH_BANDS = int(os.environ.get('MINHASH_BANDS') or 16)
+    MINHASH_ROWS = int(os.environ.get('MINHASH_ROWS') or 4)
+    # Recalcular usuarios similares en segundo plano (cola en la tabla similarity_jobs)
+    SIMILARITY_ASYNC = os.environ.get('SIMILARITY_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+    SIMILARITY_WORKER_THREADS = int(os.environ.get('SIMILARITY_WORKER_THREADS') or 1)  # 0: solo worker externo
+    SIMILARITY_WORKER_POLL_SECONDS = float(os.environ.get('SIMILARITY_WORKER_POLL_SECONDS') or 1.0)
+    SIMILARITY_JOB_MAX_ATTEMPTS = 3
+    SIMILARITY_JOB_STALE_SECONDS = 300  # Trabajos "running" más antiguos se consideran abandonados
+    SIMILARITY_TOP_K = int(os.environ.get('SIMILARITY_TOP_K') or 20)  # Vecinos guardados por usuario
+    # Feed (/feed): recetas guardadas por usuario, recetas recientes por vecino, vida media de la antigüedad y
+    # seguidores máximos a los que se empuja una receta nueva (el resto la recibe en su próximo recálculo)
+    FEED_SIZE = int(os.environ.get('FEED_SIZE') or 200)
+    FEED_RECIPES_PER_NEIGHBOUR = int(os.environ.get('FEED_RECIPES_PER_NEIGHBOUR') or 20)
+    FEED_HALF_LIFE_DAYS = float(os.environ.get('FEED_HALF_LIFE_DAYS') or 14)
+    FEED_FANOUT_LIMIT = int(os.environ.get('FEED_FANOUT_LIMIT') or 500)
+    # Búsqueda: 0 ordena por BM25 todas las coincidencias; N > 0 (aproximación opcional) solo ordena las N más
+    # recientes, más rápido con términos muy frecuentes pero sin encontrar recetas antiguas más relevantes
+    SEARCH_RANK_WINDOW = int(os.environ.get('SEARCH_RANK_WINDOW') or 0)
+    SEARCH_STATS_TTL = 300  # Caducidad de las estadísticas de términos (IDF)
+    # Cada cuántos segundos se pone al día el índice de búsqueda en memoria con lo que escriben otros procesos
+    SEARCH_CHECK_SECONDS = float(os.environ.get('SEARCH_CHECK_SECONDS') or 5)
+    # Sinónimos de ingredientes adicionales ("variante = canónico" por línea), cargados al arrancar
+    INGREDIENT_SYNONYMS_FILE = os.environ.get('INGREDIENT_SYNONYMS_FILE')
+    # Modo ASGI (asgi.py): URI del motor asíncrono (por defecto la de SQLALCHEMY_DATABASE_URI con aiosqlite,
+    # asyncpg o aiomysql) e hilos que ejecutan las vistas WSGI
+    ASYNC_DATABASE_URI = os.environ.get('ASYNC_DATABASE_URI')
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS') or 8)
+    # Instrumentación por petición (app/instrumentation.py): cabecera Server-Timing, log JSON y /metrics;
+    # avisa de posible N+1 cuando una misma sentencia se repite este número de veces en una petición
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION', 'false').lower() in ('1', 'true', 'yes')
+    INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = int(os.environ.get('INSTRUMENTATION_N_PLUS_ONE_THRESHOLD') or 5)
+    # Caché de páginas: 'lru' (memoria del proceso), 'filesystem' (compartida entre workers) o 'null'
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'lru'
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL') or 300)
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 1024)
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(basedir, '.cache')
+    # Cada cuántos segundos comprueba el catálogo de ingredientes si otro proceso ha cambiado las recetas
+    CATALOGUE_CHECK_SECONDS = float(os.environ.get('CATALOGUE_CHECK_SECONDS') or 5)
 
     @staticmethod
     def init_app(app):
@@ -17,6 +75,13 @@ class DevelopmentConfig(Config):
     DEBUG = True
 
 
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SIMILARITY_ASYNC = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+
+
 class ProductionConfig(Config):
     @classmethod
     def init_app(cls, app):
@@ -32,6 +97,7 @@ class ProductionConfig(Config):
 
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
@@ -1,6 +1,13 @@
 import os
+import click
 from app import create_app, db
-from app.models import User, Recipe, SimilarUser
+from app.models import User, Recipe, SimilarUser, Ingredient
+from app.services import (IngredientIndexService, SimilarityService, SignatureService, CategoryProfileService,
+                          FeedService, RecipeService)
+from app.jobs import JobQueue, SimilarityWorker
+from app.search import RecipeSearch
+from app.importer import import_recipes as run_import
+from app.export import available_compressions, compress, compression_for, export_lines, export_records
 from flask_migrate import Migrate
 
 app = create_app(os.getenv('FLASK_CONFIG') or 'default')
@@ -9,7 +16,7 @@ migrate = Migrate(app, db)
 
 @app.shell_context_processor
 def make_shell_context():
-    return dict(db=db, User=User, Recipe=Recipe)
+    return dict(db=db, User=User, Recipe=Recipe, Ingredient=Ingredient)
 
 
 @app.cli.command()
@@ -29,44 +36,129 @@ def init_db():
 #     print(f'User {username} created.')
 
 @app.cli.command()
-def update_similar_users():
-    """Normaliza ingredientes y actualiza relaciones de usuarios similares para todos los usuarios."""
-    print('Normalizando ingredientes...')
-    # Normalizar ingredientes de todas las recetas
-    for recipe in Recipe.query.all():
-        ingredientes = [i.strip().lower() for i in recipe.ingredients.split(',') if i.strip()]
-        ingredientes = sorted(set(ingredientes))
-        recipe.ingredients = ', '.join(ingredientes)
-    db.session.commit()
-    print('Ingredientes normalizados.')
-
-    print('Eliminando relaciones previas...')
-    SimilarUser.query.delete()
-    db.session.commit()
-    print('Relaciones previas eliminadas.')
+@click.option('--since', type=click.DateTime(), default=None,
+              help='Solo recalcula usuarios con recetas creadas o editadas desde esta fecha.')
+@click.option('--min-common', default=2, show_default=True,
+              help='Ingredientes en común necesarios para considerar similares a dos usuarios.')
+@click.option('--engine', type=click.Choice(['posting', 'matrix']), default='posting', show_default=True,
+              help='posting: listas invertidas; matrix: matriz dispersa con vecinos top-K puntuados (NumPy/SciPy).')
+@click.option('--metric', type=click.Choice(['overlap', 'jaccard', 'cosine']), default='jaccard',
+              show_default=True, help='Puntuación usada por el motor matricial.')
+@click.option('--top-k', type=int, default=None, help='Vecinos guardados por usuario (por defecto SIMILARITY_TOP_K).')
+@click.option('--workers', type=int, default=1, show_default=True,
+              help='Procesos que puntúan usuarios en paralelo con el motor posting (0: uno por núcleo).')
+def update_similar_users(since, min_common, engine, metric, top_k, workers):
+    """Limpia el texto de ingredientes y actualiza relaciones de usuarios similares para todos los usuarios."""
+    print('Limpiando el texto de ingredientes...')
+    changed = IngredientIndexService.normalize_recipe_texts(since=since)
+    print(f'Texto de ingredientes limpio ({changed} recetas modificadas).')
 
     print('Calculando nuevas relaciones de gustos similares...')
-    users = User.query.all()
-    for user in users:
-        user_recipes = Recipe.query.filter_by(author_id=user.id).all()
-        user_ings = set()
-        for r in user_recipes:
-            user_ings.update([i.strip().lower() for i in r.ingredients.split(',') if i.strip()])
-        if not user_ings:
-            continue
-        # Buscar otros usuarios con al menos 2 ingredientes en común
-        for other in users:
-            if other.id == user.id:
-                continue
-            other_recipes = Recipe.query.filter_by(author_id=other.id).all()
-            other_ings = set()
-            for r in other_recipes:
-                other_ings.update([i.strip().lower() for i in r.ingredients.split(',') if i.strip()])
-            if len(user_ings & other_ings) >= 2:
-                if not SimilarUser.query.filter_by(user_id=user.id, similar_user_id=other.id).first():
-                    db.session.add(SimilarUser(user_id=user.id, similar_user_id=other.id))
-    db.session.commit()
-    print('Relaciones de gustos similares actualizadas.')
+    if engine == 'matrix':
+        total = SimilarityService.recompute_top_k_similarities(metric=metric, top_k=top_k,
+                                                               min_common_ingredients=min_common, since=since)
+    else:
+        total = SimilarityService.recompute_similarities(min_common_ingredients=min_common, since=since, top_k=top_k,
+                                                         workers=workers or os.cpu_count() or 1)
+    print(f'Relaciones de gustos similares actualizadas para {total} usuarios.')
+    rows = FeedService.rebuild_all()
+    print(f'Feeds recalculados ({rows} recetas recomendadas).')
+
+@app.cli.command()
+def reindex_ingredients():
+    """Reconstruye el índice invertido de ingredientes, los perfiles de categoría y los resúmenes de los listados."""
+    print('Reconstruyendo índice de ingredientes...')
+    total = IngredientIndexService.rebuild()
+    print(f'Índice reconstruido para {total} recetas.')
+    rows = CategoryProfileService.rebuild()
+    print(f'Perfiles de categoría reconstruidos ({rows} filas).')
+    rows = RecipeService.rebuild_summaries()
+    print(f'Resúmenes de recetas reconstruidos ({rows} filas).')
+
+@app.cli.command()
+@click.option('--chunk-size', default=1000, show_default=True, help='Recetas leídas y actualizadas por bloque.')
+@click.option('--reindex/--no-reindex', default=True, show_default=True,
+              help='Reconstruye después el índice de ingredientes con los nombres canónicos.')
+def normalize_ingredients(chunk_size, reindex):
+    """Limpia los espacios del texto de ingredientes y reindexa con los nombres canónicos."""
+    print('Limpiando el texto de ingredientes...')
+    changed = IngredientIndexService.normalize_recipe_texts(chunk_size=chunk_size)
+    print(f'Texto de ingredientes limpio ({changed} recetas modificadas).')
+    if reindex:
+        total = IngredientIndexService.rebuild()
+        print(f'Índice de ingredientes reconstruido para {total} recetas.')
+
+@app.cli.command()
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['jsonl', 'csv']), default=None,
+              help='Formato del fichero (por defecto según la extensión).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Recetas insertadas por bloque (un commit cada uno).')
+@click.option('--create-authors', is_flag=True, help='Da de alta los autores que no existen en lugar de rechazar la fila.')
+@click.option('--checkpoint', default=None,
+              help='Nombre del checkpoint guardado en la base de datos para reanudar (por defecto la ruta de PATH).')
+@click.option('--min-common', default=2, show_default=True,
+              help='Ingredientes en común para el recálculo de similitudes al terminar.')
+def import_recipes(path, fmt, chunk_size, create_authors, checkpoint, min_common):
+    """Importa recetas desde un fichero JSONL o CSV por bloques y recalcula índices y similitudes al final."""
+    def progress(stats):
+        print(f'{stats.imported} recetas importadas, {stats.rejected} rechazadas '
+              f'({stats.read / max(stats.seconds, 1e-9):.0f} filas/s)')
+
+    def reject(line, reason):
+        click.echo(f'Línea {line}: {reason}', err=True)
+
+    stats = run_import(path, fmt=fmt, chunk_size=chunk_size, create_authors=create_authors,
+                       checkpoint_key=checkpoint or os.path.abspath(path), min_common_ingredients=min_common,
+                       on_reject=reject, on_progress=progress)
+    if stats.skipped:
+        print(f'Reanudado desde el checkpoint: {stats.skipped} líneas ya importadas.')
+    print(f'Importación terminada: {stats.imported} recetas, {stats.rejected} rechazadas, '
+          f'{stats.read / max(stats.seconds, 1e-9):.0f} filas/s en {stats.seconds:.1f}s.')
+
+@app.cli.command()
+@click.option('--output', '-o', default='-', show_default=True, help='Fichero de salida (- para la salida estándar).')
+@click.option('--compression', type=click.Choice(['none', 'gzip', 'zstd']), default=None,
+              help='Compresión al vuelo (por defecto según la extensión: .gz o .zst).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Filas leídas por viaje a la base de datos.')
+@click.option('--include-password-hashes', is_flag=True, help='Incluye los hashes de contraseña (copia completa).')
+def export_recipes(output, compression, chunk_size, include_password_hashes):
+    """Exporta usuarios, recetas y relaciones de similitud en JSON Lines con memoria constante."""
+    compression = compression or compression_for(output)
+    if compression not in available_compressions():
+        raise click.UsageError(f'Compresión {compression} no disponible (instala zstandard).')
+    body = compress(export_lines(export_records(chunk_size, include_password_hashes)), compression)
+    with click.open_file(output, 'wb') as target:
+        for chunk in body:
+            target.write(chunk)
+
+@app.cli.command()
+def rebuild_search():
+    """Crea (si hace falta) y reconstruye el índice de búsqueda de texto completo de las recetas."""
+    if RecipeSearch.rebuild():
+        print('Índice FTS5 reconstruido; se mantiene sincronizado con triggers sobre la tabla recipes.')
+    else:
+        print('FTS5 no disponible: la búsqueda usará el índice invertido en memoria.')
+
+@app.cli.command()
+def rebuild_minhash():
+    """Recalcula las firmas MinHash y el índice LSH de todos los usuarios."""
+    bands, rows = app.config['MINHASH_BANDS'], app.config['MINHASH_ROWS']
+    print(f'Calculando firmas MinHash ({bands} bandas x {rows} filas)...')
+    total = SignatureService.rebuild_all()
+    print(f'Firmas actualizadas para {total} usuarios.')
+
+@app.cli.command()
+@click.option('--threads', default=1, show_default=True, help='Hilos que consumen la cola.')
+def similarity_worker(threads):
+    """Ejecuta el worker de recálculo de usuarios similares como proceso independiente."""
+    print(f'Worker de similitudes escuchando la cola con {threads} hilos (Ctrl+C para salir)...')
+    SimilarityWorker(app, threads=threads, poll_interval=app.config['SIMILARITY_WORKER_POLL_SECONDS']).run_forever()
+
+@app.cli.command()
+def jobs_status():
+    """Muestra la profundidad y el retraso de la cola de recálculo."""
+    for name, value in JobQueue.metrics().items():
+        print(f'{name}: {value}')
 
 # if __name__ == '__main__':
 #     app.run()
@@ -0,0 +1,112 @@
+"""Tablas y columnas de los modelos que no existen en las bases creadas con la versión original
+
+Las bases creadas por `flask init-db` antes de las migraciones solo tienen `users`, `recipes` y
+`similar_users`. Esta revisión crea lo que falte del índice de ingredientes, los perfiles de categoría, las
+firmas MinHash, la cola de recálculo y las columnas `recipes.updated_at` y `similar_users.score`; lo que ya
+exista (bases creadas con `db.create_all()`) se deja como está. Las tablas nuevas quedan vacías hasta el
+siguiente `flask reindex-ingredients` y `flask rebuild-minhash`.
+
+Revision ID: 0d4a7c1e9b52
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d4a7c1e9b52'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_tables(inspector):
+    if not inspector.has_table('ingredients'):
+        op.create_table(
+            'ingredients',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(length=128), nullable=False),
+        )
+        op.create_index('ix_ingredients_name', 'ingredients', ['name'], unique=True)
+    if not inspector.has_table('recipe_ingredients'):
+        op.create_table(
+            'recipe_ingredients',
+            sa.Column('recipe_id', sa.Integer(), sa.ForeignKey('recipes.id'), primary_key=True),
+            sa.Column('ingredient_id', sa.Integer(), sa.ForeignKey('ingredients.id'), primary_key=True),
+            sa.Column('recipe_size', sa.Integer(), nullable=False, server_default='0'),
+        )
+        op.create_index('ix_recipe_ingredients_ingredient_recipe', 'recipe_ingredients',
+                        ['ingredient_id', 'recipe_id'])
+        op.create_index('ix_recipe_ingredients_ingredient_size', 'recipe_ingredients',
+                        ['ingredient_id', 'recipe_size', 'recipe_id'])
+    if not inspector.has_table('user_ingredients'):
+        op.create_table(
+            'user_ingredients',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('ingredient_id', sa.Integer(), sa.ForeignKey('ingredients.id'), primary_key=True),
+            sa.Column('recipe_count', sa.Integer(), nullable=False),
+        )
+        op.create_index('ix_user_ingredients_ingredient_user', 'user_ingredients', ['ingredient_id', 'user_id'])
+    if not inspector.has_table('user_categories'):
+        op.create_table(
+            'user_categories',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('category', sa.String(length=64), primary_key=True),
+            sa.Column('recipe_count', sa.Integer(), nullable=False),
+        )
+        op.create_index('ix_user_categories_category_user', 'user_categories', ['category', 'user_id'])
+    if not inspector.has_table('user_signatures'):
+        op.create_table(
+            'user_signatures',
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+            sa.Column('signature', sa.LargeBinary(), nullable=False),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+    if not inspector.has_table('lsh_buckets'):
+        op.create_table(
+            'lsh_buckets',
+            sa.Column('band', sa.Integer(), primary_key=True),
+            sa.Column('bucket', sa.BigInteger(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        )
+        op.create_index('ix_lsh_buckets_user', 'lsh_buckets', ['user_id'])
+    if not inspector.has_table('similarity_jobs'):
+        op.create_table(
+            'similarity_jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False, unique=True),
+            sa.Column('status', sa.String(length=16), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime()),
+            sa.Column('last_error', sa.Text()),
+        )
+        op.create_index('ix_similarity_jobs_status_enqueued', 'similarity_jobs', ['status', 'enqueued_at'])
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    _create_tables(inspector)
+
+    recipe_columns = {column['name'] for column in inspector.get_columns('recipes')}
+    if 'updated_at' not in recipe_columns:
+        op.add_column('recipes', sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute('UPDATE recipes SET updated_at = timestamp')  # Sin ediciones conocidas: la fecha de alta
+    if 'ix_recipes_updated_at' not in {index['name'] for index in inspector.get_indexes('recipes')}:
+        op.create_index('ix_recipes_updated_at', 'recipes', ['updated_at'])
+    if 'score' not in {column['name'] for column in inspector.get_columns('similar_users')}:
+        op.add_column('similar_users', sa.Column('score', sa.Float(), nullable=True))
+
+
+def downgrade():
+    op.drop_index('ix_recipes_updated_at', table_name='recipes')
+    with op.batch_alter_table('similar_users') as batch_op:
+        batch_op.drop_column('score')
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.drop_column('updated_at')
+    for table in ('similarity_jobs', 'lsh_buckets', 'user_signatures', 'user_categories', 'user_ingredients',
+                  'recipe_ingredients', 'ingredients'):
+        op.drop_table(table)
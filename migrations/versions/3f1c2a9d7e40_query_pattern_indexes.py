@@ -0,0 +1,56 @@
+"""Índices para los patrones de consulta reales y pares de similitud únicos
+
+Las bases creadas con `flask init-db` antes de esta revisión no tienen algunos de estos índices; los que ya
+existan (bases creadas con los modelos actuales) se dejan como están.
+
+Revision ID: 3f1c2a9d7e40
+Revises: 0d4a7c1e9b52
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d7e40'
+down_revision = '0d4a7c1e9b52'
+branch_labels = None
+depends_on = None
+
+# nombre -> (tabla, columnas); cada uno responde a una consulta de app/services.py
+INDEXES = {
+    # Listado general y por categoría paginados por cursor (timestamp, id)
+    'ix_recipes_timestamp_id': ('recipes', ['timestamp', 'id']),
+    'ix_recipes_category_timestamp_id': ('recipes', ['category', 'timestamp', 'id']),
+    # Recetas de un autor por fecha (y la clave ajena author_id)
+    'ix_recipes_author_timestamp_id': ('recipes', ['author_id', 'timestamp', 'id']),
+    # get_similar_users consulta los dos sentidos; (user_id, ...) lo cubre uq_similar_users_pair
+    'ix_similar_users_similar_user': ('similar_users', ['similar_user_id', 'user_id']),
+}
+
+
+def _existing_indexes(inspector, table):
+    names = {index['name'] for index in inspector.get_indexes(table)}
+    return names | {constraint['name'] for constraint in inspector.get_unique_constraints(table)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for name, (table, columns) in INDEXES.items():
+        if name not in _existing_indexes(inspector, table):
+            op.create_index(name, table, columns)
+
+    if 'uq_similar_users_pair' not in _existing_indexes(inspector, 'similar_users'):
+        # Elimina pares duplicados (se conserva el de menor id) antes de imponer la restricción
+        op.execute('DELETE FROM similar_users WHERE id NOT IN '
+                   '(SELECT MIN(id) FROM similar_users GROUP BY user_id, similar_user_id)')
+        with op.batch_alter_table('similar_users') as batch_op:
+            batch_op.create_unique_constraint('uq_similar_users_pair', ['user_id', 'similar_user_id'])
+
+
+def downgrade():
+    # Solo los índices que no declaraban ya los modelos anteriores
+    op.drop_index('ix_similar_users_similar_user', table_name='similar_users')
+    op.drop_index('ix_recipes_author_timestamp_id', table_name='recipes')
@@ -0,0 +1,39 @@
+"""Puntuación, fecha de cálculo, estrategia e índice de top-K por puntuación en similar_users
+
+Las relaciones existentes quedan sin fecha ni estrategia (y sin recortar a SIMILARITY_TOP_K) hasta el
+siguiente `flask update-similar-users`.
+
+Revision ID: 8b5e0d2c4a19
+Revises: 3f1c2a9d7e40
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5e0d2c4a19'
+down_revision = '3f1c2a9d7e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('similar_users')}
+    if 'score' not in columns:  # Bases anteriores a la puntuación de las relaciones
+        op.add_column('similar_users', sa.Column('score', sa.Float(), nullable=True))
+    if 'computed_at' not in columns:
+        op.add_column('similar_users', sa.Column('computed_at', sa.DateTime(), nullable=True))
+    if 'strategy' not in columns:
+        op.add_column('similar_users', sa.Column('strategy', sa.String(length=32), nullable=True))
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('similar_users')}
+    if 'ix_similar_users_user_score' not in indexes:
+        op.create_index('ix_similar_users_user_score', 'similar_users', ['user_id', 'score', 'similar_user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_similar_users_user_score', table_name='similar_users')
+    with op.batch_alter_table('similar_users') as batch_op:
+        batch_op.drop_column('strategy')
+        batch_op.drop_column('computed_at')
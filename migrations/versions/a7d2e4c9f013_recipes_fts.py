@@ -0,0 +1,34 @@
+"""Índice de búsqueda FTS5 (recipes_fts) con sus triggers en SQLite
+
+Hasta ahora solo lo creaban `db.create_all()` y `flask rebuild-search`; una base actualizada con
+`flask db upgrade` buscaba con el índice en memoria. Se crea y se llena con las recetas existentes. En otros
+motores, o con SQLite compilado sin FTS5, no hace nada.
+
+Revision ID: a7d2e4c9f013
+Revises: f3a9c6d1b274
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+
+from app.search import FTS_TABLE, FTS_TERMS, install_fts
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2e4c9f013'
+down_revision = 'f3a9c6d1b274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    install_fts(op.get_bind())  # Idempotente: IF NOT EXISTS y reconstrucción desde `recipes`
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in ('recipes_fts_ai', 'recipes_fts_ad', 'recipes_fts_au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute(f'DROP TABLE IF EXISTS {FTS_TERMS}')
+    op.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
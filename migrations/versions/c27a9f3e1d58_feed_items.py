@@ -0,0 +1,37 @@
+"""Tabla feed_items con el feed precalculado de cada usuario
+
+Se llena con el siguiente `flask update-similar-users` (o al procesar los trabajos de similitud).
+
+Revision ID: c27a9f3e1d58
+Revises: 8b5e0d2c4a19
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c27a9f3e1d58'
+down_revision = '8b5e0d2c4a19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('feed_items'):
+        return
+    op.create_table(
+        'feed_items',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('recipe_id', sa.Integer(), sa.ForeignKey('recipes.id'), primary_key=True),
+        sa.Column('rank', sa.Float(), nullable=False),
+    )
+    op.create_index('ix_feed_items_user_rank', 'feed_items', ['user_id', 'rank', 'recipe_id'])
+    op.create_index('ix_feed_items_recipe', 'feed_items', ['recipe_id'])
+
+
+def downgrade():
+    op.drop_index('ix_feed_items_recipe', table_name='feed_items')
+    op.drop_index('ix_feed_items_user_rank', table_name='feed_items')
+    op.drop_table('feed_items')
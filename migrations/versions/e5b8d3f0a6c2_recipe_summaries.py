@@ -0,0 +1,47 @@
+"""Tabla recipe_summaries con el resumen de cada receta para los listados
+
+Se llena con las recetas existentes; después la mantienen los eventos de app/summaries.py.
+
+Revision ID: e5b8d3f0a6c2
+Revises: c27a9f3e1d58
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8d3f0a6c2'
+down_revision = 'c27a9f3e1d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('recipe_summaries'):
+        return
+    op.create_table(
+        'recipe_summaries',
+        sa.Column('id', sa.Integer(), sa.ForeignKey('recipes.id'), primary_key=True),
+        sa.Column('title', sa.String(length=128), nullable=False),
+        sa.Column('author_id', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('author_username', sa.String(length=64)),
+        sa.Column('category', sa.String(length=64)),
+        sa.Column('timestamp', sa.DateTime()),
+        sa.Column('excerpt', sa.String(length=150), nullable=False),
+        sa.Column('truncated', sa.Boolean(), nullable=False),
+    )
+    op.create_index('ix_recipe_summaries_timestamp_id', 'recipe_summaries', ['timestamp', 'id'])
+    op.create_index('ix_recipe_summaries_category_timestamp_id', 'recipe_summaries', ['category', 'timestamp', 'id'])
+    op.execute(
+        'INSERT INTO recipe_summaries (id, title, author_id, author_username, category, timestamp, excerpt, truncated) '
+        'SELECT recipes.id, recipes.title, recipes.author_id, users.username, recipes.category, recipes.timestamp, '
+        'substr(recipes.description, 1, 150), length(recipes.description) > 150 '
+        'FROM recipes LEFT OUTER JOIN users ON users.id = recipes.author_id')
+
+
+def downgrade():
+    op.drop_index('ix_recipe_summaries_category_timestamp_id', table_name='recipe_summaries')
+    op.drop_index('ix_recipe_summaries_timestamp_id', table_name='recipe_summaries')
+    op.drop_table('recipe_summaries')
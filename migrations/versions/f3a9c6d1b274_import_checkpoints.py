@@ -0,0 +1,37 @@
+"""Tabla import_checkpoints con el progreso de `flask import-recipes`
+
+El checkpoint se guardaba en un fichero JSON después del commit de cada bloque; ahora es una fila que se
+confirma en la misma transacción que las recetas del bloque.
+
+Revision ID: f3a9c6d1b274
+Revises: e5b8d3f0a6c2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c6d1b274'
+down_revision = 'e5b8d3f0a6c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table('import_checkpoints'):
+        return
+    op.create_table(
+        'import_checkpoints',
+        sa.Column('key', sa.String(length=512), primary_key=True),
+        sa.Column('source', sa.String(length=1024), nullable=False),
+        sa.Column('line', sa.Integer(), nullable=False),
+        sa.Column('imported', sa.Integer(), nullable=False),
+        sa.Column('rejected', sa.Integer(), nullable=False),
+        sa.Column('indexed', sa.Boolean(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoints')
@@ -0,0 +1,117 @@
+import json
+import unittest
+from base64 import b64encode
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe
+from app.services import RecipeService, SimilarityService
+
+
+class APIv1TestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        self.ana.set_password('secreto')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        self.recipes = [RecipeService.create_recipe(f'Receta {i}', 'd', 'huevo, sal', 'pasos', 'Cena', self.ana)
+                        for i in range(5)]
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get_api_headers(self, username, password):
+        return {
+            'Authorization': 'Basic ' + b64encode((username + ':' + password).encode('utf-8')).decode('utf-8'),
+            'Accept': 'application/json',
+            'Content-Type': 'application/json'
+        }
+
+    def get_json(self, url, **kwargs):
+        response = self.client.get(url, **kwargs)
+        return response, json.loads(response.get_data(as_text=True) or 'null')
+
+    def test_cursor_pagination(self):
+        titles, url = [], '/api/v1/recipes?per_page=2'
+        while url:
+            response, body = self.get_json(url)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(recipe['title'] for recipe in body['recipes'])
+            url = body['next']
+        self.assertEqual(titles, [f'Receta {i}' for i in reversed(range(5))])
+        self.assertEqual(self.client.get('/api/v1/recipes?cursor=roto').status_code, 400)
+
+    def test_sparse_fieldsets_load_only_requested_columns(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            _, body = self.get_json('/api/v1/recipes?fields=title')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual(set(body['recipes'][0]), {'id', 'title'})
+        select = next(statement for statement in statements if 'FROM recipes' in statement)
+        self.assertNotIn('recipes.steps', select)
+        self.assertNotIn('users', select)
+        response, body = self.get_json('/api/v1/recipes?fields=title,secreto')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_get_and_etag(self):
+        ids = [self.recipes[3].id, 999, self.recipes[0].id]
+        response, body = self.get_json('/api/v1/recipes?ids=' + ','.join(map(str, ids)) + '&fields=title,author')
+        self.assertEqual([recipe['title'] for recipe in body['recipes']], ['Receta 3', 'Receta 0'])
+        self.assertEqual(body['recipes'][0]['author']['username'], 'ana')
+        self.assertEqual(body['missing'], [999])
+
+        etag = response.headers['ETag']
+        again = self.client.get('/api/v1/recipes?ids=' + ','.join(map(str, ids)) + '&fields=title,author',
+                                headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get(f'/api/v1/recipes/{self.recipes[0].id}').status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/recipes/999').status_code, 404)
+
+    def test_batch_create_is_atomic_and_authenticated(self):
+        recipe = {'title': 'Flan', 'description': 'Postre', 'ingredients': 'huevo, leche', 'steps': 'Hornear',
+                  'category': 'Postre'}
+        self.assertEqual(self.client.post('/api/v1/recipes', data=json.dumps(recipe),
+                                          content_type='application/json').status_code, 401)
+        self.assertEqual(self.client.post('/api/v1/recipes', data=json.dumps(recipe),
+                                          headers=self.get_api_headers('ana', 'mal')).status_code, 401)
+
+        response = self.client.post('/api/v1/recipes', data=json.dumps([recipe, dict(recipe, steps='')]),
+                                    headers=self.get_api_headers('ana', 'secreto'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Recipe.query.count(), 5)
+
+        response = self.client.post('/api/v1/recipes', data=json.dumps([recipe, dict(recipe, title='Natillas')]),
+                                    headers=self.get_api_headers('ana', 'secreto'))
+        self.assertEqual(response.status_code, 201)
+        created = json.loads(response.get_data(as_text=True))['recipes']
+        self.assertEqual([r['title'] for r in created], ['Flan', 'Natillas'])
+        self.assertEqual(created[0]['author']['username'], 'ana')
+
+        response = self.client.post('/api/v1/recipes', data=json.dumps(recipe),
+                                    headers=self.get_api_headers('ana', 'secreto'))
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('/api/v1/recipes/', response.headers['Location'])
+
+    def test_users_categories_and_similar(self):
+        SimilarityService.replace_user_similarities(self.ana.id, [self.luis.id])
+        db.session.commit()
+        _, body = self.get_json('/api/v1/users?per_page=1')
+        self.assertEqual(body['users'][0]['username'], 'ana')
+        _, body = self.get_json(body['next'])
+        self.assertEqual([user['username'] for user in body['users']], ['luis'])
+        _, body = self.get_json(f'/api/v1/users/{self.ana.id}/similar?fields=username')
+        self.assertEqual(body['users'], [{'id': self.luis.id, 'username': 'luis'}])
+        _, body = self.get_json('/api/v1/categories')
+        self.assertEqual(body['categories'][0]['name'], 'Cena')
+        self.assertEqual(body['categories'][0]['recipes'], 5)
+        response, body = self.get_json('/api/v1/users/999')
+        self.assertEqual((response.status_code, body['error']), (404, 'not found'))
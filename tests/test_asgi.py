@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.models import User
+from app.services import RecipeService, SimilarityService
+
+try:
+    import aiosqlite
+except ImportError:  # Dependencia opcional del modo ASGI
+    aiosqlite = None
+
+
+async def call(app, method, path, query=b'', headers=(), body=b''):
+    """Petición HTTP directa a una aplicación ASGI; devuelve (estado, cabeceras, cuerpo)"""
+    messages = []
+    request = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return request.pop(0) if request else {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({'type': 'http', 'method': method, 'path': path, 'query_string': query, 'headers': list(headers),
+               'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1)},
+              receive, send)
+    start = messages[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+
+@unittest.skipUnless(aiosqlite is not None, 'requiere aiosqlite')
+class ASGITestCase(unittest.TestCase):
+    def setUp(self):
+        from app.asgi import create_asgi_app
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = create_app('testing')
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'asgi.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        self.recipes = [RecipeService.create_recipe(f'Receta {i}', 'd', 'huevo, sal', 's', 'Cena', self.ana)
+                        for i in range(3)]
+        SimilarityService.replace_user_similarities(self.ana.id, [self.luis.id])
+        db.session.commit()
+        self.asgi = create_asgi_app(app=self.app)
+
+    def tearDown(self):
+        from app.async_services import async_db
+        asyncio.run(async_db.dispose())
+        self.asgi.wsgi.executor.shutdown()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def get(self, path, query=b'', headers=()):
+        return asyncio.run(call(self.asgi, 'GET', path, query, headers))
+
+    def test_async_reads_match_sync_api(self):
+        client = self.app.test_client()
+        for path, query in [(f'/api/v1/recipes/{self.recipes[1].id}', b''),
+                            ('/api/v1/recipes', b'category=Cena&per_page=2&fields=title,author'),
+                            (f'/api/v1/users/{self.ana.id}/similar', b'')]:
+            status, headers, body = self.get(path, query)
+            expected = client.get(path + '?' + query.decode())
+            self.assertEqual(status, 200)
+            self.assertEqual(json.loads(body), expected.get_json())
+            self.assertEqual(headers[b'etag'].decode(), expected.headers['ETag'])
+
+    def test_conditional_get_and_errors(self):
+        path = f'/api/v1/recipes/{self.recipes[0].id}'
+        _, headers, _ = self.get(path)
+        status, _, body = self.get(path, headers=[(b'if-none-match', headers[b'etag'])])
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(self.get('/api/v1/recipes/999')[0], 404)
+        self.assertEqual(self.get('/api/v1/recipes', b'cursor=roto')[0], 400)
+        self.assertEqual(self.get('/api/v1/users/999/similar')[0], 404)
+
+    def test_other_routes_fall_back_to_wsgi(self):
+        status, headers, body = self.get('/')
+        self.assertEqual(status, 200)
+        self.assertIn('Receta 2', body.decode('utf-8'))
+        status, _, body = self.get('/api/v1/recipes', b'ids=%d' % self.recipes[0].id)
+        self.assertEqual(json.loads(body)['recipes'][0]['title'], 'Receta 0')
+        post = asyncio.run(call(self.asgi, 'POST', '/api/v1/recipes', body=b'{}',
+                                headers=[(b'content-type', b'application/json')]))
+        self.assertEqual(post[0], 401)
+
+    def test_websocket_is_rejected(self):
+        messages = []
+
+        async def receive():
+            return {'type': 'websocket.connect'}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.asgi({'type': 'websocket', 'path': '/', 'query_string': b'', 'headers': []}, receive, send))
+        self.assertEqual([message['type'] for message in messages], ['websocket.close'])
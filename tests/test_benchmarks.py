@@ -0,0 +1,37 @@
+import unittest
+from collections import Counter
+from app import create_app, db
+from app.models import Recipe, User
+from benchmarks.catalogue import CatalogueGenerator
+from benchmarks.hot_paths import compare
+
+
+class CatalogueGeneratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_seeded_catalogue_is_reproducible_and_skewed(self):
+        generator = CatalogueGenerator(2000, seed=3, users=100)
+        rows = list(generator.recipes_rows(list(range(1, 101))))
+        self.assertEqual(rows, list(CatalogueGenerator(2000, seed=3, users=100).recipes_rows(list(range(1, 101)))))
+        ingredients = Counter(name for row in rows for name in row['ingredients'].split(', '))
+        ranked = [count for _, count in ingredients.most_common()]
+        self.assertGreater(ranked[0], 10 * ranked[len(ranked) // 2])  # Zipf: cabeza muy por encima de la mediana
+        authors = Counter(row['author_id'] for row in rows).most_common()
+        self.assertGreater(authors[0][1], 5 * authors[-1][1])
+
+        generator.populate()
+        self.assertEqual((User.query.count(), Recipe.query.count()), (100, 2000))
+
+    def test_compare_flags_regressions_beyond_threshold(self):
+        baseline = {'a': {'p50_ms': 10.0}, 'b': {'p50_ms': 10.0}}
+        results = {'a': {'p50_ms': 11.0}, 'b': {'p50_ms': 13.0}, 'nuevo': {'p50_ms': 1.0}}
+        self.assertEqual([name for name, *_ in compare(results, baseline, 0.2)], ['b'])
@@ -0,0 +1,110 @@
+import tempfile
+import time
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.cache import FileSystemCache, LRUCache, cache
+from app.models import User, Recipe
+from app.services import RecipeService, SimilarityService
+
+
+class CacheBackendTestCase(unittest.TestCase):
+    def test_lru_eviction_and_ttl(self):
+        backend = LRUCache(max_entries=2, default_ttl=300)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)  # Expulsa 'b', el menos usado
+        self.assertEqual(backend.get('a'), 1)
+        self.assertIsNone(backend.get('b'))
+        backend.set('d', 4, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(backend.get('d'))
+
+    def test_filesystem_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            FileSystemCache(directory).set('clave', {'x': 1})
+            self.assertEqual(FileSystemCache(directory).get('clave'), {'x': 1})
+            self.assertIsNone(FileSystemCache(directory).get('otra'))
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        self.recipe = RecipeService.create_recipe('Tortilla', 'd', 'huevo, patata', 's', 'Cena', self.ana)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_queries(self, fn):
+        queries = []
+        listener = lambda *args: queries.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return result, queries
+
+    def test_hit_and_conditional_get(self):
+        first = self.client.get(f'/recipe/{self.recipe.id}')
+        self.assertEqual(first.status_code, 200)
+        self.assertIsNotNone(first.headers.get('ETag'))
+        self.assertIsNotNone(first.headers.get('Last-Modified'))
+
+        second, queries = self._count_queries(lambda: self.client.get(f'/recipe/{self.recipe.id}'))
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertEqual(queries, [])
+
+        not_modified, queries = self._count_queries(lambda: self.client.get(
+            f'/recipe/{self.recipe.id}', headers={'If-None-Match': first.headers['ETag']}))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(queries, [])
+
+        metrics = cache.metrics()
+        self.assertEqual((metrics['misses'], metrics['hits'], metrics['not_modified']), (1, 1, 1))
+
+    def test_recipe_mutations_invalidate(self):
+        before = self.client.get('/')
+        self.assertIn(b'Tortilla', before.get_data())
+        RecipeService.update_recipe(self.recipe, 'Tortilla de patatas', 'd', 'huevo, patata', 's', 'Cena')
+
+        after = self.client.get('/', headers={'If-None-Match': before.headers['ETag']})
+        self.assertEqual(after.status_code, 200)
+        self.assertIn(b'Tortilla de patatas', after.get_data())
+        self.assertIn(b'Tortilla de patatas', self.client.get(f'/recipe/{self.recipe.id}').get_data())
+
+        RecipeService.delete_recipe(self.recipe)
+        self.assertNotIn(b'Tortilla', self.client.get('/category/Cena').get_data())
+
+    def test_similarity_mutations_invalidate(self):
+        self.assertNotIn(b'luis', self.client.get(f'/user/{self.ana.id}').get_data())
+        SimilarityService.replace_user_similarities(self.ana.id, [self.luis.id])
+        db.session.commit()
+        self.assertIn(b'luis', self.client.get(f'/user/{self.ana.id}').get_data())
+        self.assertIn(b'ana', self.client.get(f'/user/{self.luis.id}').get_data())
+
+    def test_lru_tag_versions_expire(self):
+        # Un commit de otro proceso no invalida la memoria de este: el ETag deja de valer al caducar la versión
+        cache.backend.default_ttl = cache.tag_ttl = 0.01
+        first = self.client.get('/')
+        time.sleep(0.02)
+        second = self.client.get('/', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second.headers['ETag'], first.headers['ETag'])
+
+    def test_rollback_does_not_invalidate(self):
+        self.client.get('/')
+        invalidations = cache.metrics()['invalidations']
+        SimilarityService.replace_user_similarities(self.ana.id, [self.luis.id])
+        db.session.rollback()
+        self.assertEqual(cache.metrics()['invalidations'], invalidations)
@@ -0,0 +1,104 @@
+import unittest
+from datetime import datetime
+from app import create_app, db
+from app.catalogue import IngredientCatalogue
+from app.models import User, Recipe
+from app.services import IngredientIndexService, RecipeService
+from app.strategies import IngredientOverlapStrategy, MatchingStrategyFactory
+
+
+class IngredientCatalogueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis, self.eva = users = [User(username=n) for n in ('ana', 'luis', 'eva')]
+        db.session.add_all(users)
+        db.session.commit()
+        RecipeService.create_recipe('Tortilla', 'd', 'huevo, patata, cebolla', 'p', 'Cena', self.ana)
+        RecipeService.create_recipe('Revuelto', 'd', 'huevo, ajo', 'p', 'Cena', self.luis)
+        RecipeService.create_recipe('Flan', 'd', 'huevo, leche, azúcar', 'p', 'Postre', self.eva)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def names(self, catalogue, user):
+        return catalogue.user_names(user.id)
+
+    def test_built_from_index_matches_orm_recipes(self):
+        from_database = IngredientCatalogue.from_database()
+        from_recipes = IngredientCatalogue.from_recipes(Recipe.query.all())
+        for user in (self.ana, self.luis, self.eva):
+            self.assertEqual(self.names(from_database, user), self.names(from_recipes, user))
+        self.assertEqual(self.names(from_database, self.ana), {'huevo', 'patata', 'cebolla'})
+        self.assertEqual([(r.author_id, r.category) for r in from_database.records()],
+                         [(self.ana.id, 'Cena'), (self.luis.id, 'Cena'), (self.eva.id, 'Postre')])
+        self.assertEqual(list(from_database.user_ingredients(self.ana.id)),
+                         sorted(from_database.user_ingredients(self.ana.id)))
+
+    def test_recipe_writes_refresh_the_application_catalogue(self):
+        catalogue = IngredientCatalogue.current()
+        recipe = RecipeService.create_recipe('Gazpacho', 'd', 'tomate, ajo', 'p', 'Cena', self.ana)
+        self.assertEqual(self.names(catalogue, self.ana), {'huevo', 'patata', 'cebolla', 'tomate', 'ajo'})
+        RecipeService.update_recipe(recipe, 'Gazpacho', 'd', 'tomate, pepino', 'p', 'Cena')
+        self.assertEqual(self.names(catalogue, self.ana), {'huevo', 'patata', 'cebolla', 'tomate', 'pepino'})
+        RecipeService.delete_recipe(recipe)
+        self.assertEqual(self.names(catalogue, self.ana), {'huevo', 'patata', 'cebolla'})
+        self.assertEqual(len(catalogue), 3)
+        self.assertIsNone(catalogue.get(recipe.id))
+        self.assertIs(IngredientCatalogue.current(), catalogue)
+
+    def test_writes_from_another_process_rebuild_the_catalogue(self):
+        self.app.config['CATALOGUE_CHECK_SECONDS'] = 0
+        catalogue = IngredientCatalogue.current()
+        recipe = RecipeService.create_recipe('Gazpacho', 'd', 'tomate, ajo', 'p', 'Cena', self.ana)
+        RecipeService.update_recipe(recipe, 'Gazpacho', 'd', 'tomate, pepino', 'p', 'Cena')
+        RecipeService.delete_recipe(recipe)
+        self.assertIs(IngredientCatalogue.current(), catalogue)  # Las escrituras propias ya están aplicadas
+
+        # Otro proceso: escribe en la base sin pasar por el catálogo de esta aplicación
+        other = Recipe(title='Gachas', description='d', ingredients='harina, ajo', steps='p', author=self.luis)
+        db.session.add(other)
+        db.session.flush()
+        IngredientIndexService.index_recipe(other)
+        db.session.commit()
+        self.app.config['CATALOGUE_CHECK_SECONDS'] = 3600
+        self.assertIs(IngredientCatalogue.current(), catalogue)  # Aún no toca comprobar
+        self.app.config['CATALOGUE_CHECK_SECONDS'] = 0
+        rebuilt = IngredientCatalogue.current()
+        self.assertIsNot(rebuilt, catalogue)
+        self.assertEqual(self.names(rebuilt, self.luis), {'huevo', 'ajo', 'harina'})
+
+        Recipe.query.filter_by(id=other.id).update({'updated_at': datetime.utcnow()})
+        db.session.commit()
+        self.assertIsNot(IngredientCatalogue.current(), rebuilt)
+
+    def test_compaction_keeps_recipes_addressable(self):
+        catalogue = IngredientCatalogue()
+        for recipe_id in range(1, 3001):
+            catalogue.add(recipe_id, recipe_id % 7 + 1, 'Cena', ['sal', f'ingrediente {recipe_id % 50}'])
+        for recipe_id in range(1, 3001, 3):
+            catalogue.add(recipe_id, recipe_id % 7 + 1, 'Postre', ['arroz'])
+        self.assertLess(len(catalogue._tail), 3000)  # Se ha compactado por el camino
+        self.assertEqual(len(catalogue), 3000)
+        self.assertEqual(catalogue.get(4).category, 'Postre')
+        self.assertEqual([catalogue.names[i] for i in catalogue.get(5).ingredient_ids], ['sal', 'ingrediente 5'])
+        self.assertLess(catalogue.nbytes(), 100 * 3000)
+
+    def test_strategies_accept_the_catalogue(self):
+        catalogue = IngredientCatalogue.from_database()
+        recipes = Recipe.query.all()
+        for strategy in (IngredientOverlapStrategy(min_common_ingredients=1),
+                         MatchingStrategyFactory.create_strategy('category_matching'),
+                         MatchingStrategyFactory.create_strategy('hybrid'),
+                         MatchingStrategyFactory.create_strategy('minhash_lsh', bands=8, rows=2)):
+            with self.subTest(type(strategy).__name__):
+                self.assertEqual(strategy.rank_similar_users({'huevo', 'ajo'}, catalogue),
+                                 strategy.rank_similar_users({'huevo', 'ajo'}, recipes))
+        overlap = MatchingStrategyFactory.create_strategy('ingredient_overlap', exclude_user_id=self.luis.id)
+        self.assertEqual(overlap.rank_similar_users({'huevo', 'ajo'}), [])  # Catálogo de la aplicación
+        self.assertEqual(IngredientOverlapStrategy(1, self.luis.id).rank_similar_users({'huevo', 'ajo'}),
+                         [(self.ana.id, 0.5), (self.eva.id, 0.5)])
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from app import create_app, db
+from app.models import User
+from app.services import UserService
+
+
+class DatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = create_app('testing')
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.directory.name, 'main.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        for engine in self.app.extensions['sqlalchemy'].connectors.values():
+            engine.get_engine().dispose()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def test_sqlite_pragmas_and_pool(self):
+        db.create_all()
+        self.assertIsInstance(db.engine.pool, QueuePool)
+        with db.engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            self.assertEqual(pragma('journal_mode'), 'wal')
+            self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+            self.assertEqual(pragma('busy_timeout'), 5000)
+            self.assertEqual(pragma('cache_size'), -64000)
+
+    def test_server_pool_options(self):
+        _, options = db.apply_driver_hacks(self.app, make_url('postgresql://recetas@db/recetas'), {})
+        self.assertEqual((options['pool_size'], options['max_overflow'], options['pool_recycle']), (10, 20, 1800))
+        self.assertTrue(options['pool_pre_ping'])
+
+    def test_service_reads_go_to_replica_until_session_writes(self):
+        self.app.config['SQLALCHEMY_BINDS'] = {'replica': 'sqlite:///' + os.path.join(self.directory.name, 'r.db')}
+        db.create_all()
+        db.Model.metadata.create_all(db.get_engine(self.app, bind='replica'))
+        with db.get_engine(self.app, bind='replica').begin() as replica:
+            replica.execute(User.__table__.insert(), [{'username': 'en_replica'}])
+
+        self.assertIsNotNone(UserService.get_user_by_username('en_replica'))
+        self.assertEqual(User.query.filter_by(username='en_replica').count(), 0)  # Fuera de get_*: primario
+
+        db.session.connection().execute(User.__table__.insert(), [{'username': 'nuevo'}])
+        self.assertIsNotNone(UserService.get_user_by_username('nuevo'))  # Lee lo que acaba de escribir
+        self.assertIsNone(UserService.get_user_by_username('en_replica'))
+        db.session.commit()
+        self.assertIsNone(UserService.get_user_by_username('nuevo'))  # La réplica aún no lo tiene
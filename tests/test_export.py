@@ -0,0 +1,64 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.export import compress, export_lines, export_records
+from app.importer import import_recipes
+from app.models import User, Recipe
+from app.services import RecipeService, SimilarityService
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        self.ana.set_password('secreto')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        RecipeService.create_recipe('Tortilla', 'Clásica', 'huevo, patata', 'Batir', 'Cena', self.ana)
+        RecipeService.create_recipe('Flan', 'Postre', 'huevo, leche', 'Hornear', 'Postre', self.luis)
+        SimilarityService.replace_user_similarities(self.ana.id, [(self.luis.id, 0.5)])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_records_in_order_without_password_hashes(self):
+        records = list(export_records(chunk_size=1))
+        self.assertEqual([record['type'] for record in records],
+                         ['user', 'user', 'recipe', 'recipe', 'similarity', 'similarity'])
+        self.assertNotIn('password_hash', records[0])
+        self.assertEqual((records[2]['title'], records[2]['author']), ('Tortilla', 'ana'))
+        self.assertEqual((records[4]['user_id'], records[4]['score']), (self.ana.id, 0.5))
+        self.assertIn('password_hash', next(export_records(include_password_hashes=True)))
+
+    def test_gzip_round_trip_through_import(self):
+        body = b''.join(compress(export_lines(export_records(), lines_per_chunk=2), 'gzip'))
+        lines = gzip.decompress(body).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 6)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'copia.jsonl')
+            with open(path, 'w', encoding='utf-8') as target:
+                target.write('\n'.join(lines) + '\n')
+            stats = import_recipes(path)
+        self.assertEqual((stats.imported, stats.rejected), (2, 0))
+        self.assertEqual(Recipe.query.filter_by(title='Tortilla').count(), 2)
+
+    def test_endpoint_requires_login_and_streams(self):
+        self.assertEqual(self.client.get('/export.jsonl').status_code, 302)
+        self.client.post('/login', data={'username': 'ana', 'password': 'secreto'})
+        response = self.client.get('/export.jsonl?compression=gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('recetas.jsonl.gz', response.headers['Content-Disposition'])
+        records = [json.loads(line) for line in gzip.decompress(response.get_data()).splitlines()]
+        self.assertEqual(len(records), 6)
+        self.assertEqual(self.client.get('/export.jsonl?compression=lzma').status_code, 400)
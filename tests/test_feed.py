@@ -0,0 +1,70 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import User, Recipe, FeedItem
+from app.services import RecipeService, SimilarityService, FeedService
+
+
+class FeedTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = [User(username=name) for name in ('ana', 'luis', 'eva', 'tom')]
+        self.users[0].set_password('secreto')
+        db.session.add_all(self.users)
+        db.session.commit()
+        ana, luis, eva, tom = self.users
+        self.create_recipe(ana, 'Tortilla', 'huevo, patata, cebolla, sal', days=1)
+        self.create_recipe(luis, 'Tortilla de luis', 'huevo, patata, cebolla, sal', days=3)
+        self.create_recipe(luis, 'Patatas', 'patata, cebolla, sal', days=30)
+        self.create_recipe(eva, 'Revuelto', 'huevo, sal, ajo', days=1)
+        self.create_recipe(tom, 'Flan', 'leche, azúcar', days=1)
+        SimilarityService.recompute_similarities()
+        FeedService.rebuild_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_recipe(self, author, title, ingredients, days=0):
+        recipe = RecipeService.create_recipe(title, 'd', ingredients, 'pasos', 'Cena', author)
+        recipe.timestamp = datetime.utcnow() - timedelta(days=days)
+        db.session.commit()
+        return recipe
+
+    def titles(self, user, **kwargs):
+        return [recipe.title for recipe in FeedService.get_feed_page(user.id, **kwargs)[0]]
+
+    def test_feed_ranks_neighbours_recipes_by_score_and_recency(self):
+        ana = self.users[0]
+        # luis (Jaccard 1.0) antes que eva (0.4); la receta vieja de luis pierde frente a la reciente de eva
+        self.assertEqual(self.titles(ana), ['Tortilla de luis', 'Revuelto', 'Patatas'])
+        page, cursor = FeedService.get_feed_page(ana.id, per_page=2)
+        self.assertEqual(self.titles(ana, cursor=cursor), ['Patatas'])
+        self.assertEqual(self.titles(self.users[3]), [])  # Sin vecinos, sin feed
+
+    def test_fan_out_is_bounded_and_deletes_propagate(self):
+        ana, luis, eva, tom = self.users
+        self.app.config['FEED_FANOUT_LIMIT'] = 1
+        recipe = self.create_recipe(luis, 'Nueva', 'huevo, patata', days=0)
+        FeedService.fan_out(luis.id)
+        db.session.commit()
+        self.assertEqual(self.titles(ana)[0], 'Nueva')  # Seguidor más similar de luis
+        self.assertNotIn('Nueva', self.titles(eva))  # La verá en su próximo recálculo
+        FeedService.rebuild([eva.id])
+        db.session.commit()
+        self.assertIn('Nueva', self.titles(eva))
+
+        RecipeService.delete_recipe(recipe)
+        self.assertEqual(FeedItem.query.filter_by(recipe_id=recipe.id).count(), 0)
+
+    def test_feed_view(self):
+        client = self.app.test_client()
+        self.assertEqual(client.get('/feed').status_code, 302)
+        client.post('/login', data={'username': 'ana', 'password': 'secreto'})
+        response = client.get('/feed')
+        self.assertIn('Tortilla de luis', response.get_data(as_text=True))
+        self.assertEqual(client.get('/feed?cursor=roto').status_code, 400)
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.factories import RecipeFactory
+from app.importer import import_recipes
+from app.models import User, Recipe, Ingredient, ImportCheckpoint, SimilarUser
+
+
+class ImportRecipesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(User(username='ana'))
+        db.session.commit()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalogo.jsonl')
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.directory.cleanup()
+
+    def _write(self, records, mode='w'):
+        with open(self.path, mode, encoding='utf-8') as target:
+            for record in records:
+                target.write((record if isinstance(record, str) else json.dumps(record)) + '\n')
+
+    @staticmethod
+    def _recipe(title, author, ingredients='sal, aceite, ajo'):
+        return {'title': title, 'description': 'd', 'ingredients': ingredients, 'steps': ['Paso 1', 'Paso 2'],
+                'category': 'Cena', 'author': author}
+
+    def test_validates_and_defers_indexing(self):
+        self._write([self._recipe('Uno', 'ana'), '{roto', dict(self._recipe('', 'ana')),
+                     self._recipe('Dos', 'luis'), self._recipe('Tres', 'nadie', 'sal, aceite')])
+        rejected = []
+        stats = import_recipes(self.path, chunk_size=2, on_reject=lambda line, reason: rejected.append(line))
+        self.assertEqual((stats.read, stats.imported, stats.rejected), (5, 1, 4))
+        self.assertEqual(rejected, [2, 3, 4, 5])
+
+        stats = import_recipes(self.path, chunk_size=2, create_authors=True)
+        self.assertEqual(stats.imported, 3)
+        self.assertEqual(Recipe.query.filter_by(title='Dos').one().steps, 'Paso 1\nPaso 2')
+        self.assertEqual(Ingredient.query.count(), 3)
+        self.assertGreater(SimilarUser.query.count(), 0)
+
+    def test_resume_from_checkpoint(self):
+        self._write([self._recipe(f'r{i}', 'ana') for i in range(5)])
+        self.assertEqual(import_recipes(self.path, chunk_size=2, checkpoint_key='catalogo').imported, 5)
+
+        self._write([self._recipe('nueva', 'ana')], mode='a')
+        stats = import_recipes(self.path, chunk_size=2, checkpoint_key='catalogo')
+        self.assertEqual((stats.skipped, stats.imported), (5, 1))
+        self.assertEqual(Recipe.query.count(), 6)
+        self.assertEqual(ImportCheckpoint.query.get('catalogo').line, 6)
+
+    def test_failed_chunk_rolls_back_checkpoint(self):
+        # El checkpoint viaja en la transacción del bloque: si el commit falla no avanza y no hay duplicados
+        self._write([self._recipe(f'r{i}', 'ana') for i in range(4)])
+        commit, calls = db.session.commit, []
+
+        def failing_commit():
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('caída')
+            commit()
+
+        with mock.patch.object(db.session, 'commit', failing_commit):
+            with self.assertRaises(RuntimeError):
+                import_recipes(self.path, chunk_size=2, checkpoint_key='catalogo')
+        db.session.rollback()
+        self.assertEqual((Recipe.query.count(), ImportCheckpoint.query.get('catalogo').line), (2, 2))
+
+        stats = import_recipes(self.path, chunk_size=2, checkpoint_key='catalogo')
+        self.assertEqual((stats.skipped, stats.imported), (2, 2))
+        self.assertEqual(sorted(recipe.title for recipe in Recipe.query), ['r0', 'r1', 'r2', 'r3'])
+
+    def test_csv_source(self):
+        self.path = os.path.join(self.directory.name, 'catalogo.csv')
+        with open(self.path, 'w', encoding='utf-8', newline='') as target:
+            target.write('title,description,ingredients,steps,category,author\n'
+                         'Tortilla,Clásica,"huevo, patata",Batir,Cena,ana\n')
+        self.assertEqual(import_recipes(self.path).imported, 1)
+        self.assertEqual(Recipe.query.one().ingredients, 'huevo, patata')
+
+    def test_detailed_rules_shared_with_factory(self):
+        with self.assertRaises(ValueError):
+            RecipeFactory.create_recipe('detailed', title='x' * 200, description='d', ingredients='i',
+                                        steps='s', author=User.query.first())
@@ -0,0 +1,87 @@
+import unittest
+from app import create_app, db
+from app.models import User, UserIngredient, Ingredient, recipe_ingredients
+from app.services import RecipeService, IngredientIndexService
+from app.strategies import MatchingStrategyFactory
+
+
+class IngredientIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana = User(username='ana')
+        self.luis = User(username='luis')
+        self.eva = User(username='eva')
+        db.session.add_all([self.ana, self.luis, self.eva])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_recipe(self, author, ingredients):
+        return RecipeService.create_recipe('t', 'd', ingredients, 's', 'Cena', author)
+
+    def user_ingredients(self, user):
+        return {ui.ingredient_id: ui.recipe_count
+                for ui in UserIngredient.query.filter_by(user_id=user.id)}
+
+    def test_parse_ingredients(self):
+        self.assertEqual(IngredientIndexService.parse_ingredients(' Sal, aceite;\nAjo,, '),
+                         {'sal', 'aceite', 'ajo'})
+
+    def test_create_update_delete_keep_index_in_sync(self):
+        r1 = self.create_recipe(self.ana, 'sal, aceite, ajo')
+        r2 = self.create_recipe(self.ana, 'sal, huevo')
+        sal = Ingredient.query.filter_by(name='sal').first()
+        self.assertEqual(self.user_ingredients(self.ana)[sal.id], 2)
+        self.assertEqual(len(self.user_ingredients(self.ana)), 4)
+
+        RecipeService.update_recipe(r1, 't', 'd', 'ajo, tomate', 's', 'Cena')
+        counts = self.user_ingredients(self.ana)
+        self.assertEqual(counts[sal.id], 1)
+        self.assertEqual(len(counts), 4)  # sal, huevo, ajo, tomate
+
+        RecipeService.delete_recipe(r2)
+        counts = self.user_ingredients(self.ana)
+        self.assertNotIn(sal.id, counts)
+        rows = db.session.execute(db.select([recipe_ingredients])).fetchall()
+        self.assertEqual(len(rows), 2)
+
+    def test_indexed_strategy_matches_users_sharing_n_ingredients(self):
+        self.create_recipe(self.ana, 'sal, aceite, ajo')
+        self.create_recipe(self.luis, 'sal, aceite')
+        self.create_recipe(self.eva, 'sal')
+        self.create_recipe(self.eva, 'harina')
+        strategy = MatchingStrategyFactory.create_strategy(
+            'indexed_overlap', min_common_ingredients=2, exclude_user_id=self.ana.id)
+        self.assertEqual(strategy.find_similar_users({'sal', 'aceite', 'ajo'}), {self.luis.id})
+        strategy.min_common_ingredients = 1
+        self.assertEqual(strategy.find_similar_users({'sal', 'aceite', 'ajo'}),
+                         {self.luis.id, self.eva.id})
+
+    def test_rebuild(self):
+        self.create_recipe(self.ana, 'sal, aceite')
+        self.create_recipe(self.luis, 'sal')
+        before = {(u.user_id, u.ingredient_id, u.recipe_count) for u in UserIngredient.query}
+        self.assertEqual(IngredientIndexService.rebuild(), 2)
+        after = {(u.user_id, Ingredient.query.get(u.ingredient_id).name, u.recipe_count)
+                 for u in UserIngredient.query}
+        self.assertEqual(len(before), len(after))
+        self.assertIn((self.ana.id, 'aceite', 1), after)
+
+    def test_rebuild_in_chunks_matches_incremental_index(self):
+        for author, ingredients in [(self.ana, 'sal, aceite'), (self.ana, 'sal, ajo'), (self.luis, 'sal'),
+                                    (self.eva, 'huevo, patata, sal'), (self.luis, 'ajo')]:
+            self.create_recipe(author, ingredients)
+        names = lambda: {(u.user_id, Ingredient.query.get(u.ingredient_id).name, u.recipe_count)
+                         for u in UserIngredient.query}
+        links = lambda: {(row.recipe_id, Ingredient.query.get(row.ingredient_id).name, row.recipe_size)
+                         for row in db.session.execute(db.select([recipe_ingredients]))}
+        expected_users, expected_links = names(), links()
+        self.assertEqual(IngredientIndexService.rebuild(chunk_size=2), 5)
+        self.assertEqual(names(), expected_users)
+        self.assertEqual(links(), expected_links)
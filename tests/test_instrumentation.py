@@ -0,0 +1,58 @@
+import unittest
+from app import create_app, db, instrumentation
+from app.models import User
+from app.services import RecipeService
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['INSTRUMENTATION'] = True
+        instrumentation.init_app(self.app)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        users = [User(username=f'user{i}') for i in range(6)]
+        db.session.add_all(users)
+        db.session.commit()
+        RecipeService.create_recipe('Tortilla', 'd', 'huevo, patata', 'pasos', 'Cena', users[0])
+        self.user_ids = [user.id for user in users]
+
+        @self.app.route('/n-plus-one')
+        def n_plus_one():
+            db.session.expire_all()
+            return ','.join(db.session.query(User.username).filter_by(id=user_id).scalar()
+                            for user_id in self.user_ids)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('app.instrumentation', 'INFO') as logs:
+            response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        timing = response.headers['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries", tpl;dur=[\d.]+, app;dur=[\d.]+')
+        self.assertIn('"endpoint": "main.index"', logs.output[-1])
+        self.assertIn('"n_plus_one": []', logs.output[-1])
+
+    def test_repeated_statement_warning_and_metrics(self):
+        with self.assertLogs('app.instrumentation', 'WARNING') as logs:
+            self.client.get('/n-plus-one')
+        self.assertIn('Posible N+1 en n_plus_one: sentencia ejecutada 6 veces', logs.output[0])
+
+        body = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('recetas_requests_total{endpoint="n_plus_one",method="GET",status="200"} 1', body)
+        self.assertIn('recetas_n_plus_one_total{endpoint="n_plus_one"} 1', body)
+        self.assertIn('recetas_db_queries_total{endpoint="n_plus_one"} 6', body)
+        self.assertIn('recetas_request_duration_seconds_count{endpoint="n_plus_one"} 1', body)
+        self.assertIn('# TYPE recetas_cache_events_total counter', body)
+
+    def test_disabled_by_default(self):
+        app = create_app('testing')
+        self.assertNotIn('instrumentation', app.extensions)
+        self.assertEqual(app.test_client().get('/metrics').status_code, 404)
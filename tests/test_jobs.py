@@ -0,0 +1,82 @@
+import unittest
+from app import create_app, db
+from app.jobs import JobQueue, SimilarityWorker, schedule_similarity_update
+from app.models import User, SimilarUser, SimilarityJob
+from app.services import RecipeService, SimilarityService
+
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['SIMILARITY_ASYNC'] = True
+        self.app.config['SIMILARITY_WORKER_THREADS'] = 0
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana = User(username='ana')
+        self.luis = User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        RecipeService.create_recipe('t', 'd', 'sal, aceite', 's', 'Cena', self.ana)
+        RecipeService.create_recipe('t', 'd', 'sal, aceite, ajo', 's', 'Cena', self.luis)
+        self.worker = SimilarityWorker(self.app)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_repeated_edits_coalesce_into_one_job(self):
+        self.assertTrue(schedule_similarity_update(self.ana.id))
+        self.assertTrue(schedule_similarity_update(self.ana.id))
+        self.assertEqual(SimilarityJob.query.count(), 1)
+        self.assertEqual(JobQueue.metrics()['depth'], 1)
+
+        self.assertTrue(self.worker.run_once())
+        self.assertFalse(self.worker.run_once())
+        self.assertEqual(SimilarityJob.query.count(), 0)
+        self.assertEqual({(e.user_id, e.similar_user_id) for e in SimilarUser.query},
+                         {(self.ana.id, self.luis.id), (self.luis.id, self.ana.id)})
+
+    def test_edit_during_execution_requeues_job(self):
+        JobQueue.enqueue(self.ana.id)
+        job = JobQueue.claim()
+        JobQueue.enqueue(self.ana.id)
+        JobQueue.complete(job)
+        pending = SimilarityJob.query.one()
+        self.assertEqual(pending.status, 'pending')
+        self.assertIsNotNone(JobQueue.claim())
+
+    def test_failed_jobs_are_retried_then_marked_failed(self):
+        self.app.config['SIMILARITY_JOB_MAX_ATTEMPTS'] = 2
+        JobQueue.enqueue(self.ana.id)
+        for expected in ('pending', 'failed'):
+            JobQueue.fail(JobQueue.claim(), 'boom')
+            self.assertEqual(SimilarityJob.query.one().status, expected)
+        self.assertIsNone(JobQueue.claim())
+        JobQueue.enqueue(self.ana.id)
+        self.assertEqual(SimilarityJob.query.one().status, 'pending')
+
+    def test_job_scores_match_full_recompute(self):
+        # La puntuación de una pareja no depende de quién la escribió por última vez
+        eva = User(username='eva')
+        db.session.add(eva)
+        db.session.commit()
+        RecipeService.create_recipe('t', 'd', 'sal, ajo, aceite, tomate, cebolla, pimiento, huevo, patata, '
+                                    'harina, leche', 's', 'Cena', eva)
+        scored = lambda: {(e.user_id, e.similar_user_id): (round(e.score, 6), e.strategy) for e in SimilarUser.query}
+        self.app.config['SIMILARITY_ASYNC'] = False
+        for user in (eva, self.luis, self.ana):  # ana la última: con la fracción de ana su pareja valdría 1.0
+            schedule_similarity_update(user.id)
+        from_jobs = {pair: score for pair, (score, _) in scored().items()}
+        self.assertEqual(from_jobs[(self.ana.id, eva.id)], from_jobs[(eva.id, self.ana.id)])
+        self.assertEqual(from_jobs[(self.ana.id, eva.id)], 0.2)
+
+        SimilarityService.recompute_similarities()
+        self.assertEqual({pair: score for pair, (score, _) in scored().items()}, from_jobs)
+
+    def test_inline_mode_recomputes_before_returning(self):
+        self.app.config['SIMILARITY_ASYNC'] = False
+        self.assertFalse(schedule_similarity_update(self.ana.id))
+        self.assertEqual(SimilarityJob.query.count(), 0)
+        self.assertEqual(SimilarUser.query.count(), 2)
@@ -0,0 +1,92 @@
+import unittest
+from app import create_app, db
+from app.minhash import LSHIndex, MinHasher
+from app.models import User, UserSignature, LSHBucket
+from app.services import RecipeService, SignatureService
+from app.strategies import MatchingStrategyFactory
+
+
+class MinHashTestCase(unittest.TestCase):
+    def test_merge_matches_signature_of_union(self):
+        hasher = MinHasher(32)
+        a, b = {'sal', 'ajo', 'aceite'}, {'huevo', 'sal'}
+        self.assertEqual(MinHasher.merge(hasher.signature(a), hasher.signature(b)), hasher.signature(a | b))
+
+    def test_serialization_and_estimate(self):
+        hasher = MinHasher(64)
+        signature = hasher.signature({'sal', 'ajo'})
+        self.assertEqual(MinHasher.from_bytes(MinHasher.to_bytes(signature)), signature)
+        self.assertEqual(len(MinHasher.to_bytes(signature)), 64 * 4)
+        self.assertEqual(MinHasher.estimate_jaccard(signature, hasher.signature({'ajo', 'sal'})), 1.0)
+
+    def test_in_memory_index(self):
+        hasher = MinHasher(16)
+        index = LSHIndex(bands=8, rows=2)
+        index.add(1, hasher.signature({'sal', 'ajo', 'aceite'}))
+        index.add(2, hasher.signature({'harina', 'leche'}))
+        self.assertIn(1, index.candidates(hasher.signature({'sal', 'ajo', 'aceite'})))
+        index.remove(1)
+        self.assertNotIn(1, index.candidates(hasher.signature({'sal', 'ajo', 'aceite'})))
+
+
+class SignatureServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana = User(username='ana')
+        self.luis = User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def stored_signature(self, user):
+        row = UserSignature.query.get(user.id)
+        return MinHasher.from_bytes(row.signature) if row else None
+
+    def test_signatures_follow_recipe_writes(self):
+        hasher = SignatureService.get_hasher()
+        r1 = RecipeService.create_recipe('t', 'd', 'sal, ajo', 's', 'Cena', self.ana)
+        RecipeService.create_recipe('t', 'd', 'huevo', 's', 'Cena', self.ana)
+        self.assertEqual(self.stored_signature(self.ana), hasher.signature({'sal', 'ajo', 'huevo'}))
+        bands, _ = SignatureService.banding()
+        self.assertEqual(LSHBucket.query.filter_by(user_id=self.ana.id).count(), bands)
+
+        RecipeService.update_recipe(r1, 't', 'd', 'sal', 's', 'Cena')
+        self.assertEqual(self.stored_signature(self.ana), hasher.signature({'sal', 'huevo'}))
+
+        RecipeService.delete_recipe(r1)
+        RecipeService.delete_recipe(self.ana.recipes.first())
+        self.assertIsNone(self.stored_signature(self.ana))
+        self.assertEqual(LSHBucket.query.filter_by(user_id=self.ana.id).count(), 0)
+
+    def test_strategy_uses_persisted_index(self):
+        RecipeService.create_recipe('t', 'd', 'sal, ajo, aceite, tomate', 's', 'Cena', self.ana)
+        RecipeService.create_recipe('t', 'd', 'sal, ajo, aceite, tomate', 's', 'Cena', self.luis)
+        strategy = MatchingStrategyFactory.create_strategy('minhash_lsh', exclude_user_id=self.ana.id)
+        self.assertEqual(strategy.rank_similar_users({'sal', 'ajo', 'aceite', 'tomate'}), [(self.luis.id, 1.0)])
+
+        UserSignature.query.delete()
+        LSHBucket.query.delete()
+        self.assertEqual(SignatureService.rebuild_all(), 2)
+        self.assertEqual(strategy.find_similar_users({'sal', 'ajo', 'aceite', 'tomate'}), {self.luis.id})
+
+    def test_persisted_index_rejects_other_banding(self):
+        RecipeService.create_recipe('t', 'd', 'sal, ajo, aceite', 's', 'Cena', self.luis)
+        strategy = MatchingStrategyFactory.create_strategy('minhash_lsh', bands=8, rows=2)
+        with self.assertRaises(ValueError):
+            strategy.rank_similar_users({'sal', 'ajo', 'aceite'})
+        bands, rows = SignatureService.banding()
+        configured = MatchingStrategyFactory.create_strategy('minhash_lsh', bands=bands, rows=rows)
+        self.assertEqual(configured.find_similar_users({'sal', 'ajo', 'aceite'}), {self.luis.id})
+
+    def test_strategy_with_recipe_list(self):
+        RecipeService.create_recipe('t', 'd', 'sal, ajo, aceite', 's', 'Cena', self.luis)
+        strategy = MatchingStrategyFactory.create_strategy('minhash_lsh', bands=8, rows=2)
+        recipes = self.luis.recipes.all()
+        self.assertEqual(strategy.find_similar_users({'sal', 'ajo', 'aceite'}, recipes), {self.luis.id})
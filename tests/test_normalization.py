@@ -0,0 +1,76 @@
+import unittest
+from app import create_app, db
+from app.models import User, Recipe, Ingredient
+from app import normalization
+from app.normalization import load_synonyms, normalize_ingredient, normalize_ingredients, tidy_text
+from app.services import IngredientIndexService, RecipeService, SimilarityService
+
+
+class NormalizationTestCase(unittest.TestCase):
+    def test_quantities_plurals_accents_and_synonyms(self):
+        cases = {
+            '200g harina': 'harina',
+            '3 Tomates maduros': 'tomate maduro',
+            '2 dientes de ajo': 'ajo',
+            'una pizca de sal': 'sal',
+            '1/2 kg de limones': 'limon',
+            'Azúcar (opcional)': 'azucar',
+            'nueces': 'nuez',
+            'champiñones': 'champiñon',
+            'papas': 'patata',
+            'Aceite de oliva virgen extra': 'aceite de oliva',
+            'harina 200 g': 'harina',
+            '7up': '7up',
+        }
+        self.assertEqual({raw: normalize_ingredient(raw) for raw in cases}, cases)
+
+    def test_text_split_and_idempotent(self):
+        text = '2 tomates; tomate\n200 g de harina,, sal al gusto'
+        self.assertEqual(normalize_ingredients(text), {'tomate', 'harina', 'sal'})
+        self.assertEqual(tidy_text('200 g  de harina,\t1 cucharada de azúcar; \n\n Sal al gusto '),
+                         '200 g de harina, 1 cucharada de azúcar;\nSal al gusto')
+        self.assertEqual(tidy_text(tidy_text(text)), tidy_text(text))
+        self.assertEqual(normalize_ingredients(None), frozenset())
+
+    def test_load_synonyms_clears_memo(self):
+        self.assertEqual(normalize_ingredient('pimientos morrones'), 'pimiento morron')
+        self.addCleanup(load_synonyms, [])
+        self.addCleanup(normalization._SYNONYMS.pop, 'pimiento morron')
+        self.assertEqual(load_synonyms(['# comentario', 'pimientos morrones = pimiento rojo', 'sin igual']), 1)
+        self.assertEqual(normalize_ingredient('pimientos morrones'), 'pimiento rojo')
+
+
+class NormalizationDatabaseTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_plural_and_singular_share_ingredient(self):
+        RecipeService.create_recipe('Ensalada', 'd', '3 tomates, 1 cebolla', 's', 'Cena', self.ana)
+        RecipeService.create_recipe('Salsa', 'd', 'tomate; cebollas', 's', 'Cena', self.luis)
+        self.assertEqual(sorted(name for name, in db.session.query(Ingredient.name)), ['cebolla', 'tomate'])
+        SimilarityService.recompute_similarities(min_common_ingredients=2)
+        self.assertEqual([user.username for user in SimilarityService.get_similar_users(self.ana.id)], ['luis'])
+
+    def test_bulk_rewrite_in_chunks(self):
+        for text in ['2 Huevos, patatas', 'huevo, patata', 'Sal; \n  Aceite ']:
+            db.session.add(Recipe(title='t', description='d', ingredients=text, steps='s', category='Cena',
+                                  author=self.ana))
+        db.session.commit()
+        self.assertEqual(IngredientIndexService.normalize_recipe_texts(chunk_size=1), 1)
+        self.assertEqual(sorted(recipe.ingredients for recipe in Recipe.query),
+                         ['2 Huevos, patatas', 'Sal;\nAceite', 'huevo, patata'])
+        self.assertEqual(IngredientIndexService.normalize_recipe_texts(chunk_size=1), 0)
+        IngredientIndexService.rebuild()  # Los nombres canónicos solo se guardan en el índice
+        self.assertEqual(sorted(name for name, in db.session.query(Ingredient.name)),
+                         ['aceite', 'huevo', 'patata', 'sal'])
@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe
+from app.services import RecipeService, UserService
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['RECIPES_PER_PAGE'] = 4
+        self.app.config['SIDEBAR_USERS'] = 2
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = [User(username=f'user{i}') for i in range(5)]
+        db.session.add_all(self.users)
+        base = datetime(2024, 1, 1)
+        # Dos recetas con el mismo timestamp para comprobar el desempate por id
+        for i in range(10):
+            db.session.add(Recipe(title=f'r{i}', description='d', ingredients='sal', steps='s',
+                                  category='Cena' if i % 2 else 'Postre', author=self.users[i % 5],
+                                  timestamp=base + timedelta(minutes=min(i, 8))))
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_keyset_pages_cover_everything_once(self):
+        seen, cursor = [], None
+        while True:
+            page, cursor = RecipeService.get_recipes_page(cursor=cursor, per_page=3)
+            seen.extend(r.title for r in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, ['r9', 'r8', 'r7', 'r6', 'r5', 'r4', 'r3', 'r2', 'r1', 'r0'])
+
+        page, cursor = RecipeService.get_recipes_page(category='Cena', per_page=5)
+        self.assertEqual([r.title for r in page], ['r9', 'r7', 'r5', 'r3', 'r1'])
+        self.assertIsNone(cursor)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            RecipeService.decode_cursor('no-es-un-cursor')
+        self.assertEqual(self.client.get('/?cursor=@@@').status_code, 400)
+
+    def test_users_page(self):
+        users, after = UserService.get_users_page(per_page=3)
+        self.assertEqual([u.username for u in users], ['user0', 'user1', 'user2'])
+        users, after = UserService.get_users_page(after=after, per_page=3)
+        self.assertEqual([u.username for u in users], ['user3', 'user4'])
+        self.assertIsNone(after)
+        self.assertIn('user4', self.client.get('/users?after=user3').get_data(as_text=True))
+
+    def test_index_uses_constant_number_of_queries(self):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            response = self.client.get('/')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        html = response.get_data(as_text=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Más recetas', html)
+        self.assertIn('Ver todos los usuarios', html)
+        self.assertLessEqual(len(statements), 2)
+
+        cursor = RecipeService.get_recipes_page(per_page=4)[1]
+        html = self.client.get(f'/category/Cena?cursor={cursor}').get_data(as_text=True)
+        self.assertIn('r3', html)
+        self.assertNotIn('r7', html)
@@ -0,0 +1,74 @@
+import random
+import unittest
+from app import create_app, db
+from app.models import User, Recipe
+from app.pantry import top_recipes_by_coverage, unseen_upper_bound
+from app.services import IngredientIndexService, PantryService, RecipeService
+
+
+class PantryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='ana')
+        db.session.add(self.user)
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _recipe(self, title, ingredients):
+        return RecipeService.create_recipe(title, 'd', ingredients, 's', 'Cena', self.user)
+
+    def test_ranked_by_coverage_with_missing(self):
+        self._recipe('Tortilla', 'huevo, patata, cebolla')
+        self._recipe('Huevo frito', 'huevo, aceite')
+        self._recipe('Paella', 'arroz, gambas, azafrán, pimiento')
+        results, has_more = PantryService.what_can_i_cook('huevo, patata, aceite, sal')
+        summary = [(recipe.title, round(hit.coverage, 2), missing) for recipe, hit, missing in results]
+        self.assertEqual(summary, [('Huevo frito', 1.0, []), ('Tortilla', 0.67, ['cebolla'])])
+        self.assertFalse(has_more)
+
+        page, has_more = PantryService.what_can_i_cook(['huevo', 'patata'], page=1, per_page=1)
+        self.assertEqual([recipe.title for recipe, _, _ in page], ['Tortilla'])
+        self.assertTrue(has_more)
+        self.assertEqual(PantryService.what_can_i_cook('trufa'), ([], False))
+
+        response = self.client.get('/cook?ingredients=huevo,+aceite')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Huevo frito', response.get_data(as_text=True))
+
+    def test_sizes_follow_edits(self):
+        recipe = self._recipe('Tortilla', 'huevo, patata')
+        RecipeService.update_recipe(recipe, 'Tortilla', 'd', 'huevo, patata, cebolla', 's', 'Cena')
+        [hit] = top_recipes_by_coverage(self._ids('huevo'), k=5)
+        self.assertEqual((hit.matched, hit.size), (1, 3))
+
+    def test_threshold_matches_exhaustive_ranking(self):
+        rng = random.Random(3)
+        vocabulary = [f'ing{i}' for i in range(30)]
+        for i in range(300):
+            db.session.add(Recipe(title=f'r{i}', description='d', steps='s', category='Cena', author=self.user,
+                                  ingredients=', '.join(rng.sample(vocabulary, rng.randint(1, 8)))))
+        db.session.commit()
+        IngredientIndexService.rebuild()
+        pantry = set(rng.sample(vocabulary, 6))
+        expected = sorted(
+            ((len(pantry & names) / len(names), -len(names), recipe.id) for recipe in Recipe.query
+             for names in [IngredientIndexService.parse_ingredients(recipe.ingredients)] if pantry & names),
+            reverse=True)[:20]
+        hits = top_recipes_by_coverage(self._ids(*pantry), k=20, batch=8)
+        self.assertEqual([(hit.coverage, -hit.size, hit.recipe_id) for hit in hits], expected)
+
+    def test_unseen_upper_bound(self):
+        self.assertEqual(unseen_upper_bound([]), 0.0)
+        self.assertEqual(unseen_upper_bound([4, 2]), 0.5)
+        self.assertEqual(unseen_upper_bound([8, 6, 3]), 3 / 8)
+
+    def _ids(self, *names):
+        return IngredientIndexService.get_or_create_ingredient_ids(names).values()
@@ -0,0 +1,147 @@
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe
+from app.search import RecipeSearch
+from app.services import (UserService, RecipeService, SimilarityService, CategoryProfileService, SignatureService,
+                          IngredientIndexService, FeedService)
+
+# "SCAN recipes" es un recorrido completo; "SCAN recipes USING INDEX ..." o "SEARCH ..." no
+_FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Las consultas de los servicios deben usar un índice (EXPLAIN QUERY PLAN de SQLite)"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        users = [User(username=name) for name in ('ana', 'luis', 'eva')]
+        db.session.add_all(users)
+        db.session.commit()
+        for i in range(30):
+            RecipeService.create_recipe(f'Receta {i}', 'd', 'huevo, patata, sal' if i % 2 else 'harina, leche',
+                                        'pasos', ('Cena', 'Postre')[i % 2], users[i % 3])
+        IngredientIndexService.rebuild()
+        SimilarityService.replace_user_similarities(users[0].id, [users[1].id, users[2].id])
+        FeedService.rebuild_all()
+        db.session.commit()
+        self.ana, self.luis = users[0], users[1]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assertIndexed(self, call):
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, context, many: statements.append((statement,
+                                                                                                  parameters))
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            call()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        selects = [(sql, params) for sql, params in statements if sql.lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects)
+        tables = set(db.metadata.tables)
+        with db.engine.connect() as connection:
+            for sql, params in selects:
+                plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+                scans = [row[3] for row in plan
+                         if _FULL_SCAN.match(row[3]) and _FULL_SCAN.match(row[3]).group(1) in tables]
+                self.assertEqual(scans, [], f'Recorrido completo en:\n{sql}\n{plan}')
+
+    def test_service_reads_use_indexes(self):
+        recipe = Recipe.query.first()
+        _, cursor = RecipeService.get_recipes_page(per_page=5)
+        calls = {
+            'get_user_by_username': lambda: UserService.get_user_by_username('luis'),
+            'get_user_by_id': lambda: UserService.get_user_by_id(self.luis.id),
+            'get_users_page': lambda: UserService.get_users_page(after='ana', per_page=1),
+            'get_recipe_by_id': lambda: RecipeService.get_recipe_by_id(recipe.id),
+            'get_recipes_by_ids': lambda: RecipeService.get_recipes_by_ids([recipe.id, recipe.id + 1]),
+            'get_recipes_page': lambda: RecipeService.get_recipes_page(per_page=5),
+            'get_recipes_page (categoría, inicio)': lambda: RecipeService.get_recipes_page('Cena', per_page=5),
+            'get_recipes_page (categoría)': lambda: RecipeService.get_recipes_page('Postre', cursor, per_page=5),
+            'get_summaries_page': lambda: RecipeService.get_summaries_page(per_page=5),
+            'get_summaries_page (categoría)': lambda: RecipeService.get_summaries_page('Postre', cursor, per_page=5),
+            'get_categories': RecipeService.get_categories,
+            'recetas del autor': lambda: self.luis.recipes.order_by(Recipe.timestamp.desc()).all(),
+            'get_similar_users': lambda: SimilarityService.get_similar_users(self.luis.id),
+            'get_profile': lambda: CategoryProfileService.get_profile(self.ana.id),
+            'score_users': lambda: CategoryProfileService.score_users(self.ana.id),
+            'get_signatures': lambda: SignatureService.get_signatures([self.ana.id, self.luis.id]),
+            'get_feed_page': lambda: FeedService.get_feed_page(self.ana.id, per_page=5),
+        }
+        for name, call in calls.items():
+            db.session.expire_all()
+            with self.subTest(name):
+                self.assertIndexed(call)
+
+
+def _sqlite_has_fts5() -> bool:
+    connection = sqlite3.connect(':memory:')
+    try:
+        connection.execute('CREATE VIRTUAL TABLE probe USING fts5(body)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+
+
+class MigrationTestCase(unittest.TestCase):
+    def test_upgrade_adds_missing_indexes(self):
+        from flask_migrate import upgrade
+        with tempfile.TemporaryDirectory() as directory:
+            app = create_app('testing')
+            app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directory, 'old.db')
+            with app.app_context():
+                db.create_all()
+                with db.engine.begin() as connection:  # Base creada antes de esta revisión
+                    connection.exec_driver_sql('DROP INDEX ix_recipes_author_timestamp_id')
+                    connection.exec_driver_sql('DROP INDEX ix_similar_users_similar_user')
+                upgrade(directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'))
+                indexes = {index['name'] for table in ('recipes', 'similar_users')
+                           for index in db.inspect(db.engine).get_indexes(table)}
+                self.assertTrue({'ix_recipes_author_timestamp_id', 'ix_similar_users_similar_user'} <= indexes)
+                db.session.remove()
+                db.engine.dispose()
+
+    def test_upgrade_baseline_database_to_head(self):
+        from flask_migrate import upgrade
+        root = os.path.dirname(os.path.dirname(__file__))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.db')
+            shutil.copy(os.path.join(root, 'app.db'), path)  # Base de la versión original, sin migraciones
+            app = create_app('testing')
+            app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///' + path, CACHE_TYPE='null')
+            with app.app_context():
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql("INSERT INTO users (id, username) VALUES (1, 'ana')")
+                    connection.exec_driver_sql(
+                        "INSERT INTO recipes (title, description, ingredients, steps, category, author_id, timestamp) "
+                        "VALUES ('Tortilla antigua', 'd', 'huevo', 's', 'Cena', 1, '2024-01-01 00:00:00')")
+                upgrade(directory=os.path.join(root, 'migrations'))
+                inspector = db.inspect(db.engine)
+                for table in db.metadata.sorted_tables:
+                    with self.subTest(table.name):
+                        self.assertTrue(inspector.has_table(table.name))
+                        self.assertEqual({column['name'] for column in inspector.get_columns(table.name)},
+                                         set(table.columns.keys()))
+                response = app.test_client().get('/')
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Tortilla antigua', response.get_data(as_text=True))
+                if _sqlite_has_fts5():  # FTS5 creado y lleno con las recetas existentes
+                    self.assertTrue(RecipeSearch.fts_enabled())
+                    self.assertEqual([hit.recipe_id for hit in RecipeSearch.search('tortilla')], [1])
+                db.session.remove()
+                db.engine.dispose()
@@ -0,0 +1,124 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+from app import create_app, db
+from app.catalogue import recipes_signature
+from app.models import Recipe, User
+from app.search import InvertedIndex, RecipeSearch, make_snippet, parse_query
+from app.services import RecipeService
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='ana')
+        db.session.add(self.user)
+        db.session.commit()
+        self.tortilla = RecipeService.create_recipe('Tortilla española', 'Clásica de la abuela', 'huevo, patata',
+                                                    'Batir los huevos y freír', 'Cena', self.user)
+        self.flan = RecipeService.create_recipe('Flan', 'Postre con huevo', 'huevo, leche, azúcar',
+                                                'Hornear al baño maría', 'Postre', self.user)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _titles(self, query):
+        results, _ = RecipeService.search(query)
+        return [recipe.title for recipe, _ in results]
+
+    def _check_engine(self):
+        self.assertEqual(self._titles('tortilla'), ['Tortilla española'])
+        self.assertEqual(self._titles('torti*'), ['Tortilla española'])  # Prefijo
+        self.assertEqual(self._titles('torti'), [])
+        self.assertEqual(self._titles('ESPANOLA'), ['Tortilla española'])  # Sin tildes ni mayúsculas
+        self.assertEqual(self._titles('huevo patata'), ['Tortilla española'])
+        self.assertEqual(self._titles('flan huevo'), ['Flan'])
+        self.assertEqual(self._titles('pescado'), [])
+        self.assertEqual(self._titles('  '), [])
+        # El título pesa más que los pasos
+        RecipeService.create_recipe('Pan', 'd', 'harina', 'Servir con tortilla', 'Cena', self.user)
+        self.assertEqual(self._titles('tortilla'), ['Tortilla española', 'Pan'])
+
+        RecipeService.update_recipe(self.flan, 'Flan de vainilla', 'Postre', 'huevo, leche', 's', 'Postre')
+        self.assertEqual(self._titles('vainilla'), ['Flan de vainilla'])
+        RecipeService.delete_recipe(self.tortilla)
+        self.assertEqual(self._titles('tortilla'), ['Pan'])
+
+    def test_fts5(self):
+        if not RecipeSearch.fts_enabled():
+            self.skipTest('SQLite sin FTS5')
+        results, _ = RecipeService.search('patata')
+        self.assertIn('\x02patata\x03', results[0][1].snippet)
+        self._check_engine()
+
+    def test_fts5_ranks_all_matches(self):
+        if not RecipeSearch.fts_enabled():
+            self.skipTest('SQLite sin FTS5')
+        paella = RecipeService.create_recipe('Paella paella valenciana', 'Arroz', 'arroz, pollo', 's', 'Comida',
+                                             self.user)
+        for i in range(25):  # Coincidencias más recientes y menos relevantes (solo en los pasos)
+            RecipeService.create_recipe(f'Ensalada {i}', 'd', 'lechuga', 'Servir antes de la paella', 'Cena',
+                                        self.user)
+        self.app.config['SEARCH_RANK_WINDOW'] = 20
+        self.assertNotIn(paella.title, self._titles('paella'))  # Aproximación opcional por recencia
+        self.app.config['SEARCH_RANK_WINDOW'] = 0
+        self.assertEqual(self._titles('paella')[0], paella.title)
+        results, has_more = RecipeService.search('paella', page=3, per_page=12)
+        self.assertEqual((len(results), has_more), (2, False))
+
+    def test_memory_fallback(self):
+        with mock.patch.object(RecipeSearch, 'fts_enabled', return_value=False):
+            self._check_engine()
+
+    def test_memory_index_catches_up_with_other_processes(self):
+        self.app.config['SEARCH_CHECK_SECONDS'] = 0
+        with mock.patch.object(RecipeSearch, 'fts_enabled', return_value=False):
+            self.assertEqual(self._titles('tortilla'), ['Tortilla española'])
+            index = self.app.extensions['recipe_search_index']
+            RecipeService.create_recipe('Gazpacho', 'd', 'tomate', 's', 'Cena', self.user)
+            self.assertEqual(index.signature, recipes_signature())  # Las escrituras propias ya están aplicadas
+
+            # Otro proceso: escribe en la base sin pasar por el índice de esta aplicación
+            db.session.add(Recipe(title='Tortilla de patatas', description='d', ingredients='huevo', steps='s',
+                                  author=self.user))
+            Recipe.query.filter_by(id=self.flan.id).update({'title': 'Natillas', 'updated_at': datetime.utcnow()})
+            Recipe.query.filter_by(id=self.tortilla.id).delete()
+            db.session.commit()
+            self.assertEqual(self._titles('tortilla'), ['Tortilla de patatas'])
+            self.assertEqual(self._titles('natillas'), ['Natillas'])
+            self.assertEqual(self._titles('flan'), [])
+            self.assertIs(self.app.extensions['recipe_search_index'], index)
+
+    def test_pagination_and_view(self):
+        results, has_more = RecipeService.search('huevo', page=1, per_page=1)
+        self.assertEqual(len(results), 1)
+        self.assertTrue(has_more)
+        results, has_more = RecipeService.search('huevo', page=2, per_page=1)
+        self.assertEqual(len(results), 1)
+        self.assertFalse(has_more)
+
+        response = self.client.get('/search?q=patata')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<mark>patata</mark>', response.get_data(as_text=True))
+
+
+class InvertedIndexTestCase(unittest.TestCase):
+    def test_ranking_and_removal(self):
+        index = InvertedIndex()
+        index.add(1, ['Sopa de tomate', '', 'tomate, cebolla', ''])
+        index.add(2, ['Ensalada', 'con tomate', 'lechuga', ''])
+        self.assertEqual([doc for doc, _ in index.search(parse_query('tomate'), limit=10)], [1, 2])
+        self.assertEqual(index.search(parse_query('tomate lechu*'), limit=10)[0][0], 2)
+        index.remove(1)
+        self.assertEqual([doc for doc, _ in index.search(parse_query('sopa'), limit=10)], [])
+        self.assertEqual(len(index), 1)
+
+    def test_snippet_marks_matches(self):
+        snippet = make_snippet(['Sopa', '', 'tomate, cebolla', ''], parse_query('cebo*'))
+        self.assertEqual(snippet, 'tomate, \x02cebolla\x03')
@@ -0,0 +1,147 @@
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import User, Recipe, SimilarUser
+from app.services import RecipeService, SimilarityService, IngredientIndexService
+
+
+class SimilarityRecomputeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = [User(username=name) for name in ('ana', 'luis', 'eva', 'tom')]
+        db.session.add_all(self.users)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_recipe(self, author, ingredients):
+        return RecipeService.create_recipe('t', 'd', ingredients, 's', 'Cena', author)
+
+    def edges(self):
+        return {(e.user_id, e.similar_user_id) for e in SimilarUser.query}
+
+    def test_full_recompute_is_symmetric(self):
+        ana, luis, eva, tom = self.users
+        self.create_recipe(ana, 'Sal, aceite')
+        self.create_recipe(ana, 'ajo')
+        self.create_recipe(luis, 'sal\najo')
+        self.create_recipe(eva, 'sal; harina')
+        self.assertEqual(SimilarityService.recompute_similarities(min_common_ingredients=2), 3)
+        self.assertEqual(self.edges(), {(ana.id, luis.id), (luis.id, ana.id)})
+
+    def test_incremental_recompute_only_touches_changed_users(self):
+        ana, luis, eva, tom = self.users
+        self.create_recipe(ana, 'sal, aceite')
+        self.create_recipe(luis, 'sal, aceite')
+        SimilarityService.recompute_similarities()
+        checkpoint = datetime.utcnow()
+
+        for old in Recipe.query:
+            old.updated_at = checkpoint - timedelta(days=1)
+        db.session.commit()
+        self.create_recipe(eva, 'aceite, sal, ajo')
+        self.assertEqual(SimilarityService.recompute_similarities(since=checkpoint), 1)
+        self.assertEqual(self.edges(), {(ana.id, luis.id), (luis.id, ana.id),
+                                        (eva.id, ana.id), (ana.id, eva.id),
+                                        (eva.id, luis.id), (luis.id, eva.id)})
+
+    def test_deleting_a_recipe_recomputes_its_author(self):
+        ana, luis, eva, tom = self.users
+        recipe = self.create_recipe(ana, 'sal, aceite')
+        self.create_recipe(ana, 'harina')
+        self.create_recipe(luis, 'sal, aceite')
+        SimilarityService.recompute_similarities()
+        self.assertIn((ana.id, luis.id), self.edges())
+
+        RecipeService.delete_recipe(recipe)  # SIMILARITY_ASYNC desactivado en pruebas: recálculo en línea
+        self.assertNotIn((ana.id, luis.id), self.edges())
+
+    def test_neighbours_are_capped_and_ranked(self):
+        self.app.config['SIMILARITY_TOP_K'] = 2
+        ana, luis, eva, tom = self.users
+        self.create_recipe(ana, 'sal, aceite, ajo, perejil')
+        self.create_recipe(luis, 'sal, aceite, ajo, perejil')
+        self.create_recipe(eva, 'sal, aceite, ajo')
+        self.create_recipe(tom, 'sal, aceite')
+        SimilarityService.recompute_similarities()
+        self.assertEqual(SimilarUser.query.count(), 8)  # 4 usuarios x K=2 en lugar de 4 x 3
+        self.assertEqual(SimilarityService.get_similar_users(ana.id), [luis, eva])
+        self.assertEqual(SimilarityService.get_similar_users(tom.id, k=1), [eva])
+        edge = SimilarUser.query.filter_by(user_id=ana.id, similar_user_id=luis.id).one()
+        self.assertEqual((edge.score, edge.strategy), (1.0, 'posting:jaccard'))
+        self.assertIsNotNone(edge.computed_at)
+
+    def test_parallel_recompute_matches_single_process(self):
+        self.app.config['SIMILARITY_TOP_K'] = 2
+        ana, luis, eva, tom = self.users
+        self.create_recipe(ana, 'sal, aceite, ajo, perejil')
+        self.create_recipe(luis, 'sal, aceite, ajo, perejil')
+        self.create_recipe(eva, 'sal, aceite, ajo')
+        self.create_recipe(tom, 'sal, aceite')
+        scored = lambda: {(e.user_id, e.similar_user_id, e.score) for e in SimilarUser.query}
+        SimilarityService.recompute_similarities()
+        expected = scored()
+        self.assertEqual(SimilarityService.recompute_similarities(workers=2), 4)
+        self.assertEqual(scored(), expected)
+
+    def test_normalize_recipe_texts_only_rewrites_changed_rows(self):
+        ana = self.users[0]
+        self.create_recipe(ana, 'sal, aceite')
+        self.create_recipe(ana, 'Sal\n aceite ')
+        self.assertEqual(IngredientIndexService.normalize_recipe_texts(), 1)
+        self.assertEqual(IngredientIndexService.normalize_recipe_texts(), 0)
+        self.assertEqual({r.ingredients for r in Recipe.query}, {'sal, aceite', 'Sal\naceite'})
+
+
+class ReplaceSimilaritiesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add_all([User(username=name) for name in ('ana', 'luis', 'eva', 'tom')])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def edges(self):
+        return {(e.user_id, e.similar_user_id): e.score for e in SimilarUser.query}
+
+    def test_diff_against_existing_rows(self):
+        self.assertEqual(SimilarityService.replace_user_similarities(1, {2: 0.5, 3: 0.2}), (4, 0))
+        db.session.commit()
+        self.assertEqual(SimilarityService.replace_user_similarities(1, [(2, 0.9), (4, 0.1)]), (2, 2))
+        db.session.commit()
+        self.assertEqual(self.edges(), {(1, 2): 0.9, (2, 1): 0.9, (1, 4): 0.1, (4, 1): 0.1})
+
+    def test_reverse_edges_only_kept_in_the_other_users_top_k(self):
+        self.app.config['SIMILARITY_TOP_K'] = 1
+        SimilarityService.replace_user_similarities(2, {3: 0.9})
+        db.session.commit()
+        self.assertEqual(SimilarityService.replace_user_similarities(1, {2: 0.5, 4: 0.2}, strategy='prueba'), (2, 0))
+        db.session.commit()
+        self.assertEqual(self.edges(), {(2, 3): 0.9, (3, 2): 0.9, (1, 2): 0.5})
+        self.assertEqual(SimilarUser.query.filter_by(user_id=1).one().strategy, 'prueba')
+
+    def test_plain_ids_and_directed_mode(self):
+        SimilarityService.replace_user_similarities(2, [1], symmetric=False)
+        SimilarityService.replace_user_similarities(1, [3, 1], symmetric=False)
+        db.session.commit()
+        self.assertEqual(self.edges(), {(2, 1): None, (1, 3): None})
+
+    def test_pairs_are_unique(self):
+        SimilarityService.replace_user_similarities(1, [2])
+        db.session.commit()
+        db.session.add(SimilarUser(user_id=1, similar_user_id=2))
+        with self.assertRaises(Exception):
+            db.session.commit()
+        db.session.rollback()
@@ -0,0 +1,93 @@
+import random
+import unittest
+from app import create_app, db
+from app.models import User, SimilarUser
+from app.services import RecipeService, SimilarityService
+from app.similarity_matrix import UserIngredientMatrix, matrix_engine_available
+from app.strategies import MatchingStrategyFactory
+
+
+def brute_force(user_sets, user_id, metric):
+    mine = user_sets[user_id]
+    scores = {}
+    for other, theirs in user_sets.items():
+        common = len(mine & theirs)
+        if other == user_id or not common:
+            continue
+        if metric == 'overlap':
+            scores[other] = float(common)
+        elif metric == 'jaccard':
+            scores[other] = common / len(mine | theirs)
+        else:
+            scores[other] = common / (len(mine) * len(theirs)) ** 0.5
+    return scores
+
+
+@unittest.skipUnless(matrix_engine_available(), 'requiere NumPy')
+class UserIngredientMatrixTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.user_sets = {uid: set(rng.sample(range(40), rng.randint(1, 12))) for uid in range(1, 60)}
+
+    def check_engine(self, matrix):
+        for metric in ('overlap', 'jaccard', 'cosine'):
+            neighbours = matrix.top_k(k=5, metric=metric, block_size=7)
+            for user_id, ranked in neighbours.items():
+                expected = brute_force(self.user_sets, user_id, metric)
+                best = sorted(expected.values(), reverse=True)[:5]
+                self.assertEqual(len(ranked), len(best))
+                for (other, score), expected_score in zip(ranked, best):
+                    self.assertAlmostEqual(score, expected_score)
+                    self.assertAlmostEqual(expected[other], score)
+
+    def test_sparse_product_matches_brute_force(self):
+        self.check_engine(UserIngredientMatrix(self.user_sets))
+
+    def test_numpy_fallback_matches_brute_force(self):
+        matrix = UserIngredientMatrix(self.user_sets)
+        matrix._csr = None
+        self.check_engine(matrix)
+
+    def test_top_k_for_subset_and_min_common(self):
+        matrix = UserIngredientMatrix(self.user_sets)
+        neighbours = matrix.top_k(k=None, metric='overlap', min_common=3, user_ids=[1, 2])
+        self.assertEqual(set(neighbours), {1, 2})
+        for user_id, ranked in neighbours.items():
+            expected = {o for o, c in brute_force(self.user_sets, user_id, 'overlap').items() if c >= 3}
+            self.assertEqual({o for o, _ in ranked}, expected)
+
+
+@unittest.skipUnless(matrix_engine_available(), 'requiere NumPy')
+class MatrixStrategyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.users = [User(username=name) for name in ('ana', 'luis', 'eva')]
+        db.session.add_all(self.users)
+        db.session.commit()
+        ana, luis, eva = self.users
+        RecipeService.create_recipe('t', 'd', 'sal, aceite, ajo', 's', 'Cena', ana)
+        RecipeService.create_recipe('t', 'd', 'sal, aceite', 's', 'Cena', luis)
+        RecipeService.create_recipe('t', 'd', 'sal, harina, huevo, leche', 's', 'Postre', eva)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_strategy_ranks_by_score(self):
+        ana, luis, eva = self.users
+        strategy = MatchingStrategyFactory.create_strategy(
+            'matrix', metric='jaccard', exclude_user_id=ana.id, matrix=UserIngredientMatrix.from_database())
+        ranked = strategy.rank_similar_users({'sal', 'aceite', 'ajo'})
+        self.assertEqual([uid for uid, _ in ranked], [luis.id, eva.id])
+        self.assertAlmostEqual(ranked[0][1], 2 / 3)
+        self.assertEqual(strategy.find_similar_users({'sal', 'aceite', 'ajo'}), {luis.id, eva.id})
+
+    def test_batch_recompute_writes_top_k_edges(self):
+        ana, luis, eva = self.users
+        self.assertEqual(SimilarityService.recompute_top_k_similarities(top_k=1), 3)
+        edges = {(e.user_id, e.similar_user_id) for e in SimilarUser.query}
+        self.assertEqual(edges, {(ana.id, luis.id), (luis.id, ana.id), (eva.id, luis.id)})
@@ -0,0 +1,80 @@
+import unittest
+from types import SimpleNamespace
+from app import create_app, db
+from app.models import User, UserCategory
+from app.services import RecipeService, CategoryProfileService
+from app.strategies import MatchingStrategyFactory
+
+
+def recipe(author_id, ingredients, category):
+    return SimpleNamespace(author_id=author_id, ingredients=ingredients, category=category)
+
+
+class InMemoryStrategiesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.recipes = [recipe(1, 'sal, ajo', 'Cena'), recipe(2, 'harina, huevo', 'Postre'),
+                        recipe(2, 'sal, tomate', 'Cena'), recipe(3, 'arroz', 'Almuerzo')]
+
+    def test_category_matching_keeps_original_semantics(self):
+        strategy = MatchingStrategyFactory.create_strategy('category_matching')
+        self.assertEqual(strategy.find_similar_users({'ajo'}, self.recipes), {1, 2})
+        self.assertEqual(strategy.find_similar_users({'huevo'}, self.recipes), {1, 2})
+        self.assertEqual(strategy.find_similar_users({'pimienta'}, self.recipes), set())
+
+    def test_hybrid_weights_drive_ranking(self):
+        ingredients_first = MatchingStrategyFactory.create_strategy(
+            'hybrid', ingredient_weight=1.0, category_weight=0.0, min_score=0.1)
+        self.assertEqual(ingredients_first.rank_similar_users({'sal', 'ajo'}, self.recipes),
+                         [(1, 1.0), (2, 0.5)])
+
+
+class ProfileStrategiesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis, self.eva = users = [User(username=n) for n in ('ana', 'luis', 'eva')]
+        db.session.add_all(users)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def create_recipe(self, author, ingredients, category):
+        return RecipeService.create_recipe('t', 'd', ingredients, 's', category, author)
+
+    def test_profile_follows_recipe_writes(self):
+        r = self.create_recipe(self.ana, 'sal', 'Cena')
+        self.create_recipe(self.ana, 'ajo', 'Cena')
+        self.assertEqual(CategoryProfileService.get_profile(self.ana.id), {'Cena': 2})
+        RecipeService.update_recipe(r, 't', 'd', 'sal', 's', 'Postre')
+        self.assertEqual(CategoryProfileService.get_profile(self.ana.id), {'Cena': 1, 'Postre': 1})
+        RecipeService.delete_recipe(r)
+        self.assertEqual(CategoryProfileService.get_profile(self.ana.id), {'Cena': 1})
+        UserCategory.query.delete()
+        self.assertEqual(CategoryProfileService.rebuild(), 1)
+        self.assertEqual(CategoryProfileService.get_profile(self.ana.id), {'Cena': 1})
+
+    def test_category_and_hybrid_scores(self):
+        self.create_recipe(self.ana, 'sal, ajo', 'Cena')
+        self.create_recipe(self.ana, 'harina', 'Postre')
+        self.create_recipe(self.luis, 'sal, ajo, tomate', 'Cena')
+        self.create_recipe(self.eva, 'harina, huevo', 'Postre')
+        self.create_recipe(self.eva, 'leche', 'Desayuno')
+
+        category = MatchingStrategyFactory.create_strategy('category_matching', user_id=self.ana.id)
+        self.assertEqual(category.rank_similar_users(set()), [(self.luis.id, 0.5), (self.eva.id, 0.5)])
+
+        hybrid = MatchingStrategyFactory.create_strategy(
+            'hybrid', ingredient_weight=0.5, category_weight=0.5, user_id=self.ana.id)
+        ranked = hybrid.rank_similar_users({'sal', 'ajo', 'harina'})
+        self.assertEqual([uid for uid, _ in ranked], [self.luis.id, self.eva.id])
+        self.assertAlmostEqual(ranked[0][1], 0.5 * 2 / 3 + 0.5 * 0.5)
+        self.assertAlmostEqual(ranked[1][1], 0.5 * 1 / 3 + 0.5 * 0.5)
+
+        category_only = MatchingStrategyFactory.create_strategy(
+            'hybrid', ingredient_weight=0.0, category_weight=1.0, user_id=self.ana.id, top_k=1)
+        self.assertEqual(len(category_only.rank_similar_users({'sal'})), 1)
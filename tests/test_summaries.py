@@ -0,0 +1,72 @@
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe, RecipeSummary
+from app.services import RecipeService
+
+
+class RecipeSummaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.ana, self.luis = User(username='ana'), User(username='luis')
+        db.session.add_all([self.ana, self.luis])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_summaries_follow_writes(self):
+        long_text = 'Una tortilla muy jugosa. ' * 10
+        recipe = RecipeService.create_recipe('Tortilla', long_text, 'huevo, patata', 'Batir y cuajar.', 'Cena',
+                                             self.ana)
+        summary = RecipeSummary.query.get(recipe.id)
+        self.assertEqual((summary.title, summary.author_username, summary.category), ('Tortilla', 'ana', 'Cena'))
+        self.assertEqual(summary.excerpt, long_text[:150])
+        self.assertTrue(summary.truncated)
+        self.assertEqual(summary.timestamp, recipe.timestamp)
+
+        RecipeService.update_recipe(recipe, 'Tortilla de patata', 'Corta', 'huevo, patata', 'Batir.', 'Comida')
+        db.session.expire_all()
+        summary = RecipeSummary.query.get(recipe.id)
+        self.assertEqual((summary.title, summary.excerpt, summary.truncated, summary.category),
+                         ('Tortilla de patata', 'Corta', False, 'Comida'))
+
+        recipe.author = self.luis  # Escrituras directas por el ORM también actualizan el resumen
+        db.session.commit()
+        self.assertEqual(RecipeSummary.query.get(recipe.id).author_username, 'luis')
+
+        RecipeService.delete_recipe(recipe)
+        self.assertEqual(RecipeSummary.query.count(), 0)
+
+    def test_rebuild_after_bulk_insert(self):
+        db.session.connection().execute(Recipe.__table__.insert(), [
+            {'title': f'r{i}', 'description': 'd', 'ingredients': 'sal', 'steps': 's', 'category': 'Cena',
+             'author_id': self.ana.id} for i in range(3)])
+        db.session.commit()
+        self.assertEqual(RecipeSummary.query.count(), 0)
+        self.assertEqual(RecipeService.rebuild_summaries(), 3)
+        self.assertEqual(sorted(s.title for s in RecipeSummary.query), ['r0', 'r1', 'r2'])
+
+    def test_listing_reads_only_summaries(self):
+        for i in range(5):
+            RecipeService.create_recipe(f'Receta {i}', f'Descripción {i}', 'sal', 'Pasos largos ' * 50, 'Postre',
+                                        self.ana)
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            html = self.client.get('/category/Postre').get_data(as_text=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertIn('Receta 4', html)
+        self.assertIn('ana', html)
+        self.assertIn('Descripción 4', html)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('recipe_summaries', statements[0])
+        self.assertNotIn('recipes.steps', statements[0])